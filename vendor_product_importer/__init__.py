@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 # Part of Vendor Product Importer. See LICENSE file for full copyright and licensing details.
 
+from . import tools
 from . import models
 from . import adapters
 from . import wizards
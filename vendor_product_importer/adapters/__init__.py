@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 
+from . import instrumentation
+from . import log_writer
+from . import profiler
+from . import recorder
 from . import base_adapter
 from . import amazon_adapter
 from . import ebay_adapter
 from . import shopify_adapter
 from . import generic_adapter
+from . import feed_adapter
@@ -20,8 +20,8 @@ class AmazonAdapter(BaseAdapter):
     You can sign up for the API at: https://affiliate-program.amazon.com/assoc_credentials/home
     """
     
-    def __init__(self, vendor_config):
-        super().__init__(vendor_config)
+    def __init__(self, vendor_config, import_log=None):
+        super().__init__(vendor_config, import_log)
         self.marketplace = vendor_config.amazon_marketplace or 'US'
         self.associate_tag = vendor_config.amazon_associate_tag
         self.access_key = vendor_config.api_key
@@ -67,52 +67,18 @@ class AmazonAdapter(BaseAdapter):
         
         This method fetches products from Amazon and creates/updates them in Odoo
         """
-        created_count = 0
-        updated_count = 0
-        failed_count = 0
-        
         try:
             _logger.info('Starting Amazon product import for marketplace: %s', self.marketplace)
             
-            # Fetch products from Amazon
-            products = self.fetch_products()
-            
-            for raw_product in products:
-                try:
-                    # Parse product data
-                    product_data = self.parse_product_data(raw_product)
-                    
-                    # Apply filters
-                    if not self._apply_filters(product_data):
-                        continue
-                    
-                    # Calculate sale price
-                    if product_data.get('vendor_cost'):
-                        product_data['list_price'] = self._calculate_sale_price(product_data['vendor_cost'])
-                    
-                    # Create or update product
-                    product, created, updated = self.create_or_update_product(product_data)
-                    
-                    if created:
-                        created_count += 1
-                    elif updated:
-                        updated_count += 1
-                        
-                except Exception as e:
-                    _logger.error('Failed to import Amazon product: %s', str(e))
-                    failed_count += 1
+            result = self._import_product_stream(self.iter_products(self.resume_cursor))
             
-            message = _('Amazon import completed: %d created, %d updated, %d failed') % (
-                created_count, updated_count, failed_count
+            message = _('Amazon import completed: %d created, %d updated, %d skipped, %d failed') % (
+                result['created'], result['updated'], result['skipped'], result['failed']
             )
             _logger.info(message)
             
-            return {
-                'created': created_count,
-                'updated': updated_count,
-                'failed': failed_count,
-                'message': message,
-            }
+            result['message'] = message
+            return result
             
         except Exception as e:
             error_msg = _('Amazon import failed: %s') % str(e)
@@ -269,6 +235,9 @@ class AmazonAdapter(BaseAdapter):
             _logger.error('Error parsing Amazon product data: %s', str(e))
             raise
     
+    def _get_raw_product_key(self, raw_product):
+        return raw_product.get('ASIN')
+    
     def sync_product(self, product_vendor_info):
         """
         Sync single product from Amazon
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import json
 import logging
-from odoo import _
+import time
+import zlib
+from odoo import _, fields
 from odoo.exceptions import UserError
+from ..tools import canonical_gtin
+from .instrumentation import ImportMetrics
+from .log_writer import ImportLogLineWriter
 
 _logger = logging.getLogger(__name__)
 
@@ -10,14 +17,57 @@ _logger = logging.getLogger(__name__)
 class BaseAdapter:
     """Base adapter class for vendor integrations"""
     
-    def __init__(self, vendor_config):
+    DEFAULT_CHUNK_SIZE = 500
+    # Adapters implementing fetch_stock() set it, see cron_sync_stock
+    supports_stock_sync = False
+    # Adapters that skip the products of other shards without fetching them
+    # set it, see _in_shard(); the others would fetch the catalog once per shard
+    supports_sharding = False
+    
+    def __init__(self, vendor_config, import_log=None):
         """
         Initialize adapter with vendor configuration
         
         :param vendor_config: vendor.config record
+        :param import_log: vendor.import.log record receiving per-product lines (optional)
         """
         self.vendor = vendor_config
         self.env = vendor_config.env
+        self.import_log = import_log
+        # Shards of a sharded import all write their lines to the parent log
+        self.log_writer = ImportLogLineWriter(import_log and (import_log.parent_log_id or import_log))
+        self.metrics = ImportMetrics(self.env.cr)
+        
+        # Resumable runs: set by the caller before import_products()
+        self.resume_cursor = None
+        self.deadline = None
+        self.checkpoint = None
+        self.chunk_size = self.DEFAULT_CHUNK_SIZE
+        
+        # Sharded runs: (shard_index, shard_count), set by the caller
+        self.shard = None
+        # Catalog matches of the chunk being imported, see _prefetch_matches()
+        self._match_cache = None
+        # This vendor's rows of the matched products, by template ID
+        self._vendor_info_cache = None
+        # Near-duplicate candidates of the chunk's names, by (name, brand),
+        # and the products this vendor came to supply since they were found
+        self._name_match_cache = None
+        self._supplied_template_ids = None
+        # Log marking the vendor products seen by this import, see _diff_chunk()
+        self.snapshot_log = import_log and (import_log.parent_log_id or import_log)
+        # A replay of a recorded import is not the vendor's current catalog:
+        # it must not move the snapshot, see _mark_seen()
+        self.is_replay = bool(import_log) and import_log.import_type == 'replay'
+        
+        # Payload recording (PayloadRecorder) and offline replay (PayloadReplay)
+        self.recorder = None
+        self.replay = None
+        self._name_matching_enabled = None
+        # Active price tiers, loaded once per run, see _calculate_sale_price()
+        self._price_tiers = None
+        # Catalog products the stream could not fetch, see _report_unfetched()
+        self.unfetched_count = 0
     
     def test_connection(self):
         """
@@ -32,10 +82,422 @@ class BaseAdapter:
         Import products from vendor
         
         :return: Dictionary with import results
-                 {'created': int, 'updated': int, 'failed': int, 'message': str}
+                 {'found': int, 'created': int, 'updated': int, 'skipped': int,
+                  'failed': int, 'message': str}
         """
         raise NotImplementedError("Subclasses must implement import_products()")
     
+    def iter_products(self, cursor=None):
+        """
+        Iterate over vendor products with a resumable cursor
+        
+        The default implementation walks fetch_products() and uses the
+        position in that list as cursor. Adapters that page through an API
+        or a list of URLs should override it so a resumed import does not
+        fetch the skipped part again.
+        
+        :param cursor: Cursor returned with a previously imported product, to
+                       resume right after it (optional)
+        :return: Iterator of (cursor, raw_product) tuples
+        """
+        offset = int(cursor or 0)
+        for index, raw_product in enumerate(self.fetch_products()):
+            if index < offset:
+                continue
+            if self._in_shard(self._get_raw_product_key(raw_product) or str(index)):
+                yield str(index + 1), raw_product
+    
+    def _serialize_raw_product(self, raw_product):
+        """
+        Convert a raw product to JSON data, to record it (see PayloadRecorder)
+        
+        Raw products of API adapters are already JSON data. Adapters whose
+        raw products hold other objects must override it, together with
+        _deserialize_raw_product(): recording refuses anything else.
+        
+        :param raw_product: Raw product data from vendor
+        :return: JSON-serializable data
+        """
+        return raw_product
+    
+    def _deserialize_raw_product(self, data):
+        """
+        Rebuild a raw product recorded by _serialize_raw_product(), to replay it
+        
+        :param data: Recorded JSON data
+        :return: Raw product data, as iter_products() yields it
+        """
+        return data
+    
+    def _get_raw_product_key(self, raw_product):
+        """
+        Cheap stable identifier of a raw product, used to assign it to a shard
+        
+        :param raw_product: Raw product data from vendor
+        :return: String key (usually the vendor product ID) or None
+        """
+        return None
+    
+    def _in_shard(self, key):
+        """
+        Check whether a product belongs to the shard processed by this adapter
+        
+        Products are assigned to shards by a stable hash of their key, so a
+        shard always sees the same products, even across resumed runs. The
+        check only saves work when it runs before the product is fetched,
+        see supports_sharding.
+        
+        :param key: Product key, see _get_raw_product_key()
+        :return: True if the product must be imported by this adapter
+        """
+        if not self.shard:
+            return True
+        shard_index, shard_count = self.shard
+        return zlib.crc32(str(key).encode('utf-8')) % shard_count == shard_index
+    
+    def _import_product_stream(self, products):
+        """
+        Parse, filter, price and create/update a stream of raw products
+        
+        Shared import loop of all adapters. Products are processed in chunks;
+        after every chunk the log lines are flushed and the checkpoint
+        callback (if any) persists the cursor. The deadline is checked after
+        every product fetched: once it has passed, the partial chunk is
+        imported and checkpointed and the loop stops, leaving the rest of the
+        stream for a resumed run. Every product is recorded as a
+        vendor.import.log.line through the buffered log writer.
+        
+        :param products: Iterable of (cursor, raw_product) tuples, see iter_products()
+        :return: Dictionary with import counters, plus 'complete' and the
+                 'cursor' of the last processed product
+        """
+        counts = {'found': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'failed': 0,
+                  'new': 0, 'changed': 0, 'unchanged': 0}
+        counts['complete'] = True
+        counts['cursor'] = False
+        
+        if self.replay is not None:
+            # The adapter's own stream is never iterated, so nothing is fetched
+            products = ((cursor, self._deserialize_raw_product(data))
+                        for cursor, data in self.replay.iter_products(self.resume_cursor))
+        if self.recorder is not None:
+            products = self.recorder.record_products(products, self._serialize_raw_product)
+        
+        try:
+            chunk = []
+            for item in self._iter_timed(products, 'fetch'):
+                chunk.append(item)
+                # Fetching a product can be slow (a page per product when scraping)
+                expired = self.deadline and time.time() >= self.deadline
+                if len(chunk) < self.chunk_size and not expired:
+                    continue
+                
+                self._import_chunk(chunk, counts)
+                chunk = []
+                if expired:
+                    counts['complete'] = False
+                    break
+            
+            if chunk:
+                self._import_chunk(chunk, counts)
+        finally:
+            self.log_writer.flush()
+        
+        counts['found'] += self.unfetched_count
+        counts['failed'] += self.unfetched_count
+        counts['metrics'] = self.metrics.summary()
+        return counts
+    
+    def _report_unfetched(self, reference, error):
+        """
+        Record a catalog product that the product stream could not fetch
+        
+        It counts as failed: the vendor still lists it, so the import cannot
+        tell which products left the catalog and skips the removal pass.
+        
+        :param reference: Product URL or key
+        :param error: Error message
+        """
+        self.unfetched_count += 1
+        self.log_writer.add('failed', {'vendor_product_id': reference}, error=error)
+    
+    def _import_chunk(self, chunk, counts):
+        """
+        Import one chunk of products and checkpoint after it
+        
+        Each product is created or updated in its own savepoint: a database
+        error fails and rolls back that product only (including a template
+        created before its vendor info failed), so the chunk still reaches
+        its checkpoint and a resumed run never replays it.
+        
+        :param chunk: List of (cursor, raw_product) tuples
+        :param counts: Import counters, updated in place
+        """
+        with self.metrics.phase('parse'):
+            parsed_products = self._parse_products([raw_product for dummy, raw_product in chunk])
+        
+        accepted_products = []
+        seen_keys = set()
+        for product_data, parse_error in parsed_products:
+            counts['found'] += 1
+            self.metrics.count_row()
+            try:
+                if parse_error:
+                    raise parse_error
+                
+                # Filtered products are still in the vendor catalog
+                if product_data.get('vendor_product_id'):
+                    seen_keys.add(str(product_data['vendor_product_id']))
+                
+                with self.metrics.phase('parse'):
+                    # Apply filters
+                    accepted = self._apply_filters(product_data)
+                
+                if not accepted:
+                    counts['skipped'] += 1
+                    self.log_writer.add('skipped', product_data, error=_('Filtered out by vendor rules'))
+                    continue
+                
+                # Calculate sale price
+                if product_data.get('vendor_cost'):
+                    with self.metrics.phase('pricing'):
+                        product_data['list_price'] = self._calculate_sale_price(product_data['vendor_cost'])
+                accepted_products.append(product_data)
+                
+            except Exception as e:
+                _logger.error('Failed to import product from %s: %s', self.vendor.name, str(e))
+                counts['failed'] += 1
+                self.log_writer.add('failed', product_data, error=str(e))
+        
+        # Match the whole chunk against the catalog with a few bulk queries
+        with self.metrics.phase('match'):
+            changed_products = self._diff_chunk(accepted_products, counts)
+            if self.snapshot_log and seen_keys and not self.is_replay:
+                unchanged_keys = self._get_keys(accepted_products) - self._get_keys(changed_products)
+                self._mark_seen(list(seen_keys), unchanged_keys)
+            accepted_products = changed_products
+            self._prefetch_matches(accepted_products)
+        
+        name_index_entries = []
+        for product_data in accepted_products:
+            try:
+                # A failed row is rolled back alone: the transaction stays
+                # usable for the rest of the chunk and its checkpoint
+                with self.env.cr.savepoint():
+                    product, created, updated = self.create_or_update_product(product_data)
+                
+                if created or updated:
+                    # Only once the row is saved, so a rolled back product is never matched
+                    self._supplied_template_ids.add(product.id)
+                if created:
+                    self._remember_match(product_data, product, product.product_variant_id)
+                    if self._index_product_names():
+                        name_index_entries.append((product.id, product_data.get('name'), product_data.get('brand')))
+                    state = 'created'
+                elif updated:
+                    state = 'updated'
+                else:
+                    state = 'skipped'
+                counts[state] += 1
+                self.log_writer.add(state, product_data, product=product)
+                
+            except Exception as e:
+                _logger.error('Failed to import product from %s: %s', self.vendor.name, str(e))
+                counts['failed'] += 1
+                self.log_writer.add('failed', product_data, error=str(e))
+                # It may hold a vendor row the savepoint rolled back
+                self._vendor_info_cache = None
+        
+        # Make the new products findable by name for vendors using name matching
+        if name_index_entries:
+            with self.metrics.phase('write'):
+                self.env['product.name.signature']._index_products(name_index_entries)
+        
+        self._match_cache = None
+        self._vendor_info_cache = None
+        self._name_match_cache = None
+        self._supplied_template_ids = None
+        counts['cursor'] = chunk[-1][0]
+        self.log_writer.flush()
+        if self.checkpoint:
+            self.checkpoint(counts['cursor'], counts)
+    
+    @staticmethod
+    def _get_content_hash(product_data):
+        """
+        :param product_data: Parsed product data
+        :return: Stable hash of the data, to detect products that did not change
+        """
+        payload = json.dumps(product_data, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _get_keys(product_data_list):
+        """
+        :param product_data_list: Parsed product data
+        :return: Set of their vendor product IDs, as strings
+        """
+        return {str(product_data['vendor_product_id']) for product_data in product_data_list
+                if product_data.get('vendor_product_id')}
+    
+    def _diff_chunk(self, product_data_list, counts):
+        """
+        Compare a chunk with the previous import of the vendor
+        
+        The stored content hashes of the chunk's vendor products are read in
+        one query: products with the same hash are unchanged and skipped,
+        only their sync dates are stamped by _mark_seen().
+        
+        :param product_data_list: Parsed and accepted product data
+        :param counts: Import counters, updated in place
+        :return: Product data that must be created or updated
+        """
+        for product_data in product_data_list:
+            product_data['content_hash'] = self._get_content_hash(product_data)
+        
+        keys = list(self._get_keys(product_data_list))
+        if not self.snapshot_log or not keys:
+            counts['new'] += len(product_data_list)
+            return product_data_list
+        
+        VendorInfo = self.env['product.vendor.info'].with_context(active_test=False)
+        known = {}
+        for vendor_info in VendorInfo.search_fetch([
+            ('vendor_id', '=', self.vendor.id),
+            ('vendor_product_id', 'in', keys),
+        ], ['vendor_product_id', 'content_hash', 'product_tmpl_id']):
+            known[vendor_info.vendor_product_id] = vendor_info
+        
+        changed = []
+        for product_data in product_data_list:
+            vendor_info = known.get(str(product_data.get('vendor_product_id') or ''))
+            if not vendor_info:
+                counts['new'] += 1
+                changed.append(product_data)
+            elif vendor_info.content_hash == product_data['content_hash']:
+                counts['unchanged'] += 1
+                counts['skipped'] += 1
+                self.log_writer.add('skipped', product_data, product=vendor_info.product_tmpl_id,
+                                    error=_('Unchanged since the previous import'))
+            else:
+                counts['changed'] += 1
+                changed.append(product_data)
+        return changed
+    
+    def _mark_seen(self, keys, unchanged_keys=()):
+        """
+        Mark vendor products as seen by this import, restoring removed ones
+        
+        All parsed products of a chunk are marked in one statement, which
+        lets the end of the import find the ones that left the vendor catalog
+        (see vendor.import.log._mark_removed_vendor_products). Only rows the
+        removal pass archived are reactivated: rows archived by a user stay
+        archived. The same statement stamps the sync dates of the unchanged
+        products, which are not written otherwise, so the sync schedule does
+        not take them for stale.
+        
+        :param keys: List of vendor product IDs
+        :param unchanged_keys: Vendor product IDs skipped as unchanged
+        """
+        VendorInfo = self.env['product.vendor.info']
+        VendorInfo.flush_model(['last_seen_log_id', 'removed_date', 'active', 'last_sync_date'])
+        self.env['product.template'].flush_model(['last_vendor_sync'])
+        self.env.cr.execute("""
+            WITH seen AS (
+                UPDATE product_vendor_info
+                   SET last_seen_log_id = %(log_id)s,
+                       active = active OR removed_date IS NOT NULL,
+                       removed_date = NULL,
+                       last_sync_date = CASE WHEN vendor_product_id = ANY(%(unchanged)s) THEN %(now)s
+                                             ELSE last_sync_date END
+                 WHERE vendor_id = %(vendor_id)s
+                   AND vendor_product_id = ANY(%(keys)s)
+                   AND (last_seen_log_id IS DISTINCT FROM %(log_id)s OR removed_date IS NOT NULL
+                        OR vendor_product_id = ANY(%(unchanged)s))
+             RETURNING id, product_tmpl_id, vendor_product_id = ANY(%(unchanged)s) AS unchanged
+            ), synced AS (
+                UPDATE product_template
+                   SET last_vendor_sync = %(now)s
+                  FROM seen
+                 WHERE seen.unchanged
+                   AND product_template.id = seen.product_tmpl_id
+            )
+            SELECT id, product_tmpl_id, unchanged FROM seen
+        """, {
+            'log_id': self.snapshot_log.id,
+            'vendor_id': self.vendor.id,
+            'keys': keys,
+            'unchanged': list(unchanged_keys),
+            'now': fields.Datetime.now(),
+        })
+        rows = self.env.cr.fetchall()
+        seen = VendorInfo.browse([row[0] for row in rows])
+        if seen:
+            seen.invalidate_recordset(['last_seen_log_id', 'removed_date', 'active', 'last_sync_date'])
+            seen.modified(['active'])
+        synced = self.env['product.template'].browse({row[1] for row in rows if row[2]})
+        if synced:
+            synced.invalidate_recordset(['last_vendor_sync'])
+    
+    def _parse_products(self, raw_products):
+        """
+        Parse a chunk of raw products
+        
+        Calls parse_product_data() on each product; adapters that can parse
+        a whole chunk at once should override it.
+        
+        :param raw_products: List of raw products
+        :return: List of (product_data, exception) tuples aligned with
+                 raw_products; product_data is None when parsing failed
+        """
+        parsed_products = []
+        for raw_product in raw_products:
+            try:
+                parsed_products.append((self.parse_product_data(raw_product), None))
+            except Exception as e:
+                parsed_products.append((None, e))
+        return parsed_products
+    
+    def _iter_timed(self, iterable, phase):
+        """
+        Iterate while timing each step as the given phase
+        
+        Lazy product streams do their fetching while being iterated, so the
+        fetch phase is measured on next() rather than around the loop.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.metrics.phase(phase):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    
+    def _http_get(self, url, **kwargs):
+        """
+        GET a URL, counting the request and response size in the metrics
+        
+        Responses are recorded when recording, and served from the recording
+        without network when replaying.
+        
+        :param url: URL to fetch
+        :return: requests.Response
+        """
+        import requests
+        
+        if self.recorder is not None or self.replay is not None:
+            url = requests.Request('GET', url, params=kwargs.pop('params', None)).prepare().url
+        
+        if self.replay is not None:
+            response = self.replay.get(url)
+        else:
+            response = requests.get(url, **kwargs)
+            if self.recorder is not None:
+                self.recorder.record_response(url, response.content)
+        self.metrics.count_http(len(response.content))
+        return response
+    
     def sync_product(self, product_vendor_info):
         """
         Sync single product from vendor
@@ -45,6 +507,50 @@ class BaseAdapter:
         """
         raise NotImplementedError("Subclasses must implement sync_product()")
     
+    def sync_products(self, product_vendor_infos):
+        """
+        Sync a batch of products from vendor
+        
+        Default implementation calls sync_product() for each row; adapters
+        whose API can look up many products per request should override it.
+        
+        :param product_vendor_infos: product.vendor.info records of this vendor
+        :return: Tuple (synced, failed) of product.vendor.info recordsets
+        """
+        synced = failed = product_vendor_infos.browse()
+        for product_vendor_info in product_vendor_infos:
+            try:
+                if self.sync_product(product_vendor_info):
+                    synced |= product_vendor_info
+                else:
+                    failed |= product_vendor_info
+            except Exception as e:
+                _logger.error('Error syncing product %s: %s', product_vendor_info.vendor_product_id, str(e))
+                failed |= product_vendor_info
+        return synced, failed
+    
+    def fetch_stock(self, product_vendor_infos):
+        """
+        Fetch only availability of a batch of products, for the stock sync
+        
+        Adapters whose API can return stock without the full product should
+        override it and set supports_stock_sync; the default reports nothing,
+        so the rows are left as is.
+        
+        :param product_vendor_infos: product.vendor.info records of this vendor
+        :return: Dictionary {product.vendor.info id: (qty_available, stock_status)}
+        """
+        _logger.info('%s does not support stock-only sync', self.__class__.__name__)
+        return {}
+    
+    @staticmethod
+    def _get_stock_status(qty_available):
+        """
+        :param qty_available: Quantity reported by the vendor
+        :return: vendor_stock_status value for that quantity
+        """
+        return 'in_stock' if qty_available > 0 else 'out_of_stock'
+    
     def fetch_products(self):
         """
         Fetch products from vendor
@@ -71,19 +577,22 @@ class BaseAdapter:
         """
         try:
             # Check if product already exists
-            product = self._find_existing_product(product_data)
+            with self.metrics.phase('match'):
+                product, variant = self._find_existing_match(product_data)
             
             if product:
                 # Update existing product
                 if self.vendor.auto_update_prices:
-                    self._update_product(product, product_data)
+                    with self.metrics.phase('write'):
+                        self._update_product(product, product_data, variant=variant)
                     return (product, False, True)
                 else:
                     return (product, False, False)
             else:
                 # Create new product
                 if self.vendor.auto_create_products:
-                    product = self._create_product(product_data)
+                    with self.metrics.phase('write'):
+                        product = self._create_product(product_data)
                     return (product, True, False)
                 else:
                     return (None, False, False)
@@ -92,41 +601,217 @@ class BaseAdapter:
             _logger.error('Error creating/updating product: %s', str(e))
             raise
     
+    # Keys tried in order when matching a vendor product to the catalog
+    MATCH_KEYS = ('default_code', 'barcode', 'vendor_product_id')
+    
     def _find_existing_product(self, product_data):
         """
-        Find existing product by SKU, barcode, or name
+        Find existing product by SKU, barcode, or vendor product ID
         
         :param product_data: Product data dictionary
         :return: product.template record or None
         """
-        ProductTemplate = self.env['product.template']
+        product, variant = self._find_existing_match(product_data)
+        return product or None
+    
+    def _find_existing_match(self, product_data):
+        """
+        Find the existing product and variant of a vendor product
         
-        # Try to find by default_code (SKU)
-        if product_data.get('default_code'):
-            product = ProductTemplate.search([
-                ('default_code', '=', product_data['default_code'])
-            ], limit=1)
-            if product:
-                return product
+        Matching runs on the stored, indexed product.product columns, so the
+        variant carrying the SKU or barcode is found, not only its template.
+        Uses the matches prefetched for the current chunk when available.
+        
+        :param product_data: Product data dictionary
+        :return: Tuple (product.template, product.product), empty records if not found
+        """
+        match = self._match_by_keys(product_data)
+        if match:
+            return match
         
-        # Try to find by barcode
-        if product_data.get('barcode'):
-            product = ProductTemplate.search([
-                ('barcode', '=', product_data['barcode'])
-            ], limit=1)
+        # No shared identifier: look for a near-duplicate name from another vendor
+        if self.vendor.name_match_threshold and product_data.get('name'):
+            product, score = self._match_by_name(product_data)
             if product:
-                return product
+                _logger.info('Matched "%s" to product %s by name (similarity %.2f)',
+                             product_data['name'], product.id, score)
+                return product, self.env['product.product']
+        return self.env['product.template'], self.env['product.product']
+    
+    def _match_by_keys(self, product_data):
+        """
+        :param product_data: Product data dictionary
+        :return: Tuple (product.template, product.product) of the first
+                 match key found in the catalog, or None
+        """
+        for key in self.MATCH_KEYS:
+            value = self._normalize_match_value(key, product_data.get(key))
+            if not value:
+                continue
+            if self._match_cache is not None:
+                match = self._match_cache[key].get(value)
+            else:
+                match = self._search_matches(key, [value]).get(value)
+            if match:
+                return match
+        return None
+    
+    def _match_by_name(self, product_data):
+        """
+        Find a near duplicate of the product's name and brand, from the
+        candidates prefetched for the chunk when available
+        
+        Products this vendor came to supply earlier in the chunk are left
+        out, as the name index query leaves out those it supplied before.
         
-        # Try to find by vendor product ID
-        if product_data.get('vendor_product_id'):
-            vendor_info = self.env['product.vendor.info'].search([
+        :param product_data: Product data dictionary
+        :return: Tuple (product.template record, similarity)
+        """
+        NameSignature = self.env['product.name.signature']
+        entry = (product_data['name'], product_data.get('brand'))
+        candidates = self._name_match_cache.get(entry) if self._name_match_cache is not None else None
+        if candidates is None:
+            return NameSignature._find_similar_product(*entry, self.vendor.id, self.vendor.name_match_threshold)
+        for product_tmpl_id, score in candidates:
+            if product_tmpl_id not in self._supplied_template_ids:
+                return self.env['product.template'].browse(product_tmpl_id), score
+        return self.env['product.template'], 0.0
+    
+    @staticmethod
+    def _normalize_match_value(key, value):
+        """
+        :param key: Match key (see MATCH_KEYS)
+        :param value: Value sent by the vendor
+        :return: Value as stored in the catalog, or None
+        """
+        if value in (None, False):
+            return None
+        value = str(value).strip()
+        if key == 'barcode':
+            # Barcodes that are not valid GTINs are still matched as sent
+            value = canonical_gtin(value) or value
+        return value or None
+    
+    def _search_matches(self, key, values):
+        """
+        Look up many values of one match key at once
+        
+        :param key: Match key (see MATCH_KEYS)
+        :param values: List of normalized values
+        :return: Dictionary {value: (product.template, product.product)}
+        """
+        matches = {}
+        if key == 'vendor_product_id':
+            vendor_infos = self.env['product.vendor.info'].search_fetch([
                 ('vendor_id', '=', self.vendor.id),
-                ('vendor_product_id', '=', product_data['vendor_product_id'])
-            ], limit=1)
-            if vendor_info:
-                return vendor_info.product_tmpl_id
+                ('vendor_product_id', 'in', values),
+            ], ['vendor_product_id', 'product_tmpl_id', 'product_id'], order='id')
+            for vendor_info in vendor_infos:
+                matches.setdefault(vendor_info.vendor_product_id,
+                                   (vendor_info.product_tmpl_id, vendor_info.product_id))
+        elif key == 'barcode':
+            gtins = [value for value in values if canonical_gtin(value) == value]
+            others = [value for value in values if canonical_gtin(value) != value]
+            if gtins:
+                variants = self.env['product.product'].search_fetch(
+                    [('gtin', 'in', gtins)], ['gtin', 'product_tmpl_id'], order='id')
+                for variant in variants:
+                    matches.setdefault(variant.gtin, (variant.product_tmpl_id, variant))
+                # Items carried by another vendor but without a barcode in the catalog
+                missing = [gtin for gtin in gtins if gtin not in matches]
+                if missing:
+                    vendor_infos = self.env['product.vendor.info'].search_fetch(
+                        [('vendor_gtin', 'in', missing)], ['vendor_gtin', 'product_tmpl_id', 'product_id'],
+                        order='id')
+                    for vendor_info in vendor_infos:
+                        matches.setdefault(vendor_info.vendor_gtin,
+                                           (vendor_info.product_tmpl_id, vendor_info.product_id))
+            if others:
+                variants = self.env['product.product'].search_fetch(
+                    [('barcode', 'in', others)], ['barcode', 'product_tmpl_id'], order='id')
+                for variant in variants:
+                    matches.setdefault(variant.barcode, (variant.product_tmpl_id, variant))
+        else:
+            variants = self.env['product.product'].search_fetch(
+                [(key, 'in', values)], [key, 'product_tmpl_id'], order='id')
+            for variant in variants:
+                matches.setdefault(variant[key], (variant.product_tmpl_id, variant))
+        return matches
+    
+    def _prefetch_matches(self, product_data_list):
+        """
+        Match a chunk of vendor products with one query per match key, look
+        up near-duplicate names of the unmatched ones in one query, then
+        read this vendor's rows of all the matched products in one query
         
-        return None
+        :param product_data_list: List of product data dictionaries
+        """
+        self._match_cache = {}
+        for key in self.MATCH_KEYS:
+            values = {self._normalize_match_value(key, product_data.get(key)) for product_data in product_data_list}
+            values.discard(None)
+            self._match_cache[key] = self._search_matches(key, list(values)) if values else {}
+        
+        self._name_match_cache = {}
+        self._supplied_template_ids = set()
+        if self.vendor.name_match_threshold:
+            entries = list({
+                (product_data['name'], product_data.get('brand'))
+                for product_data in product_data_list
+                if product_data.get('name') and not self._match_by_keys(product_data)
+            })
+            if entries:
+                self._name_match_cache = dict(zip(entries, self.env['product.name.signature']._find_similar_products(
+                    entries, self.vendor.id, self.vendor.name_match_threshold)))
+        
+        template_ids = {product.id for matches in self._match_cache.values() for product, dummy in matches.values()}
+        self._vendor_info_cache = self._search_vendor_infos(template_ids)
+        # Name candidates are products this vendor does not supply: no row to read
+        VendorInfo = self.env['product.vendor.info']
+        for candidates in self._name_match_cache.values():
+            for product_tmpl_id, dummy in candidates:
+                self._vendor_info_cache.setdefault(product_tmpl_id, VendorInfo)
+    
+    def _search_vendor_infos(self, template_ids):
+        """
+        :param template_ids: Set of product.template IDs
+        :return: Dictionary {template ID: product.vendor.info records of this
+                 vendor}, with an empty recordset for templates without any
+        """
+        VendorInfo = self.env['product.vendor.info']
+        vendor_infos = {template_id: VendorInfo for template_id in template_ids}
+        if template_ids:
+            for vendor_info in VendorInfo.search_fetch([
+                ('product_tmpl_id', 'in', list(template_ids)),
+                ('vendor_id', '=', self.vendor.id),
+            ], ['product_tmpl_id', 'product_id']):
+                vendor_infos[vendor_info.product_tmpl_id.id] |= vendor_info
+        return vendor_infos
+    
+    def _get_vendor_infos(self, product):
+        """
+        :param product: product.template record
+        :return: This vendor's product.vendor.info records of the product,
+                 from the chunk's prefetched rows when available
+        """
+        if self._vendor_info_cache is None:
+            return self._search_vendor_infos({product.id})[product.id]
+        if product.id not in self._vendor_info_cache:
+            # Matched by name, outside the prefetched matches
+            self._vendor_info_cache.update(self._search_vendor_infos({product.id}))
+        return self._vendor_info_cache[product.id]
+    
+    def _remember_match(self, product_data, product, variant):
+        """
+        Add a product created during the chunk to the prefetched matches, so
+        a later row with the same keys updates it instead of duplicating it
+        """
+        if self._match_cache is None:
+            return
+        for key in self.MATCH_KEYS:
+            value = self._normalize_match_value(key, product_data.get(key))
+            if value:
+                self._match_cache[key].setdefault(value, (product, variant))
     
     def _create_product(self, product_data):
         """
@@ -165,43 +850,57 @@ class BaseAdapter:
         
         return product
     
-    def _update_product(self, product, product_data):
+    def _index_product_names(self):
+        """
+        :return: True if some vendor uses name matching, so new products must
+                 be added to the name similarity index
+        """
+        if self._name_matching_enabled is None:
+            self._name_matching_enabled = bool(self.env['vendor.config'].search_count([
+                ('name_match_threshold', '>', 0),
+            ], limit=1))
+        return self._name_matching_enabled
+    
+    def _update_product(self, product, product_data, variant=None):
         """
         Update existing product
         
         :param product: product.template record
         :param product_data: Product data dictionary
+        :param variant: Matched product.product record (optional)
         """
-        # Update vendor info
-        vendor_info = self.env['product.vendor.info'].search([
-            ('product_tmpl_id', '=', product.id),
-            ('vendor_id', '=', self.vendor.id)
-        ], limit=1)
+        # Update vendor info, preferring the row of the matched variant
+        vendor_infos = self._get_vendor_infos(product)
+        vendor_info = vendor_infos[:1]
+        if variant:
+            vendor_info = vendor_infos.filtered(lambda v: v.product_id == variant)[:1] or vendor_info
         
         if vendor_info:
             self._update_vendor_info(vendor_info, product_data)
         else:
-            self._create_vendor_info(product, product_data)
+            self._create_vendor_info(product, product_data, variant=variant)
         
         # Update product price if configured
         if self.vendor.auto_update_prices and product_data.get('list_price'):
             product.list_price = product_data['list_price']
         
         # Update last sync date
-        product.last_vendor_sync = self.env['ir.fields'].Datetime.now()
+        product.last_vendor_sync = fields.Datetime.now()
     
-    def _create_vendor_info(self, product, product_data):
+    def _create_vendor_info(self, product, product_data, variant=None):
         """
         Create vendor info record
         
         :param product: product.template record
         :param product_data: Product data dictionary
+        :param variant: Matched product.product record (optional)
         :return: product.vendor.info record
         """
         vendor_cost = product_data.get('vendor_cost', product_data.get('standard_price', 0.0))
         
         vals = {
             'product_tmpl_id': product.id,
+            'product_id': variant.id if variant else False,
             'vendor_id': self.vendor.id,
             'vendor_product_id': product_data.get('vendor_product_id'),
             'vendor_product_url': product_data.get('vendor_product_url'),
@@ -215,11 +914,17 @@ class BaseAdapter:
             'vendor_weight': product_data.get('weight', 0.0),
             'vendor_qty_available': product_data.get('qty_available', 0.0),
             'vendor_stock_status': product_data.get('stock_status', 'in_stock'),
-            'last_sync_date': self.env['ir.fields'].Datetime.now(),
+            'content_hash': product_data.get('content_hash'),
+            'last_seen_log_id': self.snapshot_log.id if self.snapshot_log and not self.is_replay else False,
+            'last_sync_date': fields.Datetime.now(),
             'sync_status': 'synced',
         }
         
-        return self.env['product.vendor.info'].create(vals)
+        vendor_info = self.env['product.vendor.info'].create(vals)
+        if self._vendor_info_cache is not None:
+            # A product missing from the chunk's rows was created in this chunk
+            self._vendor_info_cache[product.id] = self._vendor_info_cache.get(product.id, vendor_info.browse()) | vendor_info
+        return vendor_info
     
     def _update_vendor_info(self, vendor_info, product_data):
         """
@@ -236,7 +941,8 @@ class BaseAdapter:
             'vendor_description': product_data.get('description'),
             'vendor_qty_available': product_data.get('qty_available', 0.0),
             'vendor_stock_status': product_data.get('stock_status', 'in_stock'),
-            'last_sync_date': self.env['ir.fields'].Datetime.now(),
+            'content_hash': product_data.get('content_hash'),
+            'last_sync_date': fields.Datetime.now(),
             'sync_status': 'synced',
         }
         
@@ -250,10 +956,10 @@ class BaseAdapter:
         :param image_url: URL of product image
         """
         try:
-            import requests
             import base64
             
-            response = requests.get(image_url, timeout=10)
+            with self.metrics.phase('image'):
+                response = self._http_get(image_url, timeout=10)
             if response.status_code == 200:
                 image_data = base64.b64encode(response.content)
                 product.image_1920 = image_data
@@ -304,4 +1010,6 @@ class BaseAdapter:
         :return: Calculated sale price
         """
         price_tier_model = self.env['product.price.tier']
-        return price_tier_model.calculate_price_for_product(cost, None, self.vendor)
+        if self._price_tiers is None:
+            self._price_tiers = price_tier_model._get_active_tiers()
+        return price_tier_model.calculate_price_for_product(cost, None, self.vendor, tiers=self._price_tiers)
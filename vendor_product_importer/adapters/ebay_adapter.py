@@ -20,8 +20,8 @@ class EbayAdapter(BaseAdapter):
     You can get credentials at: https://developer.ebay.com/
     """
     
-    def __init__(self, vendor_config):
-        super().__init__(vendor_config)
+    def __init__(self, vendor_config, import_log=None):
+        super().__init__(vendor_config, import_log)
         self.app_id = vendor_config.api_key
         self.cert_id = vendor_config.api_secret
         self.site_id = vendor_config.ebay_site_id or '0'
@@ -47,47 +47,18 @@ class EbayAdapter(BaseAdapter):
     
     def import_products(self):
         """Import products from eBay"""
-        created_count = 0
-        updated_count = 0
-        failed_count = 0
-        
         try:
             _logger.info('Starting eBay product import for site: %s', self.site_id)
             
-            products = self.fetch_products()
-            
-            for raw_product in products:
-                try:
-                    product_data = self.parse_product_data(raw_product)
-                    
-                    if not self._apply_filters(product_data):
-                        continue
-                    
-                    if product_data.get('vendor_cost'):
-                        product_data['list_price'] = self._calculate_sale_price(product_data['vendor_cost'])
-                    
-                    product, created, updated = self.create_or_update_product(product_data)
-                    
-                    if created:
-                        created_count += 1
-                    elif updated:
-                        updated_count += 1
-                        
-                except Exception as e:
-                    _logger.error('Failed to import eBay product: %s', str(e))
-                    failed_count += 1
+            result = self._import_product_stream(self.iter_products(self.resume_cursor))
             
-            message = _('eBay import completed: %d created, %d updated, %d failed') % (
-                created_count, updated_count, failed_count
+            message = _('eBay import completed: %d created, %d updated, %d skipped, %d failed') % (
+                result['created'], result['updated'], result['skipped'], result['failed']
             )
             _logger.info(message)
             
-            return {
-                'created': created_count,
-                'updated': updated_count,
-                'failed': failed_count,
-                'message': message,
-            }
+            result['message'] = message
+            return result
             
         except Exception as e:
             error_msg = _('eBay import failed: %s') % str(e)
@@ -119,6 +90,9 @@ class EbayAdapter(BaseAdapter):
             _logger.error('Error parsing eBay product data: %s', str(e))
             raise
     
+    def _get_raw_product_key(self, raw_product):
+        return raw_product.get('itemId')
+    
     def sync_product(self, product_vendor_info):
         """Sync single product from eBay"""
         try:
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import gzip
+import io
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from xml.etree import ElementTree
+from .base_adapter import BaseAdapter
+from odoo import _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+
+
+class FeedAdapter(BaseAdapter):
+    """
+    Flat file feed adapter (CSV, XLSX, XML)
+    
+    The feed is read from an uploaded attachment, a local path or an HTTP(S)
+    URL, optionally gzip or zip compressed, and streamed row by row: plain
+    CSV files are memory-mapped, XLSX sheets are read in read-only mode and
+    XML elements are cleared once parsed, so memory use does not grow with
+    the size of the feed.
+    
+    Feed columns are converted to product fields with the vendor's product
+    mappings, one column at a time per chunk.
+    """
+    
+    # Rows fetch_products() may load at once; imports stream the feed instead
+    FETCH_LIMIT = 10000
+    
+    def __init__(self, vendor_config, import_log=None):
+        super().__init__(vendor_config, import_log)
+        self.feed_format = vendor_config.feed_format or 'csv'
+        self.feed_attachment = vendor_config.feed_attachment_id
+        # Only administrators can read and set the path (it can point to server files)
+        self.feed_path = vendor_config.sudo().feed_path
+        self.delimiter = vendor_config.feed_csv_delimiter or ','
+        self.encoding = vendor_config.feed_encoding or 'utf-8'
+        self.item_tag = vendor_config.feed_xml_item_tag or 'product'
+        self.id_column = vendor_config.feed_id_column
+    
+    @property
+    def supports_sharding(self):
+        """
+        Shards of a stored or local feed each read the file; a remote feed
+        would be downloaded once per shard
+        """
+        return bool(self.feed_attachment) or not (self.feed_path or '').startswith(('http://', 'https://'))
+    
+    def test_connection(self):
+        """Test that the feed can be opened and has rows"""
+        try:
+            for dummy in self._iter_rows():
+                return True
+            _logger.warning('Feed of vendor %s is empty', self.vendor.name)
+            return False
+        except Exception as e:
+            _logger.error('Feed connection test failed: %s', str(e))
+            return False
+    
+    def import_products(self):
+        """Import products from the feed"""
+        try:
+            _logger.info('Starting %s feed import for vendor: %s', self.feed_format.upper(), self.vendor.name)
+            
+            result = self._import_product_stream(self.iter_products(self.resume_cursor))
+            
+            message = _('Feed import completed: %d created, %d updated, %d skipped, %d failed') % (
+                result['created'], result['updated'], result['skipped'], result['failed']
+            )
+            _logger.info(message)
+            
+            result['message'] = message
+            return result
+        
+        except Exception as e:
+            error_msg = _('Feed import failed: %s') % str(e)
+            _logger.error(error_msg)
+            raise UserError(error_msg)
+    
+    def fetch_products(self):
+        """
+        Read all rows of a small feed
+        
+        Large feeds must be streamed with iter_products().
+        
+        :raise UserError: if the feed has more than FETCH_LIMIT rows
+        """
+        products = []
+        for dummy, raw_product in self.iter_products():
+            if len(products) >= self.FETCH_LIMIT:
+                raise UserError(_('The feed of %s has more than %d rows and cannot be loaded at once.')
+                                % (self.vendor.name, self.FETCH_LIMIT))
+            products.append(raw_product)
+        return products
+    
+    def iter_products(self, cursor=None):
+        """
+        Stream the feed rows
+        
+        The cursor is the row number, so a resumed import skips the rows it
+        has already processed without converting them.
+        """
+        offset = int(cursor or 0)
+        for index, row in enumerate(self._iter_rows()):
+            if index < offset:
+                continue
+            if not self._in_shard(self._get_raw_product_key(row) or str(index)):
+                continue
+            yield str(index + 1), row
+    
+    def _get_raw_product_key(self, raw_product):
+        return self.id_column and raw_product.get(self.id_column) or None
+    
+    # -------------------------------------------------------------------------
+    # Parsing
+    # -------------------------------------------------------------------------
+    
+    def parse_product_data(self, raw_data):
+        """Parse a single feed row into standardized format"""
+        product_data, error = self._parse_products([raw_data])[0]
+        if error:
+            raise error
+        return product_data
+    
+    def _parse_products(self, raw_products):
+        """
+        Convert a chunk of feed rows with the vendor's product mappings
+        
+        Without mappings, columns already named like product fields are used
+        as they are.
+        """
+        Mapping = self.env['product.field.mapping']
+        if Mapping.get_mappings_for_vendor(self.vendor.id):
+            vals_list = Mapping.map_vendor_data_batch(self.vendor.id, raw_products)
+        else:
+            vals_list = [dict(row) for row in raw_products]
+        
+        parsed_products = []
+        for row, vals in zip(raw_products, vals_list):
+            if vals is None:
+                parsed_products.append((None, ValueError(_('Row rejected by a required product mapping'))))
+                continue
+            try:
+                parsed_products.append((self._prepare_product_data(row, vals), None))
+            except Exception as e:
+                parsed_products.append((None, e))
+        return parsed_products
+    
+    def _prepare_product_data(self, row, vals):
+        """
+        :param row: Feed row
+        :param vals: Product field values mapped from the row
+        :return: Dictionary with standardized product data
+        """
+        vendor_cost = float(vals.get('vendor_cost') or vals.get('standard_price') or 0.0)
+        qty = vals.get('qty_available')
+        product_data = dict(vals)
+        product_data.update({
+            'vendor_product_id': self._get_raw_product_key(row) or vals.get('vendor_product_id')
+                                 or vals.get('default_code') or vals.get('barcode'),
+            'name': vals.get('name') or _('Unknown Product'),
+            'vendor_cost': vendor_cost,
+            'standard_price': vendor_cost,
+        })
+        if qty not in (None, ''):
+            product_data['qty_available'] = float(qty)
+            product_data.setdefault('stock_status', self._get_stock_status(product_data['qty_available']))
+        return product_data
+    
+    def sync_product(self, product_vendor_info):
+        """Feed vendors are refreshed by importing the feed, not per product"""
+        _logger.info('Feed vendor %s cannot sync a single product; import the feed instead', self.vendor.name)
+        return False
+    
+    # -------------------------------------------------------------------------
+    # Streaming readers
+    # -------------------------------------------------------------------------
+    
+    def _iter_rows(self):
+        """
+        :return: Iterator of feed rows as dictionaries {column: value}
+        """
+        with self._open_feed() as path:
+            with self._open_payload(path) as (stream, mapped):
+                if self.feed_format == 'xlsx':
+                    yield from self._iter_xlsx_rows(stream)
+                elif self.feed_format == 'xml':
+                    yield from self._iter_xml_rows(stream)
+                else:
+                    yield from self._iter_csv_rows(stream, mapped)
+    
+    @contextmanager
+    def _open_feed(self):
+        """
+        Locate the feed as a local file, downloading it first if remote
+        
+        :return: Context manager yielding a file path
+        """
+        attachment = self.feed_attachment
+        if attachment:
+            if attachment.store_fname:
+                yield attachment._full_path(attachment.store_fname)
+                return
+            # Attachment stored in the database: spill it to a temporary file
+            with tempfile.NamedTemporaryFile(suffix='.feed') as tmp:
+                tmp.write(attachment.raw or b'')
+                tmp.flush()
+                yield tmp.name
+            return
+        
+        if not self.feed_path:
+            raise UserError(_('No feed file or path is configured for vendor %s.') % self.vendor.name)
+        
+        if not self.feed_path.startswith(('http://', 'https://')):
+            yield self.vendor._get_feed_local_path()
+            return
+        
+        import requests
+        
+        with tempfile.NamedTemporaryFile(suffix='.feed') as tmp:
+            with self.metrics.phase('fetch'):
+                with requests.get(self.feed_path, stream=True, timeout=60) as response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    shutil.copyfileobj(response.raw, tmp, 1024 * 1024)
+                tmp.flush()
+                self.metrics.count_http(tmp.tell())
+            yield tmp.name
+    
+    @contextmanager
+    def _open_payload(self, path):
+        """
+        Open the feed, decompressing gzip and zip archives on the fly
+        
+        :param path: Local path of the feed
+        :return: Context manager yielding (binary stream, is_mmap)
+        """
+        with open(path, 'rb') as feed_file:
+            magic = feed_file.read(4)
+            feed_file.seek(0)
+            
+            if magic.startswith(GZIP_MAGIC):
+                with gzip.GzipFile(fileobj=feed_file) as stream:
+                    yield stream, False
+            elif magic == ZIP_MAGIC and self.feed_format != 'xlsx':
+                with zipfile.ZipFile(feed_file) as archive:
+                    members = [info for info in archive.infolist() if not info.is_dir()]
+                    if not members:
+                        raise UserError(_('The feed archive is empty.'))
+                    with archive.open(members[0]) as stream:
+                        yield stream, False
+            elif self.feed_format == 'csv' and os.fstat(feed_file.fileno()).st_size:
+                with mmap.mmap(feed_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    yield mapped, True
+            else:
+                yield feed_file, False
+    
+    def _iter_csv_rows(self, stream, mapped=False):
+        if mapped:
+            # Lines are decoded one at a time from the mapped file
+            lines = (line.decode(self.encoding) for line in iter(stream.readline, b''))
+        else:
+            lines = io.TextIOWrapper(stream, encoding=self.encoding, newline='')
+        
+        for row in csv.DictReader(lines, delimiter=self.delimiter):
+            yield {key.strip(): value for key, value in row.items() if key}
+    
+    def _iter_xlsx_rows(self, stream):
+        try:
+            import openpyxl
+        except ImportError:
+            raise UserError(_('Reading XLSX feeds requires the openpyxl Python library.'))
+        
+        if not stream.seekable():
+            # openpyxl needs random access to the zip container
+            spooled = tempfile.TemporaryFile()
+            shutil.copyfileobj(stream, spooled, 1024 * 1024)
+            spooled.seek(0)
+            stream = spooled
+        
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                return
+            columns = [str(cell).strip() if cell is not None else '' for cell in header]
+            for values in rows:
+                if not any(value is not None for value in values):
+                    continue
+                yield {
+                    column: ('' if value is None else str(value))
+                    for column, value in zip(columns, values) if column
+                }
+        finally:
+            workbook.close()
+    
+    def _iter_xml_rows(self, stream):
+        # Open elements, to detach each finished one from its parent: clearing
+        # the root alone keeps every item of a nested <catalog><products> feed
+        parents = []
+        item_depth = 0
+        for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+            is_item = self._local_name(element.tag) == self.item_tag
+            if event == 'start':
+                parents.append(element)
+                item_depth += is_item
+                continue
+            
+            parents.pop()
+            if is_item:
+                item_depth -= 1
+                row = dict(element.attrib)
+                for child in element:
+                    row[self._local_name(child.tag)] = (child.text or '').strip()
+                yield row
+            elif item_depth:
+                # Field of an item: read when the item ends
+                continue
+            
+            # Free parsed elements so memory stays constant on large feeds
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+    
+    @staticmethod
+    def _local_name(tag):
+        return tag.rsplit('}', 1)[-1]
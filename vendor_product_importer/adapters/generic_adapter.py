@@ -16,8 +16,11 @@ class GenericAdapter(BaseAdapter):
     Configure the selectors in the vendor configuration.
     """
     
-    def __init__(self, vendor_config):
-        super().__init__(vendor_config)
+    # Every shard reads the listing page, but only fetches its own product pages
+    supports_sharding = True
+    
+    def __init__(self, vendor_config, import_log=None):
+        super().__init__(vendor_config, import_log)
         self.product_list_url = vendor_config.product_list_url
         self.product_list_selector = vendor_config.product_list_selector
         self.product_link_selector = vendor_config.product_link_selector
@@ -37,8 +40,7 @@ class GenericAdapter(BaseAdapter):
             if not self.product_list_url:
                 raise UserError(_('Product list URL is not configured.'))
             
-            import requests
-            response = requests.get(self.product_list_url, timeout=10)
+            response = self._http_get(self.product_list_url, timeout=10)
             
             if response.status_code == 200:
                 _logger.info('Successfully connected to: %s', self.product_list_url)
@@ -53,47 +55,18 @@ class GenericAdapter(BaseAdapter):
     
     def import_products(self):
         """Import products from generic website"""
-        created_count = 0
-        updated_count = 0
-        failed_count = 0
-        
         try:
             _logger.info('Starting generic import from: %s', self.product_list_url)
             
-            products = self.fetch_products()
-            
-            for raw_product in products:
-                try:
-                    product_data = self.parse_product_data(raw_product)
-                    
-                    if not self._apply_filters(product_data):
-                        continue
-                    
-                    if product_data.get('vendor_cost'):
-                        product_data['list_price'] = self._calculate_sale_price(product_data['vendor_cost'])
-                    
-                    product, created, updated = self.create_or_update_product(product_data)
-                    
-                    if created:
-                        created_count += 1
-                    elif updated:
-                        updated_count += 1
-                        
-                except Exception as e:
-                    _logger.error('Failed to import product: %s', str(e))
-                    failed_count += 1
+            result = self._import_product_stream(self.iter_products(self.resume_cursor))
             
-            message = _('Generic import completed: %d created, %d updated, %d failed') % (
-                created_count, updated_count, failed_count
+            message = _('Generic import completed: %d created, %d updated, %d skipped, %d failed') % (
+                result['created'], result['updated'], result['skipped'], result['failed']
             )
             _logger.info(message)
             
-            return {
-                'created': created_count,
-                'updated': updated_count,
-                'failed': failed_count,
-                'message': message,
-            }
+            result['message'] = message
+            return result
             
         except Exception as e:
             error_msg = _('Generic import failed: %s') % str(e)
@@ -102,67 +75,118 @@ class GenericAdapter(BaseAdapter):
     
     def fetch_products(self):
         """Fetch products from website using BeautifulSoup"""
+        return [raw_product for dummy, raw_product in self.iter_products()]
+    
+    def iter_products(self, cursor=None):
+        """
+        Iterate over scraped products, fetching detail pages lazily
+        
+        The cursor is the position on the listing page, so a resumed import
+        only fetches the detail pages it has not processed yet.
+        """
+        offset = int(cursor or 0)
         try:
-            import requests
-            from bs4 import BeautifulSoup
-            
-            products = []
-            
-            # Fetch product list page
-            response = requests.get(self.product_list_url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'lxml')
-            
-            # Find all product items
-            if self.product_list_selector:
-                product_items = soup.select(self.product_list_selector)
-            else:
-                _logger.warning('No product list selector configured')
-                return []
-            
-            _logger.info('Found %d products on listing page', len(product_items))
-            
-            # Extract product URLs
-            for item in product_items:
-                try:
-                    if self.product_link_selector:
-                        link_element = item.select_one(self.product_link_selector)
-                        if link_element and link_element.get('href'):
-                            product_url = link_element['href']
-                            
-                            # Make absolute URL if relative
-                            if not product_url.startswith('http'):
-                                from urllib.parse import urljoin
-                                product_url = urljoin(self.product_list_url, product_url)
-                            
-                            # Fetch product detail page
-                            product_data = self._fetch_product_details(product_url)
-                            if product_data:
-                                products.append(product_data)
-                    else:
-                        # Try to extract data from listing page itself
-                        product_data = self._extract_from_element(item)
-                        if product_data:
-                            products.append(product_data)
-                            
-                except Exception as e:
-                    _logger.error('Error processing product item: %s', str(e))
-                    continue
-            
-            return products
-            
+            product_items = self._fetch_listing_items()
         except Exception as e:
             _logger.error('Error fetching products: %s', str(e))
             raise
+        
+        for index, item in enumerate(product_items):
+            if index < offset:
+                continue
+            reference = self._get_listing_item_url(item) or str(index)
+            if not self._in_shard(reference):
+                continue
+            try:
+                product_data = self._fetch_listing_item(item)
+            except Exception as e:
+                _logger.error('Error processing product item: %s', str(e))
+                self._report_unfetched(reference, str(e))
+                continue
+            if product_data:
+                yield str(index + 1), product_data
+            else:
+                self._report_unfetched(reference, _('Product page could not be fetched'))
+    
+    def _fetch_listing_items(self):
+        """Fetch the product list page and return its product elements"""
+        from bs4 import BeautifulSoup
+        
+        # Fetch product list page
+        response = self._http_get(self.product_list_url, timeout=30)
+        response.raise_for_status()
+        
+        soup = BeautifulSoup(response.content, 'lxml')
+        
+        # Find all product items
+        if not self.product_list_selector:
+            _logger.warning('No product list selector configured')
+            return []
+        
+        product_items = soup.select(self.product_list_selector)
+        _logger.info('Found %d products on listing page', len(product_items))
+        return product_items
+    
+    def _fetch_listing_item(self, item):
+        """
+        Get raw product data for one element of the listing page
+        
+        :param item: Product element of the listing page
+        :return: Raw product data or None
+        """
+        if self.product_link_selector:
+            product_url = self._get_listing_item_url(item)
+            if product_url:
+                # Fetch product detail page
+                return self._fetch_product_details(product_url)
+            return None
+        
+        # Try to extract data from listing page itself
+        return self._extract_from_element(item)
+    
+    def _serialize_raw_product(self, raw_product):
+        """Record the HTML of the page (or listing element) and its URL"""
+        if raw_product.get('soup') is not None:
+            return {'url': raw_product.get('url'), 'html': str(raw_product['soup'])}
+        return {'url': raw_product.get('url'), 'element_html': str(raw_product.get('element') or '')}
+    
+    def _deserialize_raw_product(self, data):
+        """Parse the recorded HTML again, as _fetch_product_details() does"""
+        from bs4 import BeautifulSoup
+        
+        if 'html' in data:
+            return {'url': data.get('url'), 'soup': BeautifulSoup(data['html'], 'lxml')}
+        # A listing element alone: html.parser keeps the fragment as it is
+        element = BeautifulSoup(data.get('element_html') or '', 'html.parser').find()
+        return {'url': data.get('url'), 'element': element}
+    
+    def _get_listing_item_url(self, item):
+        """
+        Get the absolute detail page URL of a listing page element
+        
+        :param item: Product element of the listing page
+        :return: URL or None
+        """
+        if not self.product_link_selector:
+            return None
+        link_element = item.select_one(self.product_link_selector)
+        if not link_element or not link_element.get('href'):
+            return None
+        
+        product_url = link_element['href']
+        
+        # Make absolute URL if relative
+        if not product_url.startswith('http'):
+            from urllib.parse import urljoin
+            product_url = urljoin(self.product_list_url, product_url)
+        return product_url
     
     def _fetch_product_details(self, url):
         """Fetch and parse product detail page"""
         try:
-            import requests
             from bs4 import BeautifulSoup
             
-            response = requests.get(url, timeout=30)
+            response = self._http_get(url, timeout=30)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'lxml')
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class ImportMetrics:
+    """
+    Per-phase timing and throughput counters for one import run
+
+    Phases are timed exclusively: time spent in a nested phase (e.g. image
+    download inside write) is not counted again in the enclosing phase.
+    Latencies are kept in a bounded reservoir sample per phase so p50/p95
+    stay cheap on very large runs.
+    """
+
+    PHASES = ('fetch', 'parse', 'match', 'write', 'pricing', 'image')
+    SAMPLE_SIZE = 2048
+
+    def __init__(self, cr=None):
+        """
+        Initialize counters
+
+        :param cr: Database cursor whose queries are counted (optional)
+        """
+        self.cr = cr
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.samples = defaultdict(list)
+        self.http_requests = 0
+        self.http_bytes = 0
+        self.rows = 0
+        self._stack = []
+        self._random = random.Random(0)
+        self._started = time.perf_counter()
+        self._sql_start = self._sql_count()
+
+    def _sql_count(self):
+        return getattr(self.cr, 'sql_log_count', 0) if self.cr is not None else 0
+
+    @contextmanager
+    def phase(self, name):
+        """Time a pipeline phase"""
+        frame = [time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+            self.record(name, elapsed - frame[1])
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def record(self, name, duration):
+        """Record one phase duration in seconds"""
+        self.totals[name] += duration
+        self.counts[name] += 1
+        samples = self.samples[name]
+        if len(samples) < self.SAMPLE_SIZE:
+            samples.append(duration)
+        else:
+            index = self._random.randrange(self.counts[name])
+            if index < self.SAMPLE_SIZE:
+                samples[index] = duration
+
+    def count_http(self, nbytes):
+        """Count one HTTP request and its response size"""
+        self.http_requests += 1
+        self.http_bytes += nbytes or 0
+
+    def count_row(self):
+        """Count one processed product"""
+        self.rows += 1
+
+    @staticmethod
+    def _percentile(samples, fraction):
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    def summary(self):
+        """
+        Compact breakdown of the run
+
+        :return: Dictionary with totals, throughput and per-phase statistics
+                 (durations in milliseconds)
+        """
+        elapsed = time.perf_counter() - self._started
+        phases = {}
+        order = {name: index for index, name in enumerate(self.PHASES)}
+        for name in sorted(self.totals, key=lambda n: (order.get(n, len(order)), n)):
+            phases[name] = {
+                'count': self.counts[name],
+                'total_ms': round(self.totals[name] * 1000.0, 1),
+                'p50_ms': round(self._percentile(self.samples[name], 0.50) * 1000.0, 2),
+                'p95_ms': round(self._percentile(self.samples[name], 0.95) * 1000.0, 2),
+            }
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'rows': self.rows,
+            'rows_per_second': round(self.rows / elapsed, 2) if elapsed > 0 else 0.0,
+            'http_requests': self.http_requests,
+            'http_bytes': self.http_bytes,
+            'sql_queries': self._sql_count() - self._sql_start,
+            'phases': phases,
+        }
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class ImportLogLineWriter:
+    """
+    Buffered writer for vendor.import.log.line
+
+    Lines are accumulated in memory and written in large batches, so a full
+    per-product audit trail does not cost one INSERT per product.
+    """
+
+    DEFAULT_BUFFER_SIZE = 1000
+
+    def __init__(self, import_log, buffer_size=None, use_copy=None):
+        """
+        Initialize writer for an import log
+
+        :param import_log: vendor.import.log record, or None to disable logging
+        :param buffer_size: Number of lines kept in memory before flushing
+        :param use_copy: Write lines with COPY instead of ORM create
+        """
+        self.import_log = import_log
+        self.buffer = []
+
+        if import_log:
+            ICP = import_log.env['ir.config_parameter'].sudo()
+            if buffer_size is None:
+                buffer_size = int(ICP.get_param('vendor_product_importer.log_line_buffer_size',
+                                                self.DEFAULT_BUFFER_SIZE))
+            if use_copy is None:
+                use_copy = ICP.get_param('vendor_product_importer.log_line_use_copy', 'False') == 'True'
+
+        self.buffer_size = max(buffer_size or self.DEFAULT_BUFFER_SIZE, 1)
+        self.use_copy = bool(use_copy)
+
+    def add(self, state, product_data=None, product=None, error=None):
+        """
+        Queue a log line
+
+        :param state: Line state (created, updated, skipped, failed)
+        :param product_data: Standardized product data dictionary
+        :param product: product.template record (optional)
+        :param error: Error message (optional)
+        """
+        if not self.import_log:
+            return
+
+        product_data = product_data or {}
+        self.buffer.append({
+            'import_log_id': self.import_log.id,
+            'product_tmpl_id': product.id if product else False,
+            'vendor_product_id': product_data.get('vendor_product_id') or False,
+            'vendor_product_name': product_data.get('name') or False,
+            'vendor_sku': product_data.get('vendor_sku', product_data.get('default_code')) or False,
+            'state': state,
+            'vendor_cost': product_data.get('vendor_cost') or 0.0,
+            'calculated_price': product_data.get('list_price') or 0.0,
+            'error_message': error or False,
+        })
+
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered lines"""
+        if not self.buffer:
+            return
+
+        vals_list, self.buffer = self.buffer, []
+        LogLine = self.import_log.env['vendor.import.log.line'].sudo()
+        if self.use_copy:
+            LogLine._copy_insert(vals_list)
+        else:
+            LogLine.create(vals_list)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import tracemalloc
+
+_logger = logging.getLogger(__name__)
+
+
+class ImportProfiler:
+    """
+    Deterministic CPU profiler plus tracemalloc for a single import run
+
+    Only instantiated when profiling was requested, so runs without it pay
+    nothing. The raw profile is kept in pstats format, which snakeviz,
+    gprof2dot and flameprof can turn into call graphs and flame graphs.
+    """
+
+    TRACEMALLOC_FRAMES = 10
+
+    def __init__(self, top_functions=40, top_allocations=25):
+        """
+        :param top_functions: Number of functions in the text report
+        :param top_allocations: Number of allocation sites in the text report
+        """
+        self.top_functions = top_functions
+        self.top_allocations = top_allocations
+        self.profile = cProfile.Profile()
+        self.snapshot = None
+        self.peak_memory = 0
+        self._owns_tracemalloc = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profile.disable()
+        self.snapshot = tracemalloc.take_snapshot()
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        return False
+
+    def get_pstats_data(self):
+        """
+        :return: Profile serialized exactly like pstats.Stats.dump_stats()
+        """
+        return marshal.dumps(pstats.Stats(self.profile).stats)
+
+    def get_report(self):
+        """
+        :return: Text report of the slowest functions and top memory allocators
+        """
+        output = io.StringIO()
+        output.write('Top functions by cumulative time\n')
+        output.write('================================\n')
+        stats = pstats.Stats(self.profile, stream=output)
+        stats.sort_stats('cumulative').print_stats(self.top_functions)
+
+        output.write('\nTop memory allocators (peak traced: %.1f MB)\n' % (self.peak_memory / (1024.0 * 1024.0)))
+        output.write('============================================\n')
+        if self.snapshot:
+            snapshot = self.snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            ])
+            for stat in snapshot.statistics('lineno')[:self.top_allocations]:
+                output.write('%s\n' % stat)
+        return output.getvalue()
+
+    def attach_to(self, import_log):
+        """
+        Store the profile and report on an import log
+
+        :param import_log: vendor.import.log record
+        """
+        try:
+            attachment = import_log.env['ir.attachment'].create({
+                'name': 'import_log_%s.prof' % import_log.id,
+                'raw': self.get_pstats_data(),
+                'mimetype': 'application/octet-stream',
+                'res_model': import_log._name,
+                'res_id': import_log.id,
+            })
+            import_log.write({
+                'profile_attachment_id': attachment.id,
+                'profile_report': self.get_report(),
+            })
+        except Exception as e:
+            _logger.error('Failed to store import profile for log %s: %s', import_log.id, str(e))
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import io
+import json
+import logging
+import shutil
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+
+
+def _dumps(raw_product):
+    """
+    :param raw_product: Raw product, as returned by the adapter's _serialize_raw_product()
+    :return: JSON (bytes)
+    :raise TypeError: if the raw product is not JSON data
+    """
+    try:
+        return json.dumps(raw_product, sort_keys=True).encode('utf-8')
+    except (TypeError, ValueError) as e:
+        raise TypeError('Raw product cannot be recorded (%s): its adapter must convert it to JSON data '
+                        'in _serialize_raw_product()' % e)
+
+
+@contextmanager
+def open_attachment(attachment):
+    """
+    Open the content of an attachment as a binary file
+
+    Attachments in the filestore are read from their file rather than
+    loaded in memory.
+
+    :param attachment: ir.attachment record (may be empty)
+    :return: Context manager yielding a binary file, or None without attachment
+    """
+    if not attachment:
+        yield None
+    elif attachment.store_fname:
+        with open(attachment._full_path(attachment.store_fname), 'rb') as stored:
+            yield stored
+    else:
+        yield io.BytesIO(attachment.raw or b'')
+
+
+class PayloadRecorder:
+    """
+    Record the raw payloads of an import run
+
+    Raw products and HTTP response bodies are stored in a zip archive under
+    the SHA-256 of their content, so identical payloads (repeated pages,
+    unchanged images) are stored once. A manifest keeps the order of the
+    products and the URL of each response, which is all PayloadReplay needs
+    to run the import again without network. The archive is written to a
+    temporary file while the import runs.
+
+    A raw product that is not JSON data stops the recording: it could not
+    be replayed faithfully, so no archive is stored for the run.
+    """
+
+    def __init__(self, previous=None):
+        """
+        :param previous: Archive of an earlier part of the same import (binary
+                         file), extended by this recording when the import resumes
+        """
+        self.file = tempfile.TemporaryFile(suffix='.zip')
+        self.archive = zipfile.ZipFile(self.file, 'w', zipfile.ZIP_DEFLATED)
+        self.manifest = {'products': [], 'responses': {}}
+        self.objects = set()
+        self.error = None
+        if previous:
+            with zipfile.ZipFile(previous) as old:
+                for name in old.namelist():
+                    if name == MANIFEST:
+                        self.manifest = json.loads(old.read(name))
+                        continue
+                    with old.open(name) as source, self.archive.open(name, 'w') as target:
+                        shutil.copyfileobj(source, target, 1024 * 1024)
+                    self.objects.add(name)
+
+    def _store(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        name = 'objects/%s' % digest
+        if name not in self.objects:
+            self.archive.writestr(name, data)
+            self.objects.add(name)
+        return digest
+
+    def record_products(self, products, serialize=None):
+        """
+        Record a stream of raw products while passing it through
+
+        :param products: Iterable of (cursor, raw_product) tuples
+        :param serialize: Function converting a raw product to JSON data
+                          (the adapter's _serialize_raw_product)
+        :return: The same stream
+        """
+        for cursor, raw_product in products:
+            if self.error is None:
+                try:
+                    data = _dumps(serialize(raw_product) if serialize else raw_product)
+                    self.manifest['products'].append([cursor, self._store(data)])
+                except TypeError as e:
+                    self.error = str(e)
+                    _logger.error('Payload recording stopped: %s', self.error)
+            yield cursor, raw_product
+
+    def record_response(self, url, content):
+        """
+        Record the body of an HTTP response
+
+        :param url: Requested URL
+        :param content: Response body (bytes)
+        """
+        if self.error is None:
+            self.manifest['responses'][url] = self._store(content or b'')
+
+    def get_archive(self):
+        """
+        :return: Recorded archive (bytes); the recorder cannot be used afterwards
+        """
+        self.archive.writestr(MANIFEST, json.dumps(self.manifest))
+        self.archive.close()
+        self.file.seek(0)
+        try:
+            return self.file.read()
+        finally:
+            self.file.close()
+
+    def attach_to(self, import_log):
+        """
+        Store the archive on an import log
+
+        :param import_log: vendor.import.log record
+        """
+        if self.error is not None:
+            self.archive.close()
+            self.file.close()
+            _logger.warning('No payloads stored for import log %s: %s', import_log.id, self.error)
+            return
+        try:
+            old_attachment = import_log.payload_attachment_id
+            attachment = import_log.env['ir.attachment'].create({
+                'name': 'import_log_%s_payloads.zip' % import_log.id,
+                'raw': self.get_archive(),
+                'mimetype': 'application/zip',
+                'res_model': import_log._name,
+                'res_id': import_log.id,
+            })
+            import_log.write({'payload_attachment_id': attachment.id})
+            old_attachment.unlink()
+            _logger.info('Recorded %d products and %d responses for import log %s',
+                         len(self.manifest['products']), len(self.manifest['responses']), import_log.id)
+        except Exception as e:
+            _logger.error('Failed to store recorded payloads for log %s: %s', import_log.id, str(e))
+
+
+class RecordedResponse:
+    """Minimal stand-in for requests.Response, built from a recorded body"""
+
+    def __init__(self, url, content, status_code=200):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError('%s replayed with status %s' % (self.url, self.status_code))
+
+
+class PayloadReplay:
+    """
+    Serve a recorded archive back to an adapter
+
+    Products are replayed in their recorded order and HTTP requests are
+    answered from the recorded responses; a URL that was not recorded gets
+    a 404 instead of going to the network.
+    """
+
+    def __init__(self, archive):
+        """
+        :param archive: Archive produced by PayloadRecorder (binary file, open
+                        for as long as the replay runs)
+        """
+        self.archive = zipfile.ZipFile(archive)
+        self.manifest = json.loads(self.archive.read(MANIFEST))
+
+    def _load(self, digest):
+        return self.archive.read('objects/%s' % digest)
+
+    def __len__(self):
+        return len(self.manifest['products'])
+
+    def iter_products(self, cursor=None):
+        """
+        :param cursor: Resume cursor; products up to and including it are skipped
+        :return: Iterator of (cursor, recorded data) tuples, turned back into
+                 raw products by the adapter's _deserialize_raw_product()
+        """
+        entries = self.manifest['products']
+        if cursor:
+            cursors = [entry[0] for entry in entries]
+            if cursor in cursors:
+                entries = entries[cursors.index(cursor) + 1:]
+        for product_cursor, digest in entries:
+            yield product_cursor, json.loads(self._load(digest))
+
+    def get(self, url):
+        """
+        :param url: Requested URL
+        :return: RecordedResponse
+        """
+        digest = self.manifest['responses'].get(url)
+        if digest is None:
+            _logger.warning('No recorded response for %s', url)
+            return RecordedResponse(url, b'', status_code=404)
+        return RecordedResponse(url, self._load(digest))
@@ -20,8 +20,8 @@ class ShopifyAdapter(BaseAdapter):
     You can get credentials at: https://shopify.dev/docs/admin-api/getting-started
     """
     
-    def __init__(self, vendor_config):
-        super().__init__(vendor_config)
+    def __init__(self, vendor_config, import_log=None):
+        super().__init__(vendor_config, import_log)
         self.store_name = vendor_config.shopify_store_name
         self.api_key = vendor_config.api_key
         self.api_password = vendor_config.api_secret
@@ -50,47 +50,18 @@ class ShopifyAdapter(BaseAdapter):
     
     def import_products(self):
         """Import products from Shopify"""
-        created_count = 0
-        updated_count = 0
-        failed_count = 0
-        
         try:
             _logger.info('Starting Shopify product import for store: %s', self.store_name)
             
-            products = self.fetch_products()
-            
-            for raw_product in products:
-                try:
-                    product_data = self.parse_product_data(raw_product)
-                    
-                    if not self._apply_filters(product_data):
-                        continue
-                    
-                    if product_data.get('vendor_cost'):
-                        product_data['list_price'] = self._calculate_sale_price(product_data['vendor_cost'])
-                    
-                    product, created, updated = self.create_or_update_product(product_data)
-                    
-                    if created:
-                        created_count += 1
-                    elif updated:
-                        updated_count += 1
-                        
-                except Exception as e:
-                    _logger.error('Failed to import Shopify product: %s', str(e))
-                    failed_count += 1
+            result = self._import_product_stream(self.iter_products(self.resume_cursor))
             
-            message = _('Shopify import completed: %d created, %d updated, %d failed') % (
-                created_count, updated_count, failed_count
+            message = _('Shopify import completed: %d created, %d updated, %d skipped, %d failed') % (
+                result['created'], result['updated'], result['skipped'], result['failed']
             )
             _logger.info(message)
             
-            return {
-                'created': created_count,
-                'updated': updated_count,
-                'failed': failed_count,
-                'message': message,
-            }
+            result['message'] = message
+            return result
             
         except Exception as e:
             error_msg = _('Shopify import failed: %s') % str(e)
@@ -154,6 +125,49 @@ class ShopifyAdapter(BaseAdapter):
             _logger.error('Error parsing Shopify product data: %s', str(e))
             raise
     
+    def _get_raw_product_key(self, raw_product):
+        return raw_product.get('id') and str(raw_product['id'])
+    
+    STOCK_BATCH_SIZE = 250
+    supports_stock_sync = True
+    
+    def fetch_stock(self, product_vendor_infos):
+        """
+        Fetch inventory of up to 250 products per request
+        
+        Only variant quantities are requested, so a stock refresh downloads a
+        fraction of a full product listing.
+        """
+        if not self.api_url or not self.access_token:
+            _logger.warning('Shopify stock sync skipped: store name or access token missing')
+            return {}
+        
+        vendor_info_by_product_id = {
+            vendor_info.vendor_product_id: vendor_info
+            for vendor_info in product_vendor_infos if vendor_info.vendor_product_id
+        }
+        product_ids = list(vendor_info_by_product_id)
+        headers = {'X-Shopify-Access-Token': self.access_token}
+        
+        levels = {}
+        for start in range(0, len(product_ids), self.STOCK_BATCH_SIZE):
+            batch = product_ids[start:start + self.STOCK_BATCH_SIZE]
+            with self.metrics.phase('fetch'):
+                response = self._http_get('%s/products.json' % self.api_url, headers=headers, timeout=30, params={
+                    'ids': ','.join(batch),
+                    'fields': 'id,variants',
+                    'limit': self.STOCK_BATCH_SIZE,
+                })
+                response.raise_for_status()
+            for product in response.json().get('products', []):
+                vendor_info = vendor_info_by_product_id.get(str(product.get('id')))
+                if not vendor_info:
+                    continue
+                variants = product.get('variants') or [{}]
+                qty = float(variants[0].get('inventory_quantity') or 0)
+                levels[vendor_info.id] = (qty, self._get_stock_status(qty))
+        return levels
+    
     def sync_product(self, product_vendor_info):
         """Sync single product from Shopify"""
         try:
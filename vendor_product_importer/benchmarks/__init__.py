@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+Import throughput benchmarks
+
+Not loaded with the module: run them from an Odoo shell on a test
+database, e.g.::
+
+    $ odoo-bin shell -d vpi_bench
+    >>> from odoo.addons.vendor_product_importer.benchmarks import check_query_budgets, compare_results, run_benchmark
+    >>> run_benchmark(env, sizes=(1000, 10000), output='/tmp/vpi_bench.jsonl')
+    >>> compare_results('/tmp/vpi_bench.jsonl')
+    >>> check_query_budgets(env)
+"""
+
+from .catalog import CatalogReplay, SyntheticCatalog, VENDOR_TYPES
+from .query_budget import QUERY_BUDGETS, QueryCounter, check_query_budgets, measure_query_costs
+from .runner import compare_results, run_benchmark, run_scenario
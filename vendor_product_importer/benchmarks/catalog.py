@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import gzip
+import html
+import io
+import json
+import logging
+import os
+import random
+import threading
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+_logger = logging.getLogger(__name__)
+
+VENDOR_TYPES = ('amazon', 'shopify', 'ebay', 'feed', 'generic')
+
+BRANDS = ('Acme', 'Northwind', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Vandelay',
+          'Stark', 'Wayne', 'Soylent', 'Tyrell', 'Cyberdyne', 'Wonka', 'Gringotts')
+ADJECTIVES = ('Compact', 'Deluxe', 'Portable', 'Wireless', 'Heavy Duty', 'Premium', 'Classic',
+              'Ultra', 'Smart', 'Eco', 'Pro', 'Mini', 'Stainless', 'Ergonomic', 'Rechargeable')
+NOUNS = ('Drill', 'Kettle', 'Headphones', 'Backpack', 'Lamp', 'Blender', 'Keyboard', 'Router',
+         'Speaker', 'Thermos', 'Tripod', 'Charger', 'Toaster', 'Monitor', 'Fan', 'Scale')
+COLORS = ('Black', 'White', 'Silver', 'Red', 'Blue', 'Green', 'Graphite', 'Rose Gold')
+CATEGORIES = ('Electronics', 'Home & Kitchen', 'Tools', 'Outdoors', 'Office', 'Sports')
+
+FEED_COLUMNS = ('vendor_product_id', 'name', 'default_code', 'barcode', 'vendor_cost',
+                'qty_available', 'weight', 'brand', 'category', 'description')
+
+# CSS selectors matching the pages written by SyntheticCatalog.write_site()
+SITE_SELECTORS = {
+    'product_list_selector': 'li.product',
+    'product_link_selector': 'a',
+    'name_selector': 'h1',
+    'price_selector': '.price',
+    'description_selector': '.description',
+    'sku_selector': '.sku',
+    'ean_selector': '.ean',
+    'category_selector': '.category',
+}
+
+
+def _ean13(number):
+    """
+    :param number: Item number (up to 10 digits)
+    :return: EAN-13 in the restricted in-store range (prefix 20), check digit included
+    """
+    digits = '20%010d' % number
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+class SyntheticCatalog:
+    """
+    Deterministic synthetic vendor catalog
+
+    The same size and seed always produce the same products in the same
+    order, in the raw format of every adapter, so benchmark results of
+    different commits are measured on identical input. Products are
+    generated lazily: a catalog of a million products is never held in
+    memory as a whole.
+    """
+
+    def __init__(self, size, seed=0, revision=0):
+        """
+        :param size: Number of products
+        :param seed: Random seed; each seed gives a disjoint set of identifiers
+        :param revision: Later revisions of a catalog have the same products
+                         with different costs, to benchmark updates
+        """
+        self.size = size
+        self.seed = seed
+        self.revision = revision
+
+    def __len__(self):
+        return self.size
+
+    def iter_items(self):
+        """
+        :return: Iterator of adapter-neutral product dictionaries
+        """
+        rng = random.Random(self.seed)
+        for index in range(self.size):
+            brand = rng.choice(BRANDS)
+            noun = rng.choice(NOUNS)
+            number = self.seed * 10 ** 8 + index
+            cost = round(min(rng.lognormvariate(3.2, 1.0), 5000.0) * (1 + 0.07 * self.revision), 2)
+            yield {
+                'index': index,
+                'key': 'SYN%d-%08d' % (self.seed, index),
+                'sku': '%s-%s-%06d' % (brand[:3].upper(), noun[:3].upper(), number % 10 ** 6),
+                'ean': _ean13(number),
+                'name': '%s %s %s %s %d' % (brand, rng.choice(ADJECTIVES), noun, rng.choice(COLORS), 100 + index % 900),
+                'brand': brand,
+                'category': rng.choice(CATEGORIES),
+                'cost': cost,
+                'qty': rng.choice((0, 0, 3, 10, 25, 100)),
+                'weight': round(rng.uniform(0.1, 25.0), 2),
+                'description': 'Synthetic %s for benchmarks, item %d.' % (noun.lower(), index),
+            }
+
+    def iter_raw(self, vendor_type):
+        """
+        Stream the catalog in the raw format an adapter receives from its vendor
+
+        :param vendor_type: 'amazon' (PA-API 5 items), 'shopify' (Admin API
+                            products), 'ebay' (Finding API items) or 'feed'
+                            (feed rows named like product fields)
+        :return: Iterator of (cursor, raw_product) tuples, see BaseAdapter.iter_products()
+        """
+        formatter = getattr(self, '_format_%s' % vendor_type, None)
+        if formatter is None:
+            raise ValueError('No raw format for vendor type %r' % vendor_type)
+        for item in self.iter_items():
+            yield str(item['index'] + 1), formatter(item)
+
+    # -------------------------------------------------------------------------
+    # Raw formats
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _format_amazon(item):
+        return {
+            'ASIN': item['key'],
+            'DetailPageURL': 'https://www.amazon.com/dp/%s' % item['key'],
+            'ItemInfo': {
+                'Title': {'DisplayValue': item['name']},
+                'ByLineInfo': {'Brand': {'DisplayValue': item['brand']}},
+                'Features': {'DisplayValues': [item['description']]},
+                'ProductInfo': {'ItemDimensions': {'Weight': {'DisplayValue': item['weight'], 'Unit': 'pounds'}}},
+            },
+            'Offers': {
+                'Listings': [{
+                    'Price': {'Amount': item['cost'], 'Currency': 'USD'},
+                    'Availability': {'Type': 'Now' if item['qty'] else 'OutOfStock'},
+                }],
+            },
+        }
+
+    @staticmethod
+    def _format_shopify(item):
+        return {
+            'id': 7 * 10 ** 12 + item['index'],
+            'title': item['name'],
+            'handle': item['key'].lower(),
+            'body_html': '<p>%s</p>' % html.escape(item['description']),
+            'vendor': item['brand'],
+            'product_type': item['category'],
+            'variants': [{
+                'id': 4 * 10 ** 13 + item['index'],
+                'sku': item['sku'],
+                'barcode': item['ean'],
+                'price': '%.2f' % item['cost'],
+                'weight': item['weight'],
+                'inventory_quantity': item['qty'],
+            }],
+            'images': [],
+        }
+
+    @staticmethod
+    def _format_ebay(item):
+        return {
+            'itemId': item['key'],
+            'title': item['name'],
+            'viewItemURL': 'https://www.ebay.com/itm/%s' % item['key'],
+            'description': item['description'],
+            'primaryCategory': {'categoryName': item['category']},
+            'sellingStatus': {'currentPrice': {'value': item['cost'], '_currencyId': 'USD'}},
+        }
+
+    @staticmethod
+    def _format_feed(item):
+        return {
+            'vendor_product_id': item['key'],
+            'name': item['name'],
+            'default_code': item['sku'],
+            'barcode': item['ean'],
+            'vendor_cost': '%.2f' % item['cost'],
+            'qty_available': str(item['qty']),
+            'weight': str(item['weight']),
+            'brand': item['brand'],
+            'category': item['category'],
+            'description': item['description'],
+        }
+
+    # -------------------------------------------------------------------------
+    # Files
+    # -------------------------------------------------------------------------
+
+    def write_jsonl(self, path, vendor_type):
+        """
+        Write the raw catalog as JSON Lines, one raw product per line
+        (the layout of a Shopify bulk operation export)
+
+        :param path: Destination file
+        :param vendor_type: Raw format, see iter_raw()
+        :return: path
+        """
+        with open(path, 'w', encoding='utf-8') as output:
+            for dummy, raw_product in self.iter_raw(vendor_type):
+                output.write(json.dumps(raw_product, sort_keys=True))
+                output.write('\n')
+        return path
+
+    def write_feed(self, path, delimiter='\t', compress=True):
+        """
+        Write the catalog as a delimited feed (tab-separated by default, like
+        eBay and most marketplace bulk exports)
+
+        :param path: Destination file
+        :param delimiter: Column delimiter
+        :param compress: gzip the feed
+        :return: path
+        """
+        opener = partial(gzip.open, compresslevel=6) if compress else open
+        with opener(path, 'wt', encoding='utf-8', newline='') as output:
+            writer = csv.DictWriter(output, FEED_COLUMNS, delimiter=delimiter)
+            writer.writeheader()
+            for dummy, row in self.iter_raw('feed'):
+                writer.writerow(row)
+        return path
+
+    def write_site(self, directory):
+        """
+        Write the catalog as a static shop: index.html lists every product
+        and links to one detail page per product, matching SITE_SELECTORS
+
+        :param directory: Destination directory
+        :return: Path of the listing page, relative to directory
+        """
+        os.makedirs(os.path.join(directory, 'products'), exist_ok=True)
+        with io.open(os.path.join(directory, 'index.html'), 'w', encoding='utf-8') as listing:
+            listing.write('<html><body><ul class="products">\n')
+            for item in self.iter_items():
+                page = 'products/%d.html' % item['index']
+                listing.write('<li class="product"><a href="%s">%s</a></li>\n' % (page, html.escape(item['name'])))
+                with io.open(os.path.join(directory, page), 'w', encoding='utf-8') as detail:
+                    detail.write(
+                        '<html><body><div class="product-detail">'
+                        '<h1>%s</h1><span class="price">$%.2f</span>'
+                        '<span class="sku">%s</span><span class="ean">%s</span>'
+                        '<span class="category">%s</span>'
+                        '<div class="description"><p>%s</p></div>'
+                        '</div></body></html>' % (
+                            html.escape(item['name']), item['cost'], item['sku'], item['ean'],
+                            html.escape(item['category']), html.escape(item['description']),
+                        )
+                    )
+            listing.write('</ul></body></html>\n')
+        return 'index.html'
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory):
+    """
+    Serve a directory over HTTP on a free local port, in a background thread
+
+    :param directory: Directory to serve
+    :return: Context manager yielding the base URL (with trailing slash)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:%d/' % server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class CatalogReplay:
+    """
+    Feed a synthetic catalog to an adapter in place of its vendor
+
+    Same interface as PayloadReplay (adapter.replay), but products are
+    generated on the fly instead of being read from a recorded archive.
+    """
+
+    def __init__(self, products):
+        """
+        :param products: Callable returning an iterator of (cursor, raw_product)
+                         tuples, e.g. partial(catalog.iter_raw, 'amazon')
+        """
+        self.products = products
+
+    @classmethod
+    def from_jsonl(cls, path):
+        """
+        :param path: JSON Lines file written by SyntheticCatalog.write_jsonl()
+        """
+        def products():
+            with open(path, encoding='utf-8') as lines:
+                for index, line in enumerate(lines):
+                    if line.strip():
+                        yield str(index + 1), json.loads(line)
+        return cls(products)
+
+    def iter_products(self, cursor=None):
+        """
+        :param cursor: Resume cursor; products up to and including it are skipped
+        :return: Iterator of (cursor, raw_product) tuples
+        """
+        skipping = bool(cursor)
+        for product_cursor, raw_product in self.products():
+            if skipping:
+                skipping = product_cursor != cursor
+                continue
+            yield product_cursor, raw_product
+
+    def get(self, url):
+        """Synthetic catalogs have no remote resources"""
+        from ..adapters.recorder import RecordedResponse
+        return RecordedResponse(url, b'', status_code=404)
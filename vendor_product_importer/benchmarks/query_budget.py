@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import re
+import sys
+import tempfile
+from collections import Counter, defaultdict
+
+from .catalog import VENDOR_TYPES, SyntheticCatalog
+from .runner import MODULE_PATH, _prepare_vendor_vals, catalog_source
+
+_logger = logging.getLogger(__name__)
+
+SCENARIOS = ('create', 'unchanged', 'update', 'tier_change')
+
+# Upper bound of the SQL queries each additional imported row costs, per
+# scenario. It is measured between two batch sizes imported the same way
+# (see measure_query_costs()), so the fixed cost of a run (import log,
+# vendor settings, the bulk queries of a chunk, removal pass) cancels out
+# and the bound holds whatever the batch size. Each bound is the expected
+# cost plus about one query, so a single query added per row fails it:
+# - unchanged: none, the row is skipped by the chunk's diff
+# - update: the row's savepoint and release, the cost change count, then
+#   at the savepoint's flush the price tier search, the best vendor query
+#   and its row, and one UPDATE each for the vendor row and the template
+# - tier_change: the same, without the cost change count
+# - create: the template and its variant with the ORM's own queries, the
+#   vendor row with the same recomputations as an update, and the savepoint
+QUERY_BUDGETS = {
+    'create': 20.0,
+    'unchanged': 0.5,
+    'update': 9.0,
+    'tier_change': 8.0,
+}
+
+# Batch sizes compared by measure_query_costs(); both fit in one chunk
+BUDGET_SIZES = (100, 300)
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LISTS = re.compile(r'\(\s*(?:(?:%s|\?)\s*,\s*)+(?:%s|\?)\s*\)')
+_VALUES_ROWS = re.compile(r'(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(query):
+    """
+    Normalize a query so executions differing only by their values group together
+
+    :param query: SQL string (or odoo.tools.SQL)
+    :return: Query with literals, placeholder lists and multi-row VALUES collapsed
+    """
+    query = getattr(query, 'code', query)
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    query = _SPACES.sub(' ', str(query)).strip()
+    query = _STRINGS.sub('?', query)
+    query = _NUMBERS.sub('?', query)
+    query = _PLACEHOLDER_LISTS.sub('(?...)', query)
+    query = _VALUES_ROWS.sub(r'\1, ...', query)
+    return query
+
+
+class QueryCounter:
+    """
+    Count the queries run on a cursor, by fingerprint and call site
+
+    The call site is the innermost frame of this module's code (adapters,
+    models, wizards) that led to the query, which points at the line to
+    fix rather than at the ORM internals running the query.
+    """
+
+    def __init__(self, cr):
+        """
+        :param cr: Database cursor to watch
+        """
+        self.cr = cr
+        self.count = 0
+        self.queries = defaultdict(Counter)
+        self._execute = None
+
+    def __enter__(self):
+        self._execute = self.cr.execute
+
+        def execute(query, params=None, log_exceptions=True):
+            self.count += 1
+            self.queries[self._call_site()][fingerprint(query)] += 1
+            return self._execute(query, params, log_exceptions)
+
+        self.cr.execute = execute
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        del self.cr.execute
+        return False
+
+    @staticmethod
+    def _call_site():
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(MODULE_PATH) and not filename.startswith(BENCHMARKS_PATH):
+                return '%s:%d %s' % (os.path.relpath(filename, MODULE_PATH), frame.f_lineno,
+                                     frame.f_code.co_name)
+            frame = frame.f_back
+        return '(outside the module)'
+
+    def get_report(self, rows=1, limit=10):
+        """
+        :param rows: Number of imported rows, to show queries per row
+        :param limit: Number of fingerprints shown per call site
+        :return: Text report of the queries grouped by call site, most frequent first
+        """
+        rows = max(rows, 1)
+        lines = []
+        sites = sorted(self.queries.items(), key=lambda item: -sum(item[1].values()))
+        for site, queries in sites:
+            total = sum(queries.values())
+            lines.append('%7d  %6.2f/row  %s' % (total, total / float(rows), site))
+            for query, count in queries.most_common(limit):
+                lines.append('%16d  %s' % (count, query[:240]))
+        return '\n'.join(lines)
+
+
+def _change_price_tiers(env):
+    """
+    Raise the markup of every active tier, so the sale price of every
+    imported product changes on the next import
+    """
+    tiers = env['product.price.tier'].search([])
+    if not tiers:
+        tiers = tiers.create({'name': 'Benchmark', 'min_cost': 0.0, 'max_cost': 0.0})
+    for tier in tiers:
+        tier.write({'pricing_method': 'percentage', 'markup_percentage': tier.markup_percentage + 7.0})
+    env.flush_all()
+
+
+def _count_import_queries(vendor, replay):
+    """
+    :return: Tuple (rows imported, QueryCounter of the import)
+    """
+    env = vendor.env
+    env.flush_all()
+    with QueryCounter(env.cr) as counter:
+        result = vendor._run_import(replay=replay)
+        env.flush_all()
+    if result.get('failed'):
+        raise AssertionError('%s import of %s failed for %d rows' % (
+            vendor.vendor_type, vendor.name, result['failed']))
+    return result.get('found') or 0, counter
+
+
+def _count_scenario_queries(env, vendor_type, size, seed, workdir):
+    """
+    Run the scenarios of measure_query_costs() with a new vendor
+
+    :return: Dictionary {scenario: (rows imported, QueryCounter)}
+    """
+    vendor = env['vendor.config'].create(_prepare_vendor_vals(vendor_type, size))
+    counters = {}
+    catalog = SyntheticCatalog(size, seed=seed)
+    with catalog_source(catalog, vendor_type, workdir, env) as (vals, replay):
+        vendor.write(vals)
+        counters['create'] = _count_import_queries(vendor, replay)
+        counters['unchanged'] = _count_import_queries(vendor, replay)
+    revision = SyntheticCatalog(size, seed=seed, revision=1)
+    with catalog_source(revision, vendor_type, workdir, env) as (vals, replay):
+        vendor.write(vals)
+        counters['update'] = _count_import_queries(vendor, replay)
+        _change_price_tiers(env)
+        counters['tier_change'] = _count_import_queries(vendor, replay)
+    return counters
+
+
+def measure_query_costs(env, vendor_type, sizes=BUDGET_SIZES, seed=0):
+    """
+    Measure the SQL queries each imported row costs through the adapter of
+    a vendor type, per scenario
+
+    Each batch size is imported by its own vendor, from a catalog with its
+    own seed so the batches share no products: the vendor imports a new
+    catalog (create), the same catalog again (unchanged), a revision with
+    new costs (update), then that revision again after the price tiers
+    changed (tier_change). The cost of a row is the difference in queries
+    between the two batches divided by the difference in rows. Nothing is
+    rolled back: run it in a transaction that is.
+
+    :param env: Odoo environment
+    :param vendor_type: One of VENDOR_TYPES
+    :param sizes: The two batch sizes compared, both within one chunk
+    :param seed: Seed of the first catalog, the second one uses seed + 1
+    :return: Dictionary {scenario: result dictionary} with the rows and
+             queries of both batches, the queries per row and the
+             QueryCounter of the larger batch
+    """
+    small_size, large_size = sizes
+    with tempfile.TemporaryDirectory(prefix='vpi_budget_') as workdir:
+        small = _count_scenario_queries(env, vendor_type, small_size, seed, workdir)
+        large = _count_scenario_queries(env, vendor_type, large_size, seed + 1, workdir)
+
+    costs = {}
+    for scenario in SCENARIOS:
+        small_rows, small_counter = small[scenario]
+        large_rows, large_counter = large[scenario]
+        if large_rows <= small_rows:
+            raise AssertionError('%s/%s: the batches imported %d and %d rows' % (
+                vendor_type, scenario, small_rows, large_rows))
+        costs[scenario] = {
+            'vendor_type': vendor_type,
+            'scenario': scenario,
+            'rows': (small_rows, large_rows),
+            'queries': (small_counter.count, large_counter.count),
+            'queries_per_row': (large_counter.count - small_counter.count) / float(large_rows - small_rows),
+            'counter': large_counter,
+        }
+    return costs
+
+
+def format_query_costs(cost, budget=None):
+    """
+    :param cost: Result dictionary of measure_query_costs()
+    :param budget: Budget of the scenario, shown when set
+    :return: Text line, followed by the query report of the larger batch
+    """
+    line = '%s/%s: %.2f queries per row (%d queries for %d rows, %d for %d)' % (
+        cost['vendor_type'], cost['scenario'], cost['queries_per_row'],
+        cost['queries'][0], cost['rows'][0], cost['queries'][1], cost['rows'][1])
+    if budget is not None:
+        line += ', budget %.2f' % budget
+    return '%s\n%s' % (line, cost['counter'].get_report(cost['rows'][1]))
+
+
+def check_query_budgets(env, vendor_types=VENDOR_TYPES, sizes=BUDGET_SIZES, budgets=None, seed=0,
+                        raise_on_failure=True):
+    """
+    Measure the SQL queries per imported row of each adapter, see
+    measure_query_costs(), and check them against QUERY_BUDGETS
+
+    Everything is rolled back afterwards.
+
+    :param env: Odoo environment (from odoo-bin shell, on a test database)
+    :param vendor_types: Vendor types to check, see VENDOR_TYPES
+    :param sizes: The two batch sizes compared
+    :param budgets: Budgets overriding QUERY_BUDGETS, per scenario (optional)
+    :param seed: Catalog seed
+    :param raise_on_failure: Raise AssertionError when a budget is exceeded
+    :return: List of result dictionaries, one per vendor type and scenario
+    """
+    budgets = dict(QUERY_BUDGETS, **(budgets or {}))
+    results = []
+    failures = []
+
+    for vendor_type in vendor_types:
+        try:
+            costs = measure_query_costs(env, vendor_type, sizes=sizes, seed=seed)
+        finally:
+            env.cr.rollback()
+            env.invalidate_all()
+
+        for scenario in SCENARIOS:
+            cost = costs[scenario]
+            per_row = cost['queries_per_row']
+            result = {
+                'vendor_type': vendor_type,
+                'scenario': scenario,
+                'rows': cost['rows'],
+                'queries': cost['queries'],
+                'queries_per_row': round(per_row, 2),
+                'budget': budgets[scenario],
+                'ok': per_row <= budgets[scenario],
+            }
+            results.append(result)
+            if not result['ok']:
+                failures.append(format_query_costs(cost, budgets[scenario]))
+
+    print('\n'.join('%-8s %-12s %6.2f/row  budget %6.2f  %s' % (
+        result['vendor_type'], result['scenario'], result['queries_per_row'], result['budget'],
+        'ok' if result['ok'] else 'EXCEEDED') for result in results))
+
+    if failures:
+        report = '\n\n'.join(failures)
+        print('\n' + report)
+        if raise_on_failure:
+            raise AssertionError('Query budget exceeded:\n\n%s' % report)
+    return results
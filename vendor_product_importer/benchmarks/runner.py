@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from .catalog import SITE_SELECTORS, VENDOR_TYPES, CatalogReplay, SyntheticCatalog, serve_directory
+
+_logger = logging.getLogger(__name__)
+
+MODULE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _peak_rss_mb():
+    """
+    :return: Peak resident set size of this process in MB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def _git(*args):
+    try:
+        return subprocess.check_output(('git',) + args, cwd=MODULE_PATH,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_environment_info(env):
+    """
+    Identify the code and platform a benchmark ran on, so results of
+    different commits and machines are not compared by mistake
+
+    :param env: Odoo environment
+    :return: Dictionary with commit, dirty flag and versions
+    """
+    from odoo import release
+
+    env.cr.execute('SHOW server_version')
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--', '.')),
+        'odoo': release.version,
+        'python': platform.python_version(),
+        'postgres': env.cr.fetchone()[0],
+        'machine': platform.node(),
+    }
+
+
+def _prepare_vendor_vals(vendor_type, size):
+    """
+    :return: vendor.config values importing a synthetic catalog
+    """
+    vals = {
+        'name': 'Benchmark %s %d' % (vendor_type, size),
+        'vendor_type': vendor_type,
+        'website_url': 'https://benchmark.invalid',
+        'import_frequency': 'manual',
+        'shopify_store_name': 'benchmark',
+        'record_payloads': False,
+        'profile_import': False,
+    }
+    if vendor_type == 'feed':
+        vals.update({
+            'feed_format': 'csv',
+            'feed_csv_delimiter': '\t',
+            'feed_id_column': 'vendor_product_id',
+        })
+    elif vendor_type == 'generic':
+        vals.update(SITE_SELECTORS)
+    return vals
+
+
+@contextmanager
+def catalog_source(catalog, vendor_type, workdir, env=None):
+    """
+    Expose a synthetic catalog to the adapter of a vendor type
+
+    API adapters get the catalog through adapter.replay, the feed adapter
+    reads it from a gzipped TSV file and the generic scraper fetches it
+    from a local HTTP server, so every adapter runs its own parsing code
+    on its own raw format without network access.
+
+    :param catalog: SyntheticCatalog
+    :param vendor_type: One of VENDOR_TYPES
+    :param workdir: Directory for the feed and site files
+    :param env: Odoo environment, required for the feed (its directory is
+                made the feed directory while the context is open)
+    :return: Context manager yielding (vendor.config values, replay or None)
+    """
+    name = 'catalog-%d-%d-%d' % (catalog.seed, catalog.size, catalog.revision)
+    if vendor_type == 'feed':
+        path = catalog.write_feed(os.path.join(workdir, name + '.tsv.gz'))
+        ICP = env['ir.config_parameter'].sudo()
+        feed_directory = ICP.get_param('vendor_product_importer.feed_directory')
+        ICP.set_param('vendor_product_importer.feed_directory', workdir)
+        try:
+            yield {'feed_path': path}, None
+        finally:
+            ICP.set_param('vendor_product_importer.feed_directory', feed_directory or False)
+    elif vendor_type == 'generic':
+        directory = os.path.join(workdir, name)
+        listing = catalog.write_site(directory)
+        with serve_directory(directory) as base_url:
+            yield {'product_list_url': base_url + listing}, None
+    else:
+        yield {}, CatalogReplay(partial(catalog.iter_raw, vendor_type))
+
+
+def run_scenario(env, vendor_type, size, seed=0, workdir=None):
+    """
+    Import one synthetic catalog through the adapter of a vendor type
+
+    :param env: Odoo environment
+    :param vendor_type: One of VENDOR_TYPES
+    :param size: Number of products
+    :param seed: Catalog seed
+    :param workdir: Directory for the feed and site files (temporary if not set)
+    :return: Dictionary with the measurements of the run
+    """
+    if workdir is None:
+        with tempfile.TemporaryDirectory(prefix='vpi_bench_') as tmpdir:
+            return run_scenario(env, vendor_type, size, seed=seed, workdir=tmpdir)
+
+    vendor = env['vendor.config'].create(_prepare_vendor_vals(vendor_type, size))
+    with catalog_source(SyntheticCatalog(size, seed=seed), vendor_type, workdir, env) as (vals, replay):
+        vendor.write(vals)
+        env.flush_all()
+        result = _measure_import(vendor, replay)
+    result['size'] = size
+    return result
+
+
+def _measure_import(vendor, replay):
+    env = vendor.env
+    rss_before = _peak_rss_mb()
+    queries_before = env.cr.sql_log_count
+    started = time.perf_counter()
+
+    result = vendor._run_import(replay=replay)
+    env.flush_all()
+
+    elapsed = time.perf_counter() - started
+    queries = env.cr.sql_log_count - queries_before
+    rows = result.get('found') or 0
+    peak_rss = _peak_rss_mb()
+    metrics = result.get('metrics') or {}
+
+    return {
+        'vendor_type': vendor.vendor_type,
+        'rows': rows,
+        'created': result.get('created', 0),
+        'updated': result.get('updated', 0),
+        'skipped': result.get('skipped', 0),
+        'failed': result.get('failed', 0),
+        'elapsed_s': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        'queries': queries,
+        'queries_per_row': round(queries / float(rows), 2) if rows else 0.0,
+        'peak_rss_mb': round(peak_rss, 1),
+        'rss_growth_mb': round(max(peak_rss - rss_before, 0.0), 1),
+        'phases_ms': {name: stats['total_ms'] for name, stats in metrics.get('phases', {}).items()},
+    }
+
+
+def run_benchmark(env, vendor_types=VENDOR_TYPES, sizes=(1000,), seed=0, output=None, keep=False):
+    """
+    Run the import benchmark for every vendor type and catalog size
+
+    Each scenario runs in the current transaction and is rolled back
+    afterwards, unless keep is set, so the database is left unchanged.
+    Peak RSS is a process-wide high-water mark: for a reliable figure
+    per scenario, run each large size in its own shell.
+
+    :param env: Odoo environment (from odoo-bin shell, on a test database)
+    :param vendor_types: Vendor types to benchmark, see VENDOR_TYPES
+    :param sizes: Catalog sizes
+    :param seed: Catalog seed
+    :param output: JSON Lines file the results are appended to (optional)
+    :param keep: Commit the imported products instead of rolling back
+    :return: List of result dictionaries
+    """
+    info = get_environment_info(env)
+    if info['dirty']:
+        _logger.warning('Benchmarking a working tree with uncommitted changes (%s)', info['commit'])
+
+    results = []
+    for size in sizes:
+        for vendor_type in vendor_types:
+            _logger.info('Benchmarking %s import of %d products', vendor_type, size)
+            try:
+                result = run_scenario(env, vendor_type, size, seed=seed)
+            finally:
+                if keep:
+                    env.cr.commit()
+                else:
+                    env.cr.rollback()
+                    env.invalidate_all()
+            result.update(info, seed=seed, timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'))
+            results.append(result)
+            _logger.info('%s/%d: %.1f rows/s, %.2f queries/row, peak RSS %.1f MB',
+                         vendor_type, size, result['rows_per_second'], result['queries_per_row'],
+                         result['peak_rss_mb'])
+            if output:
+                with open(output, 'a', encoding='utf-8') as results_file:
+                    results_file.write(json.dumps(result, sort_keys=True) + '\n')
+
+    print(format_results(results))
+    return results
+
+
+def format_results(results):
+    """
+    :param results: Result dictionaries of run_benchmark()
+    :return: Text table, one line per scenario
+    """
+    phases = []
+    for result in results:
+        phases.extend(name for name in result['phases_ms'] if name not in phases)
+
+    header = ['commit', 'vendor', 'size', 'rows/s', 'queries/row', 'peak MB'] + ['%s ms' % name for name in phases]
+    lines = [header]
+    for result in results:
+        lines.append([
+            (result.get('commit') or '?')[:10] + ('+' if result.get('dirty') else ''),
+            result['vendor_type'],
+            str(result['size']),
+            '%.1f' % result['rows_per_second'],
+            '%.2f' % result['queries_per_row'],
+            '%.1f' % result['peak_rss_mb'],
+        ] + ['%.0f' % result['phases_ms'].get(name, 0.0) for name in phases])
+
+    widths = [max(len(line[column]) for line in lines) for column in range(len(header))]
+    return '\n'.join('  '.join(cell.rjust(width) for cell, width in zip(line, widths)) for line in lines)
+
+
+def compare_results(path, vendor_types=None, sizes=None):
+    """
+    Print the results stored by run_benchmark(output=path), grouped by
+    scenario so the same scenario can be compared across commits
+
+    :param path: JSON Lines results file
+    :param vendor_types: Only show these vendor types (optional)
+    :param sizes: Only show these sizes (optional)
+    :return: Text table
+    """
+    with open(path, encoding='utf-8') as results_file:
+        results = [json.loads(line) for line in results_file if line.strip()]
+    results = [
+        result for result in results
+        if (not vendor_types or result['vendor_type'] in vendor_types)
+        and (not sizes or result['size'] in sizes)
+    ]
+    results.sort(key=lambda result: (result['vendor_type'], result['size'], result.get('timestamp', '')))
+    table = format_results(results)
+    print(table)
+    return table
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Crons moved out of the noupdate block of data/ir_cron.xml
+UPDATABLE_CRONS = (
+    'ir_cron_vendor_import_weekly',
+    'ir_cron_vendor_import_worker',
+)
+
+
+def migrate(cr, version):
+    """
+    Let the upgrade rewrite the import dispatcher and worker crons
+
+    Records loaded from a noupdate block keep their noupdate flag in
+    ir_model_data, so without this the dispatcher of an existing install
+    would keep the weekly schedule it was created with.
+    """
+    if not version:
+        return
+    cr.execute("""
+        UPDATE ir_model_data
+           SET noupdate = false
+         WHERE module = 'vendor_product_importer'
+           AND name IN %s
+    """, (UPDATABLE_CRONS,))
+    _logger.info('Import crons set to update on upgrade (%d records)', cr.rowcount)
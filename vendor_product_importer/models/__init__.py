@@ -4,5 +4,7 @@ from . import vendor_config
 from . import price_tier
 from . import product_vendor_info
 from . import product_template
+from . import product_product
+from . import product_name_signature
 from . import import_log
 from . import product_mapping
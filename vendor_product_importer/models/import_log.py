@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from odoo.exceptions import AccessError, UserError
+from odoo.tools import sql
+from datetime import timedelta
+import csv
+import gzip
+import io
+import json
 import logging
+import threading
 
 _logger = logging.getLogger(__name__)
 
@@ -22,6 +30,7 @@ class VendorImportLog(models.Model):
     # Status
     state = fields.Selection([
         ('draft', 'Draft'),
+        ('queued', 'Queued'),
         ('in_progress', 'In Progress'),
         ('done', 'Completed'),
         ('failed', 'Failed'),
@@ -35,11 +44,22 @@ class VendorImportLog(models.Model):
     products_skipped = fields.Integer(string='Products Skipped', default=0, readonly=True)
     products_failed = fields.Integer(string='Products Failed', default=0, readonly=True)
     
+    # Changes since the previous import of the vendor
+    products_new = fields.Integer(string='New', default=0, readonly=True,
+                                  help='Vendor products not seen in earlier imports')
+    products_changed = fields.Integer(string='Changed', default=0, readonly=True)
+    products_unchanged = fields.Integer(string='Unchanged', default=0, readonly=True,
+                                        help='Vendor products identical to the previous import, not rewritten')
+    products_removed = fields.Integer(string='Removed', default=0, readonly=True,
+                                      help='Vendor products missing from this import, archived or marked out '
+                                           'of stock according to the vendor settings')
+    
     # Details
     import_type = fields.Selection([
         ('manual', 'Manual'),
         ('scheduled', 'Scheduled'),
         ('api', 'API Triggered'),
+        ('replay', 'Replay'),
     ], string='Import Type', default='manual')
     
     notes = fields.Text(string='Notes')
@@ -49,6 +69,46 @@ class VendorImportLog(models.Model):
     import_line_ids = fields.One2many('vendor.import.log.line', 'import_log_id', string='Import Lines')
     import_line_count = fields.Integer(string='Import Lines', compute='_compute_import_line_count')
     
+    # Sharded Imports
+    parent_log_id = fields.Many2one('vendor.import.log', string='Sharded Import', ondelete='cascade',
+                                    index=True, readonly=True,
+                                    help='Import this shard belongs to; its results are merged there')
+    shard_log_ids = fields.One2many('vendor.import.log', 'parent_log_id', string='Shards', readonly=True)
+    shard_index = fields.Integer(string='Shard', readonly=True)
+    shard_count = fields.Integer(string='Shard Count', default=0, readonly=True)
+    
+    # Resumable Imports
+    resume_cursor = fields.Char(string='Resume Cursor', readonly=True, copy=False,
+                                help='Position in the vendor product stream after the last committed chunk')
+    resume_count = fields.Integer(string='Resumptions', default=0, readonly=True, copy=False)
+    
+    # Performance
+    rows_per_second = fields.Float(string='Rows / Second', readonly=True, group_operator='avg')
+    import_seconds = fields.Float(string='Import Time (s)', readonly=True,
+                                  help='Time spent importing, summed over the runs of a resumed import')
+    http_request_count = fields.Integer(string='HTTP Requests', readonly=True)
+    http_mbytes = fields.Float(string='HTTP Data (MB)', readonly=True)
+    sql_query_count = fields.Integer(string='SQL Queries', readonly=True)
+    phase_stats = fields.Text(string='Phase Breakdown', readonly=True,
+                              help='JSON breakdown of time spent per import phase (total, p50 and p95 in ms)')
+    
+    # Profiling
+    profile_attachment_id = fields.Many2one('ir.attachment', string='Profile (pstats)', readonly=True,
+                                            ondelete='set null')
+    profile_report = fields.Text(string='Profile Report', readonly=True)
+    
+    # Payload Recording
+    payload_attachment_id = fields.Many2one('ir.attachment', string='Recorded Payloads', readonly=True,
+                                            ondelete='set null',
+                                            help='Raw vendor payloads of this import, to replay it offline')
+    replayed_log_id = fields.Many2one('vendor.import.log', string='Replay Of', readonly=True, ondelete='set null')
+    
+    # Retention
+    lines_purged = fields.Boolean(string='Lines Purged', default=False, readonly=True,
+                                  help='Import lines were removed by the log retention job; only the summary is kept')
+    line_archive_id = fields.Many2one('ir.attachment', string='Archived Lines', readonly=True, ondelete='set null',
+                                      help='Compressed CSV of the import lines, written before they were purged')
+    
     @api.depends('vendor_id', 'create_date')
     def _compute_name(self):
         for record in self:
@@ -71,6 +131,49 @@ class VendorImportLog(models.Model):
         for record in self:
             record.import_line_count = len(record.import_line_ids)
     
+    def _store_metrics(self, metrics):
+        """
+        Persist the performance breakdown of a run
+        
+        A resumed import runs in several parts: the metrics of each part are
+        added to those already stored, so the log describes the whole import.
+        
+        :param metrics: Summary produced by ImportMetrics.summary()
+        """
+        if not metrics:
+            return
+        for record in self:
+            # Rows of the earlier parts, recovered from their throughput
+            rows = record.rows_per_second * record.import_seconds + metrics.get('rows', 0)
+            seconds = record.import_seconds + metrics.get('elapsed_s', 0.0)
+            phases = json.loads(record.phase_stats or '{}')
+            self._merge_phase_stats(phases, metrics.get('phases', {}))
+            record.write({
+                'rows_per_second': round(rows / seconds, 2) if seconds > 0 else 0.0,
+                'import_seconds': seconds,
+                'http_request_count': record.http_request_count + metrics.get('http_requests', 0),
+                'http_mbytes': record.http_mbytes + metrics.get('http_bytes', 0) / (1024.0 * 1024.0),
+                'sql_query_count': record.sql_query_count + metrics.get('sql_queries', 0),
+                'phase_stats': json.dumps(phases),
+            })
+    
+    @staticmethod
+    def _merge_phase_stats(phases, other):
+        """
+        Add the phase statistics of another run to phases, in place
+        
+        Totals are summed; p50/p95 are the worst value of either run.
+        
+        :param phases: Phase statistics, see ImportMetrics.summary()
+        :param other: Phase statistics to add
+        """
+        for name, stats in other.items():
+            merged = phases.setdefault(name, {'count': 0, 'total_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0})
+            merged['count'] += stats.get('count', 0)
+            merged['total_ms'] = round(merged['total_ms'] + stats.get('total_ms', 0.0), 1)
+            merged['p50_ms'] = max(merged['p50_ms'], stats.get('p50_ms', 0.0))
+            merged['p95_ms'] = max(merged['p95_ms'], stats.get('p95_ms', 0.0))
+    
     def action_view_import_lines(self):
         """View import lines"""
         self.ensure_one()
@@ -112,6 +215,487 @@ class VendorImportLog(models.Model):
             'view_mode': 'kanban,tree,form',
             'domain': [('id', 'in', product_ids)],
         }
+    
+    def action_view_failed_lines(self):
+        """View failed import lines"""
+        self.ensure_one()
+        return {
+            'name': _('Failed Lines'),
+            'type': 'ir.actions.act_window',
+            'res_model': 'vendor.import.log.line',
+            'view_mode': 'tree,form',
+            'domain': [('import_log_id', '=', self.id), ('state', '=', 'failed')],
+            'context': {'default_import_log_id': self.id}
+        }
+    
+    def action_replay_import(self):
+        """
+        Run this import again from its recorded payloads, without network
+        
+        The replay goes through the live import: the costs and prices of the
+        recorded products are written back, so only administrators may run it.
+        """
+        self.ensure_one()
+        if not self.env.is_system():
+            raise AccessError(_('Only administrators can replay an import.'))
+        if not self.payload_attachment_id:
+            raise UserError(_('No payloads were recorded for this import.'))
+        
+        from ..adapters.recorder import PayloadReplay, open_attachment
+        replay_log = self.create({
+            'vendor_id': self.vendor_id.id,
+            'state': 'in_progress',
+            'import_type': 'replay',
+            'replayed_log_id': self.id,
+        })
+        replay_log._acquire_import_lock()
+        try:
+            with open_attachment(self.payload_attachment_id) as payloads:
+                self.vendor_id._run_import(replay_log, replay=PayloadReplay(payloads))
+        finally:
+            replay_log._release_import_lock()
+        return {
+            'name': _('Replayed Import'),
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': replay_log.id,
+            'view_mode': 'form',
+        }
+    
+    _COUNT_FIELDS = {
+        'found': 'products_found',
+        'created': 'products_created',
+        'updated': 'products_updated',
+        'skipped': 'products_skipped',
+        'failed': 'products_failed',
+        'new': 'products_new',
+        'changed': 'products_changed',
+        'unchanged': 'products_unchanged',
+    }
+    
+    def _get_import_counts(self):
+        """
+        :return: Dictionary of the product counters stored on this log
+        """
+        self.ensure_one()
+        return {key: self[field_name] for key, field_name in self._COUNT_FIELDS.items()}
+    
+    @api.model
+    def _prepare_count_vals(self, base_counts, counts):
+        """
+        Add the counters of a run to the counters of earlier runs
+        
+        :param base_counts: Counters stored before the run
+        :param counts: Counters of the run
+        :return: Dictionary of values to write
+        """
+        return {
+            field_name: base_counts.get(key, 0) + counts.get(key, 0)
+            for key, field_name in self._COUNT_FIELDS.items()
+        }
+    
+    def _save_checkpoint(self, cursor, base_counts, counts):
+        """
+        Store the resume cursor and counters after a committed chunk
+        
+        :param cursor: Cursor of the last processed product
+        :param base_counts: Counters stored before the run
+        :param counts: Counters of the run so far
+        """
+        self.ensure_one()
+        vals = self._prepare_count_vals(base_counts, counts)
+        vals['resume_cursor'] = cursor
+        self.write(vals)
+    
+    # -------------------------------------------------------------------------
+    # Import queue
+    # -------------------------------------------------------------------------
+    
+    def _get_import_lock_key(self):
+        """
+        Advisory lock key guarding the imports of this log's vendor
+        
+        Every import of a vendor (scheduled, manual, replayed or a shard)
+        uses the same vendor-level key. Shards take it in shared mode so the
+        shards of one import run concurrently, while any other import takes
+        it exclusively and never overlaps them.
+        
+        :return: Tuple (SQL expression for the namespace, vendor ID) for
+                 pg_advisory_lock(int, int)
+        """
+        self.ensure_one()
+        return ("hashtext('vendor_product_importer.import')", self.vendor_id.id)
+    
+    def _try_import_lock(self, shared=None):
+        """
+        Try to take the session-level advisory lock of this import
+        
+        The lock survives the commits done during the import and is released
+        by _release_import_lock(), or by PostgreSQL if the worker dies.
+        
+        :param shared: Take the lock in shared mode (default: for shards only)
+        :return: True if the lock was acquired
+        """
+        self.ensure_one()
+        if shared is None:
+            shared = bool(self.parent_log_id)
+        namespace, key = self._get_import_lock_key()
+        function = 'pg_try_advisory_lock_shared' if shared else 'pg_try_advisory_lock'
+        self.env.cr.execute('SELECT %s(%s, %%s)' % (function, namespace), (key,))
+        return self.env.cr.fetchone()[0]
+    
+    def _release_import_lock(self, shared=None):
+        """Release the advisory lock taken by _try_import_lock()"""
+        self.ensure_one()
+        if shared is None:
+            shared = bool(self.parent_log_id)
+        namespace, key = self._get_import_lock_key()
+        function = 'pg_advisory_unlock_shared' if shared else 'pg_advisory_unlock'
+        self.env.cr.execute('SELECT %s(%s, %%s)' % (function, namespace), (key,))
+    
+    def _acquire_import_lock(self):
+        """
+        Take the vendor's import lock for an import run in the current request
+        
+        :raise UserError: if another import of the vendor is running
+        """
+        self.ensure_one()
+        if not self._try_import_lock():
+            raise UserError(_('An import of %s is already running. Try again once it is finished.')
+                            % self.vendor_id.name)
+    
+    @api.model
+    def _claim_queued_import(self):
+        """
+        Claim the next queued import whose lock is free
+        
+        The queue state is re-read in a fresh transaction after the lock is
+        taken, so a job finished by another worker in the meantime is never
+        claimed twice.
+        
+        :return: vendor.import.log record (in progress, lock held) or empty recordset
+        """
+        self.env['vendor.config']._commit_import()
+        candidates = self.search([('state', '=', 'queued')], order='id')
+        for import_log in candidates:
+            if not import_log._try_import_lock():
+                continue
+            self.env['vendor.config']._commit_import()
+            self.env.cr.execute(
+                "UPDATE vendor_import_log SET state = 'in_progress' WHERE id = %s AND state = 'queued'",
+                (import_log.id,))
+            if self.env.cr.rowcount:
+                import_log.invalidate_recordset(['state'])
+                self.env['vendor.config']._commit_import()
+                return import_log
+            import_log._release_import_lock()
+        return self.browse()
+    
+    @api.model
+    def _requeue_stale_imports(self):
+        """
+        Put back in the queue scheduled imports left in progress by a dead worker
+        
+        A live import always holds the advisory lock of its vendor, so an
+        in-progress import whose vendor lock can be taken exclusively has
+        been abandoned.
+        """
+        stale = self.search([
+            ('state', '=', 'in_progress'),
+            ('import_type', '=', 'scheduled'),
+            ('shard_count', '<=', 1),
+        ])
+        for import_log in stale:
+            if import_log._try_import_lock(shared=False):
+                import_log._release_import_lock(shared=False)
+                import_log.state = 'queued'
+                _logger.warning('Requeued abandoned import %s', import_log.display_name)
+    
+    def _finalize_shards(self):
+        """
+        Merge the results of the shards into this import once all are finished
+        
+        Runs under an advisory lock of this parent log and re-reads the shards
+        in a fresh transaction, so two shards finishing at the same time cannot
+        both miss (or both apply) the merge.
+        """
+        self.ensure_one()
+        VendorConfig = self.env['vendor.config']
+        # Not the import lock: the shards still running hold it in shared mode
+        namespace, key = "hashtext('vendor_product_importer.import.finalize')", self.id
+        self.env.cr.execute('SELECT pg_advisory_lock(%s, %%s)' % namespace, (key,))
+        try:
+            VendorConfig._commit_import()
+            self.invalidate_recordset()
+            self.shard_log_ids.invalidate_recordset()
+            shards = self.shard_log_ids
+            if self.state != 'in_progress' or not shards \
+                    or any(shard.state not in ('done', 'failed') for shard in shards):
+                return
+            
+            counts = {key: 0 for key in self._COUNT_FIELDS}
+            for shard in shards:
+                for key, value in shard._get_import_counts().items():
+                    counts[key] += value
+            
+            failed = shards.filtered(lambda shard: shard.state == 'failed')
+            vals = self._prepare_count_vals({}, counts)
+            vals.update({
+                'state': 'failed' if failed == shards else 'done',
+                'end_date': fields.Datetime.now(),
+                'notes': _('Sharded import completed: %d shards, %d failed') % (len(shards), len(failed)),
+            })
+            if failed:
+                vals['error_log'] = '\n'.join(
+                    'Shard %d: %s' % (shard.shard_index, shard.notes or '') for shard in failed)
+            self.write(vals)
+            self._store_metrics(self._merge_shard_metrics(shards))
+            if not failed:
+                self._mark_removed_vendor_products()
+            if failed != shards:
+                self.vendor_id.last_import_date = fields.Datetime.now()
+            VendorConfig._commit_import()
+            _logger.info('Sharded import %s finished: %d created, %d updated, %d failed',
+                         self.display_name, counts['created'], counts['updated'], counts['failed'])
+        finally:
+            self.env.cr.execute('SELECT pg_advisory_unlock(%s, %%s)' % namespace, (key,))
+    
+    def _mark_removed_vendor_products(self):
+        """
+        Apply the vendor's removal policy to the products this import did not see
+        
+        Every product of a complete import is marked as seen by its log, so
+        the products missing from the vendor catalog are exactly the ones
+        still marked by an older import, and are handled in one statement.
+        They are stamped with their removal date, which outlives the import
+        logs, and their content hash is cleared, so a product coming back is
+        restored and rewritten.
+        
+        An import with failed rows (including products whose page could not
+        be fetched) does not know every product it missed, so nothing is
+        removed.
+        
+        :return: Number of removed vendor products
+        """
+        self.ensure_one()
+        action = self.vendor_id.removed_product_action
+        if action == 'none':
+            return 0
+        if self.products_failed:
+            _logger.warning('Import %s: removal pass skipped, %d products failed',
+                            self.display_name, self.products_failed)
+            return 0
+        
+        VendorInfo = self.env['product.vendor.info']
+        VendorInfo.flush_model()
+        if action == 'archive':
+            changes = 'active = false'
+        else:
+            changes = "vendor_stock_status = 'out_of_stock', vendor_qty_available = 0"
+        self.env.cr.execute("""
+            UPDATE product_vendor_info
+               SET %s,
+                   removed_date = %%(now)s,
+                   content_hash = NULL,
+                   write_date = %%(now)s,
+                   write_uid = %%(uid)s
+             WHERE vendor_id = %%(vendor_id)s
+               AND active
+               AND vendor_product_id IS NOT NULL
+               AND last_seen_log_id IS DISTINCT FROM %%(log_id)s
+               AND (%%(archive)s OR vendor_stock_status IS DISTINCT FROM 'out_of_stock')
+         RETURNING id
+        """ % changes, {
+            'now': fields.Datetime.now(),
+            'uid': self.env.uid,
+            'vendor_id': self.vendor_id.id,
+            'log_id': self.id,
+            'archive': action == 'archive',
+        })
+        removed = VendorInfo.browse([row[0] for row in self.env.cr.fetchall()])
+        if removed:
+            fnames = ['active', 'vendor_stock_status', 'vendor_qty_available', 'removed_date', 'content_hash',
+                      'write_date', 'write_uid']
+            removed.invalidate_recordset(fnames)
+            # Best vendor of the affected products is recomputed once
+            removed.modified(['active', 'vendor_stock_status'])
+        
+        self.products_removed = len(removed)
+        _logger.info('Import %s: %d vendor products removed from the catalog of %s',
+                     self.display_name, len(removed), self.vendor_id.name)
+        return len(removed)
+    
+    def _merge_shard_metrics(self, shards):
+        """
+        Combine the performance breakdown of the shards
+        
+        Totals are summed; p50/p95 are the worst value of any shard, and the
+        throughput is measured over the wall time of the whole import.
+        
+        :param shards: vendor.import.log records
+        :return: Metrics summary in the format of ImportMetrics.summary()
+        """
+        self.ensure_one()
+        phases = {}
+        for shard in shards:
+            self._merge_phase_stats(phases, json.loads(shard.phase_stats or '{}'))
+        
+        elapsed = (fields.Datetime.now() - self.start_date).total_seconds() if self.start_date else 0.0
+        rows = sum(shards.mapped('products_found'))
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'rows': rows,
+            'rows_per_second': round(rows / elapsed, 2) if elapsed > 0 else 0.0,
+            'http_requests': sum(shards.mapped('http_request_count')),
+            'http_bytes': sum(shards.mapped('http_mbytes')) * 1024.0 * 1024.0,
+            'sql_queries': sum(shards.mapped('sql_query_count')),
+            'phases': phases,
+        }
+    
+    @api.model
+    def _finalize_sharded_imports(self):
+        """Merge every sharded import whose shards have all finished"""
+        for import_log in self.search([('state', '=', 'in_progress'), ('shard_count', '>', 1)]):
+            import_log._finalize_shards()
+    
+    # -------------------------------------------------------------------------
+    # Retention
+    # -------------------------------------------------------------------------
+    
+    _LINE_ARCHIVE_COLUMNS = [
+        'id', 'product_tmpl_id', 'vendor_product_id', 'vendor_product_name', 'vendor_sku',
+        'state', 'vendor_cost', 'calculated_price', 'error_message', 'create_date',
+    ]
+    
+    @api.model
+    def _get_retention_settings(self):
+        """Read log retention settings from system parameters"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return {
+            'line_days': int(ICP.get_param('vendor_product_importer.log_retention_days', 90)),
+            'summary_days': int(ICP.get_param('vendor_product_importer.log_summary_retention_days', 365)),
+            'chunk_size': int(ICP.get_param('vendor_product_importer.log_cleanup_chunk_size', 10000)),
+            'archive_lines': ICP.get_param('vendor_product_importer.log_archive_lines', 'False') == 'True',
+        }
+    
+    @api.model
+    def cron_cleanup_old_logs(self):
+        """
+        Scheduled action to apply import log retention
+        
+        Import lines older than the line retention are purged in bounded
+        chunks, optionally archived to a compressed attachment first; the log
+        itself is kept as a summary until the summary retention expires.
+        Every chunk is committed on its own so the job never holds long locks
+        or produces one huge transaction.
+        """
+        settings = self._get_retention_settings()
+        now = fields.Datetime.now()
+        
+        if settings['line_days'] > 0:
+            cutoff = now - timedelta(days=settings['line_days'])
+            logs = self.search([
+                ('create_date', '<', cutoff),
+                ('lines_purged', '=', False),
+                ('state', 'not in', ['draft', 'queued', 'in_progress']),
+            ], order='id')
+            for log in logs:
+                try:
+                    log._purge_lines(settings['chunk_size'], archive=settings['archive_lines'])
+                except Exception as e:
+                    _logger.error('Failed to purge lines of import log %s: %s', log.id, str(e))
+                    self.env.cr.rollback()
+        
+        if settings['summary_days'] > 0:
+            cutoff = now - timedelta(days=settings['summary_days'])
+            expired = self.search([
+                ('create_date', '<', cutoff),
+                ('state', 'not in', ['draft', 'queued', 'in_progress']),
+            ], order='id')
+            for log in expired:
+                if not log.lines_purged:
+                    log._purge_lines(settings['chunk_size'], archive=False)
+            for index in range(0, len(expired), settings['chunk_size']):
+                expired[index:index + settings['chunk_size']].unlink()
+                self._commit_retention_chunk()
+            _logger.info('Import log retention removed %d log summaries', len(expired))
+    
+    def _purge_lines(self, chunk_size, archive=False):
+        """
+        Delete the import lines of this log in bounded chunks
+        
+        :param chunk_size: Maximum number of lines deleted per transaction
+        :param archive: Archive the lines to a compressed attachment first
+        """
+        self.ensure_one()
+        LogLine = self.env['vendor.import.log.line']
+        LogLine.flush_model()
+        
+        if archive:
+            self._archive_lines(chunk_size)
+        
+        deleted = 0
+        while True:
+            self.env.cr.execute("""
+                DELETE FROM vendor_import_log_line
+                 WHERE id IN (SELECT id FROM vendor_import_log_line
+                               WHERE import_log_id = %s
+                               LIMIT %s)
+            """, (self.id, chunk_size))
+            deleted += self.env.cr.rowcount
+            if self.env.cr.rowcount < chunk_size:
+                break
+            self._commit_retention_chunk()
+        
+        self.invalidate_recordset(['import_line_ids'])
+        self.lines_purged = True
+        self._commit_retention_chunk()
+        _logger.info('Purged %d lines of import log %s', deleted, self.display_name)
+    
+    def _archive_lines(self, chunk_size):
+        """
+        Write the import lines of this log to a gzip compressed CSV attachment
+        
+        Lines are read with keyset pagination so memory stays bounded.
+        
+        :param chunk_size: Number of lines read per query
+        """
+        self.ensure_one()
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as archive:
+            text = io.TextIOWrapper(archive, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(self._LINE_ARCHIVE_COLUMNS)
+            last_id = 0
+            while True:
+                self.env.cr.execute("""
+                    SELECT %s FROM vendor_import_log_line
+                     WHERE import_log_id = %%s AND id > %%s
+                  ORDER BY id
+                     LIMIT %%s
+                """ % ', '.join(self._LINE_ARCHIVE_COLUMNS), (self.id, last_id, chunk_size))
+                rows = self.env.cr.fetchall()
+                if not rows:
+                    break
+                writer.writerows(rows)
+                last_id = rows[-1][0]
+            text.flush()
+            text.detach()
+        
+        attachment = self.env['ir.attachment'].create({
+            'name': 'import_log_%s_lines.csv.gz' % self.id,
+            'raw': buffer.getvalue(),
+            'mimetype': 'application/gzip',
+            'res_model': self._name,
+            'res_id': self.id,
+        })
+        self.line_archive_id = attachment
+        self._commit_retention_chunk()
+    
+    def _commit_retention_chunk(self):
+        """Commit the current retention chunk, except when running tests"""
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
 
 
 class VendorImportLogLine(models.Model):
@@ -145,3 +729,56 @@ class VendorImportLogLine(models.Model):
     
     # Notes
     notes = fields.Text(string='Notes')
+    
+    _COPY_COLUMNS = [
+        'import_log_id', 'vendor_id', 'product_tmpl_id', 'vendor_product_id',
+        'vendor_product_name', 'vendor_sku', 'state', 'vendor_cost',
+        'calculated_price', 'error_message',
+        'create_uid', 'create_date', 'write_uid', 'write_date',
+    ]
+    
+    def init(self):
+        """Index lines by import log and state, as filtered by the log form and stat buttons"""
+        sql.create_index(self.env.cr, 'vendor_import_log_line_log_state_idx', self._table,
+                         ['import_log_id', 'state'])
+    
+    @api.model
+    def _copy_insert(self, vals_list):
+        """
+        Insert log lines with a single COPY statement
+        
+        Bypasses the ORM, so only plain column values are supported. The
+        stored related vendor_id is resolved from the import logs directly.
+        
+        :param vals_list: List of line value dictionaries
+        """
+        if not vals_list:
+            return
+        
+        log_ids = list({vals['import_log_id'] for vals in vals_list})
+        vendor_by_log = {
+            log.id: log.vendor_id.id
+            for log in self.env['vendor.import.log'].browse(log_ids)
+        }
+        now = fields.Datetime.to_string(fields.Datetime.now())
+        uid = self.env.uid
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for vals in vals_list:
+            row = dict(vals,
+                       vendor_id=vendor_by_log[vals['import_log_id']],
+                       create_uid=uid, create_date=now,
+                       write_uid=uid, write_date=now)
+            # False/None mean NULL; compare by identity so 0.0 stays a value
+            writer.writerow([
+                '' if row.get(column) is None or row.get(column) is False else row[column]
+                for column in self._COPY_COLUMNS
+            ])
+        buffer.seek(0)
+        
+        self.env.cr.copy_expert(
+            'COPY %s (%s) FROM STDIN WITH (FORMAT csv)' % (self._table, ', '.join(self._COPY_COLUMNS)),
+            buffer,
+        )
+        self.env['vendor.import.log'].invalidate_model(['import_line_ids'])
@@ -2,6 +2,7 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from ..tools import PriceSimulator
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -70,6 +71,181 @@ class PriceTier(models.Model):
     # Notes
     notes = fields.Text(string='Notes')
     
+    # Background repricing
+    reprice_pending_count = fields.Integer(string='Prices Pending Repricing', compute='_compute_reprice_pending_count',
+                                           help='Vendor prices covered by this tier that the background '
+                                                'repricing job has not recalculated yet')
+    
+    # Fields whose change can move the sale price of the products a tier covers
+    _PRICING_FIELDS = {
+        'active', 'sequence', 'min_cost', 'max_cost', 'pricing_method', 'markup_percentage',
+        'fixed_amount', 'price_formula', 'round_price', 'rounding_method', 'rounding_precision',
+        'min_profit_amount', 'min_profit_percentage', 'categ_ids', 'vendor_ids',
+    }
+    
+    def _compute_reprice_pending_count(self):
+        VendorInfo = self.env['product.vendor.info']
+        VendorInfo.flush_model(['reprice_pending', 'vendor_cost', 'vendor_id', 'product_tmpl_id'])
+        for tier in self:
+            if not tier.id:
+                tier.reprice_pending_count = 0
+                continue
+            where, params = VendorInfo._get_reprice_scope_where(tier._get_reprice_scope())
+            self.env.cr.execute("""
+                SELECT COUNT(*)
+                  FROM product_vendor_info pvi
+                 WHERE pvi.reprice_pending
+                   AND %s
+            """ % where, params)
+            tier.reprice_pending_count = self.env.cr.fetchone()[0]
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Override create to queue the repricing of the products the new tiers cover"""
+        tiers = super(PriceTier, self).create(vals_list)
+        tiers._queue_repricing(tiers._get_reprice_scopes())
+        return tiers
+    
+    def write(self, vals):
+        """Override write to queue the repricing of the products the tiers covered or now cover"""
+        if not self._PRICING_FIELDS.intersection(vals):
+            return super(PriceTier, self).write(vals)
+        
+        scopes = self._get_reprice_scopes()
+        result = super(PriceTier, self).write(vals)
+        self._queue_repricing(scopes + self._get_reprice_scopes())
+        return result
+    
+    def unlink(self):
+        """Override unlink to queue the repricing of the products the tiers covered"""
+        scopes = self._get_reprice_scopes()
+        result = super(PriceTier, self).unlink()
+        self._queue_repricing(scopes)
+        return result
+    
+    def _get_reprice_scope(self):
+        """
+        :return: Cost interval, categories and vendors this tier applies to
+        """
+        self.ensure_one()
+        return {
+            'min_cost': self.min_cost,
+            'max_cost': self.max_cost,
+            'categ_ids': tuple(sorted(self.categ_ids.ids)),
+            'vendor_ids': tuple(sorted(self.vendor_ids.ids)),
+        }
+    
+    def _get_reprice_scopes(self):
+        """
+        :return: Scopes of the active tiers in self (inactive tiers price nothing)
+        """
+        return [tier._get_reprice_scope() for tier in self if tier.active]
+    
+    def _queue_repricing(self, scopes):
+        """Mark the rows of the given scopes for the background repricing job"""
+        unique_scopes = {tuple(sorted(scope.items())): scope for scope in scopes}
+        self.env['product.vendor.info']._mark_reprice_pending(list(unique_scopes.values()))
+    
+    # -------------------------------------------------------------------------
+    # What-if simulation
+    # -------------------------------------------------------------------------
+    
+    @api.model
+    def _get_tier_specs(self, changes=None):
+        """
+        Active tiers as plain dictionaries, the input of PriceSimulator
+        
+        :param changes: Values to apply on top of the stored tiers, in the
+                        format of write(), {tier_id: {field: value}} (optional)
+        :return: List of dictionaries with the pricing fields of each tier
+        """
+        changes = changes or {}
+        tiers = self.with_context(active_test=False).search([])
+        specs = []
+        for tier, spec in zip(tiers, tiers.read(list(self._PRICING_FIELDS | {'name'}), load=False)):
+            for field_name, value in changes.get(tier.id, {}).items():
+                field = self._fields[field_name]
+                # x2many commands are resolved to the resulting ids
+                spec[field_name] = list(field.convert_to_cache(value, tier)) if field.type == 'many2many' else value
+            if spec['active']:
+                specs.append(spec)
+        return specs
+    
+    @api.model
+    def _load_price_simulator(self, product_tmpl_ids=None):
+        """
+        Load the costs and prices of the catalog into a PriceSimulator
+        
+        Products are priced from their best vendor cost; products without
+        a cost keep their price and are left out.
+        
+        :param product_tmpl_ids: Limit to these products (default: all active imported products)
+        :return: PriceSimulator
+        """
+        ProductTemplate = self.env['product.template']
+        ProductTemplate.flush_model(['active', 'is_imported', 'categ_id', 'list_price',
+                                     'best_vendor_cost', 'best_vendor_id'])
+        if product_tmpl_ids is None:
+            where, params = 'active AND is_imported', []
+        else:
+            where, params = 'id = ANY(%s)', [list(product_tmpl_ids)]
+        self.env.cr.execute("""
+            SELECT id, best_vendor_cost, COALESCE(categ_id, 0), COALESCE(best_vendor_id, 0),
+                   COALESCE(list_price, 0)
+              FROM product_template
+             WHERE best_vendor_cost > 0
+               AND %s
+          ORDER BY id
+        """ % where, params)
+        
+        columns = ([], [], [], [], [])
+        while True:
+            rows = self.env.cr.fetchmany(10000)
+            if not rows:
+                break
+            for row in rows:
+                for column, value in zip(columns, row):
+                    column.append(value)
+        return PriceSimulator(*columns)
+    
+    @api.model
+    def simulate_tiers(self, tier_specs=None, changes=None, top=20, product_tmpl_ids=None):
+        """
+        Simulate the effect of a tier set on the whole catalog, without writing anything
+        
+        :param tier_specs: Proposed tiers as dictionaries with the fields of
+                           this model (default: the active tiers)
+        :param changes: Changes to the stored tiers, {tier_id: {field: value}},
+                        when tier_specs is not given (optional)
+        :param top: Number of top movers returned
+        :param product_tmpl_ids: Limit to these products (optional)
+        :return: Dictionary with the number of products whose price moves,
+                 margin distributions before and after, products per tier
+                 and the top movers, see PriceSimulator.simulate()
+        """
+        if tier_specs is None:
+            tier_specs = self._get_tier_specs(changes)
+        simulator = self._load_price_simulator(product_tmpl_ids)
+        result = simulator.simulate(tier_specs, top=top)
+        
+        products = self.env['product.template'].browse([mover['product_id'] for mover in result['top_movers']])
+        names = {product.id: product.display_name for product in products}
+        for mover in result['top_movers']:
+            mover['product_name'] = names.get(mover['product_id'])
+        _logger.info('Simulated %d tiers on %d products in %.0f ms: %d prices move',
+                     len(tier_specs), result['products'], result['elapsed_ms'], result['moved'])
+        return result
+    
+    def simulate_changes(self, vals, top=20):
+        """
+        Simulate writing vals on these tiers, without writing anything
+        
+        :param vals: Values as given to write()
+        :param top: Number of top movers returned
+        :return: See simulate_tiers()
+        """
+        return self.simulate_tiers(changes={tier.id: vals for tier in self}, top=top)
+    
     @api.constrains('min_cost', 'max_cost')
     def _check_cost_range(self):
         for record in self:
@@ -155,65 +331,62 @@ class PriceTier(models.Model):
             return round(price / self.rounding_precision) * self.rounding_precision
     
     @api.model
-    def get_applicable_tier(self, cost, product=None, vendor=None):
+    def get_applicable_tier(self, cost, product=None, vendor=None, tiers=None):
         """
         Find the most applicable tier for given cost and context
         
         :param cost: Product cost price
         :param product: product.template record (optional)
         :param vendor: vendor.config record (optional)
+        :param tiers: Active tiers from _get_active_tiers(), to avoid a
+                      search per call when pricing many products (optional)
         :return: price.tier record or None
         """
-        domain = [
-            ('active', '=', True),
-            ('min_cost', '<=', cost),
-            '|',
-            ('max_cost', '=', 0),
-            ('max_cost', '>=', cost),
-        ]
+        if tiers is None:
+            tiers = self._get_active_tiers()
         
-        # Filter by category if product provided
-        if product and product.categ_id:
-            domain = [
-                '&',
-                '|',
-                ('categ_ids', '=', False),
-                ('categ_ids', 'in', product.categ_id.ids),
-            ] + domain
-        
-        # Filter by vendor if provided
-        if vendor:
-            domain = [
-                '&',
-                '|',
-                ('vendor_ids', '=', False),
-                ('vendor_ids', 'in', vendor.ids),
-            ] + domain
-        
-        # Get tiers ordered by specificity (most specific first)
-        tiers = self.search(domain, order='sequence, min_cost desc')
+        categ = product.categ_id if product else None
+        vendor_ids = set(vendor.ids) if vendor else set()
+        candidates = [
+            tier for tier in tiers
+            if tier.min_cost <= cost
+            and (not tier.max_cost or tier.max_cost >= cost)
+            and (not categ or not tier.categ_ids or categ in tier.categ_ids)
+            and (not vendor_ids or not tier.vendor_ids or vendor_ids & set(tier.vendor_ids.ids))
+        ]
         
         # Return most specific tier
-        for tier in tiers:
-            if tier.categ_ids and product and product.categ_id in tier.categ_ids:
+        for tier in candidates:
+            if tier.categ_ids and categ and categ in tier.categ_ids:
                 return tier
-            if tier.vendor_ids and vendor and vendor in tier.vendor_ids:
+            if tier.vendor_ids and vendor_ids & set(tier.vendor_ids.ids):
                 return tier
         
         # Return first general tier
-        return tiers[:1] if tiers else None
+        return candidates[0] if candidates else None
+    
+    @api.model
+    def _get_active_tiers(self):
+        """
+        :return: Active tiers ordered by specificity (most specific first),
+                 with their categories and vendors prefetched
+        """
+        tiers = self.search([('active', '=', True)], order='sequence, min_cost desc')
+        tiers.fetch(['min_cost', 'max_cost', 'categ_ids', 'vendor_ids'])
+        return tiers
     
     @api.model
-    def calculate_price_for_product(self, cost, product=None, vendor=None):
+    def calculate_price_for_product(self, cost, product=None, vendor=None, tiers=None):
         """
         Calculate sale price for a product using appropriate tier
         
         :param cost: Product cost price
         :param product: product.template record (optional)
         :param vendor: vendor.config record (optional)
+        :param tiers: Active tiers from _get_active_tiers() (optional)
         :return: Calculated sale price or cost if no tier found
         """
-        tier = self.get_applicable_tier(cost, product, vendor)
+        tier = self.get_applicable_tier(cost, product, vendor, tiers=tiers)
         if tier:
             price = tier.calculate_sale_price(cost, product, vendor)
             if price:
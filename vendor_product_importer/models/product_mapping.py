@@ -139,6 +139,103 @@ class ProductFieldMapping(models.Model):
                          self.transformation_type, value, str(e))
             return value
     
+    def apply_mapping_column(self, vendor_data_list):
+        """
+        Apply this mapping to a whole column of vendor data
+        
+        Columnar counterpart of apply_mapping(): the value of every row is
+        extracted first, then defaults and transformation are applied to the
+        column at once instead of row by row.
+        
+        :param vendor_data_list: List of vendor data dictionaries
+        :return: Tuple (values, missing) where values is aligned with
+                 vendor_data_list and missing is the set of row indexes
+                 rejected by a required mapping
+        """
+        self.ensure_one()
+        
+        values = [vendor_data.get(self.vendor_field_name) for vendor_data in vendor_data_list]
+        
+        missing = set()
+        if self.is_required:
+            missing = {index for index, value in enumerate(values) if not value}
+        
+        if self.use_default:
+            default_value = self.default_value
+            values = [value if value else default_value for value in values]
+        
+        if self.apply_transformation:
+            indexes = [index for index, value in enumerate(values) if value]
+            if indexes:
+                transformed = self._apply_transformation_column([values[index] for index in indexes])
+                for index, value in zip(indexes, transformed):
+                    values[index] = value
+        
+        return values, missing
+    
+    def _apply_transformation_column(self, values):
+        """Apply transformation to a list of values"""
+        self.ensure_one()
+        
+        try:
+            operation = self._get_column_transformation()
+            if operation is None:
+                return values
+            return operation(values)
+        except Exception:
+            # Fall back to row-wise so a bad value keeps its original, like apply_mapping()
+            return [self._apply_transformation(value) for value in values]
+    
+    def _get_column_transformation(self):
+        """
+        Build the column operation for this mapping's transformation
+        
+        Factors, patterns and expressions are parsed/compiled once per column
+        instead of once per value.
+        
+        :return: Callable taking and returning a list of values, or None
+        """
+        self.ensure_one()
+        
+        transformation_type = self.transformation_type
+        if transformation_type == 'uppercase':
+            return lambda values: [str(value).upper() for value in values]
+        elif transformation_type == 'lowercase':
+            return lambda values: [str(value).lower() for value in values]
+        elif transformation_type == 'title':
+            return lambda values: [str(value).title() for value in values]
+        elif transformation_type == 'strip':
+            return lambda values: [str(value).strip() for value in values]
+        elif transformation_type == 'multiply':
+            factor = float(self.transformation_value or 1.0)
+            return lambda values: [float(value) * factor for value in values]
+        elif transformation_type == 'divide':
+            factor = float(self.transformation_value or 1.0)
+            if factor == 0:
+                return None
+            return lambda values: [float(value) / factor for value in values]
+        elif transformation_type == 'add':
+            amount = float(self.transformation_value or 0.0)
+            return lambda values: [float(value) + amount for value in values]
+        elif transformation_type == 'subtract':
+            amount = float(self.transformation_value or 0.0)
+            return lambda values: [float(value) - amount for value in values]
+        elif transformation_type == 'regex':
+            import re
+            if not self.transformation_value:
+                return None
+            search = re.compile(self.transformation_value).search
+            return lambda values: [
+                match.group(0) if match else value
+                for value, match in zip(values, map(search, map(str, values)))
+            ]
+        elif transformation_type == 'python':
+            code = compile(self.transformation_value, '<product.field.mapping>', 'eval')
+            return lambda values: [
+                eval(code, {"__builtins__": {}}, {'value': value}) for value in values
+            ]
+        return None
+    
     @api.model
     def get_mappings_for_vendor(self, vendor_id):
         """Get all active mappings for a vendor"""
@@ -170,3 +267,37 @@ class ProductFieldMapping(models.Model):
                     raise
         
         return product_vals
+    
+    @api.model
+    def map_vendor_data_batch(self, vendor_id, vendor_data_list):
+        """
+        Map a batch of vendor data to Odoo product fields, column by column
+        
+        Produces the same values as calling map_vendor_data_to_product() on
+        every row, but each mapping runs once over the whole column.
+        
+        :param vendor_id: vendor.config ID
+        :param vendor_data_list: List of vendor data dictionaries
+        :return: List of Odoo product field value dictionaries, aligned with
+                 vendor_data_list; rows rejected by a required mapping are None
+        """
+        mappings = self.get_mappings_for_vendor(vendor_id)
+        vals_list = [{} for dummy in vendor_data_list]
+        rejected = set()
+        
+        for mapping in mappings:
+            values, missing = mapping.apply_mapping_column(vendor_data_list)
+            if missing:
+                _logger.error('Error applying mapping %s: required field %s is missing in %d rows',
+                              mapping.name, mapping.vendor_field_name, len(missing))
+                rejected |= missing
+            
+            odoo_field_name = mapping.odoo_field_name
+            for product_vals, value in zip(vals_list, values):
+                if value is not None:
+                    product_vals[odoo_field_name] = value
+        
+        return [
+            None if index in rejected else product_vals
+            for index, product_vals in enumerate(vals_list)
+        ]
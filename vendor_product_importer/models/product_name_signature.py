@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from ..tools import MinHasher
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class ProductNameSignature(models.Model):
+    _name = 'product.name.signature'
+    _description = 'Product Name Similarity Signature'
+
+    product_tmpl_id = fields.Many2one('product.template', string='Product', required=True, ondelete='cascade',
+                                      index=True)
+    signature = fields.Text(string='MinHash Signature', required=True)
+    band_ids = fields.One2many('product.name.signature.band', 'signature_id', string='LSH Bands')
+    
+    _sql_constraints = [
+        ('product_tmpl_uniq', 'unique(product_tmpl_id)', 'A product can only have one name signature.'),
+    ]
+    
+    # Changing these parameters requires rebuilding the index
+    _hasher = MinHasher(num_perm=64, bands=16)
+    
+    @api.model
+    def _index_products(self, entries):
+        """
+        Add or refresh the signatures of products
+        
+        :param entries: List of (product.template ID, name, brand) tuples
+        """
+        signatures = {}
+        for product_tmpl_id, name, brand in entries:
+            signature = self._hasher.signature(name, brand)
+            if signature:
+                signatures[product_tmpl_id] = signature
+        
+        self.search([('product_tmpl_id', 'in', [entry[0] for entry in entries])]).unlink()
+        if not signatures:
+            return
+        
+        records = self.create([{
+            'product_tmpl_id': product_tmpl_id,
+            'signature': self._hasher.dumps(signature),
+        } for product_tmpl_id, signature in signatures.items()])
+        
+        signature_ids, band_keys = [], []
+        for record, signature in zip(records, signatures.values()):
+            for key in self._hasher.band_keys(signature):
+                signature_ids.append(record.id)
+                band_keys.append(key)
+        self.env['product.name.signature.band'].flush_model()
+        self.env.cr.execute("""
+            INSERT INTO product_name_signature_band (signature_id, band_key)
+            SELECT * FROM unnest(%s::int[], %s::int[])
+        """, (signature_ids, band_keys))
+    
+    @api.model
+    def _find_similar_product(self, name, brand, vendor_id, threshold):
+        """
+        Find an existing product whose name and brand are near duplicates
+        
+        :param name: Vendor product name
+        :param brand: Vendor product brand
+        :param vendor_id: vendor.config ID importing the product
+        :param threshold: Minimum estimated Jaccard similarity (0-1)
+        :return: Tuple (product.template record, similarity), empty record if none
+        """
+        candidates = self._find_similar_products([(name, brand)], vendor_id, threshold)[0]
+        if candidates:
+            product_tmpl_id, score = candidates[0]
+            return self.env['product.template'].browse(product_tmpl_id), score
+        return self.env['product.template'], 0.0
+    
+    @api.model
+    def _find_similar_products(self, entries, vendor_id, threshold):
+        """
+        Find the near duplicates of many names and brands with one query
+        
+        Candidates are the products sharing at least one LSH band key, an
+        indexed lookup whatever the size of the catalog; only the 50 sharing
+        the most keys with each name are compared. Products the vendor
+        already supplies are left out before the best candidates are picked,
+        since they are a different item of that vendor and must not crowd
+        out the others.
+        
+        :param entries: List of (name, brand) tuples
+        :param vendor_id: vendor.config ID importing the products
+        :param threshold: Minimum estimated Jaccard similarity (0-1)
+        :return: List aligned with entries, each a list of (product.template
+                 ID, similarity) tuples reaching the threshold, best first
+        """
+        signatures = [self._hasher.signature(name, brand) for name, brand in entries]
+        entry_indexes, band_keys = [], []
+        for index, signature in enumerate(signatures):
+            if signature:
+                for key in self._hasher.band_keys(signature):
+                    entry_indexes.append(index)
+                    band_keys.append(key)
+        results = [[] for dummy in entries]
+        if not band_keys:
+            return results
+        
+        self.flush_model()
+        self.env['product.name.signature.band'].flush_model()
+        self.env['product.vendor.info'].flush_model(['product_tmpl_id', 'vendor_id'])
+        self.env.cr.execute("""
+            WITH candidate AS (
+                SELECT wanted.entry, b.signature_id,
+                       ROW_NUMBER() OVER (PARTITION BY wanted.entry ORDER BY COUNT(*) DESC) AS rank
+                  FROM unnest(%s::int[], %s::int[]) AS wanted(entry, band_key)
+                  JOIN product_name_signature_band b ON b.band_key = wanted.band_key
+                  JOIN product_name_signature bs ON bs.id = b.signature_id
+                 WHERE NOT EXISTS (SELECT 1
+                                     FROM product_vendor_info pvi
+                                    WHERE pvi.product_tmpl_id = bs.product_tmpl_id
+                                      AND pvi.vendor_id = %s)
+              GROUP BY wanted.entry, b.signature_id
+            )
+            SELECT candidate.entry, s.product_tmpl_id, s.signature
+              FROM candidate
+              JOIN product_name_signature s ON s.id = candidate.signature_id
+             WHERE candidate.rank <= 50
+        """, (entry_indexes, band_keys, vendor_id))
+        
+        loaded = {}
+        for index, product_tmpl_id, data in self.env.cr.fetchall():
+            if product_tmpl_id not in loaded:
+                loaded[product_tmpl_id] = self._hasher.loads(data)
+            score = self._hasher.similarity(signatures[index], loaded[product_tmpl_id])
+            if score >= threshold:
+                results[index].append((product_tmpl_id, score))
+        for candidates in results:
+            candidates.sort(key=lambda candidate: (-candidate[1], candidate[0]))
+        return results
+    
+    @api.model
+    def rebuild_index(self, chunk_size=5000):
+        """
+        Index the names of all products, committing after each chunk
+        
+        :param chunk_size: Number of products per chunk
+        """
+        VendorConfig = self.env['vendor.config']
+        VendorInfo = self.env['product.vendor.info']
+        last_id = 0
+        indexed = 0
+        while True:
+            templates = self.env['product.template'].search_fetch(
+                [('id', '>', last_id)], ['name'], order='id', limit=chunk_size)
+            if not templates:
+                break
+            last_id = templates[-1].id
+            
+            brands = {}
+            for vendor_info in VendorInfo.search_fetch([
+                ('product_tmpl_id', 'in', templates.ids),
+                ('vendor_brand', '!=', False),
+            ], ['product_tmpl_id', 'vendor_brand'], order='id'):
+                brands.setdefault(vendor_info.product_tmpl_id.id, vendor_info.vendor_brand)
+            
+            self._index_products([(template.id, template.name, brands.get(template.id)) for template in templates])
+            indexed += len(templates)
+            VendorConfig._commit_import()
+            self.env.invalidate_all()
+        
+        _logger.info('Indexed names of %d products for near-duplicate matching', indexed)
+        return indexed
+
+
+class ProductNameSignatureBand(models.Model):
+    _name = 'product.name.signature.band'
+    _description = 'Product Name LSH Band'
+    _log_access = False
+
+    signature_id = fields.Many2one('product.name.signature', string='Signature', required=True,
+                                   ondelete='cascade', index=True)
+    band_key = fields.Integer(string='Band Key', required=True, index=True)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from ..tools import canonical_gtin
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    gtin = fields.Char(string='GTIN', compute='_compute_gtin', store=True, index='btree_not_null',
+                       help='Barcode as a check-digit validated, zero-padded 14-digit GTIN, '
+                            'used to match vendor products whatever format they send')
+    
+    @api.depends('barcode')
+    def _compute_gtin(self):
+        for record in self:
+            record.gtin = canonical_gtin(record.barcode)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from odoo.tools import sql
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -24,6 +25,18 @@ class ProductTemplate(models.Model):
     best_vendor_id = fields.Many2one('vendor.config', string='Best Vendor', 
                                      compute='_compute_best_vendor_cost', store=True)
     
+    def init(self):
+        """Indexes for matching vendor products to the catalog by reference and barcode"""
+        super().init()
+        cr = self.env.cr
+        # default_code is stored on the template; barcode is searched on the variants
+        sql.create_index(cr, 'product_template_vpi_default_code_idx', 'product_template',
+                         ['default_code'], where='default_code IS NOT NULL')
+        sql.create_index(cr, 'product_product_vpi_default_code_tmpl_idx', 'product_product',
+                         ['default_code', 'product_tmpl_id'], where='default_code IS NOT NULL')
+        sql.create_index(cr, 'product_product_vpi_barcode_tmpl_idx', 'product_product',
+                         ['barcode', 'product_tmpl_id'], where='barcode IS NOT NULL')
+    
     def _compute_vendor_count(self):
         for record in self:
             record.vendor_count = len(record.vendor_info_ids)
@@ -34,10 +47,14 @@ class ProductTemplate(models.Model):
             primary = record.vendor_info_ids.filtered(lambda v: v.is_primary_vendor)
             record.primary_vendor_id = primary[:1].vendor_id if primary else False
     
-    @api.depends('vendor_info_ids', 'vendor_info_ids.vendor_cost', 'vendor_info_ids.vendor_stock_status')
+    @api.depends('vendor_info_ids', 'vendor_info_ids.vendor_cost', 'vendor_info_ids.vendor_stock_status',
+                 'vendor_info_ids.active')
     def _compute_best_vendor_cost(self):
+        best = self.env['product.vendor.info']._get_best_vendor_infos([
+            record.id for record in self if isinstance(record.id, int)
+        ])
         for record in self:
-            best_vendor_info = self.env['product.vendor.info'].get_best_vendor_for_product(record.id)
+            best_vendor_info = best.get(record.id)
             if best_vendor_info:
                 record.best_vendor_cost = best_vendor_info.vendor_cost
                 record.best_vendor_id = best_vendor_info.vendor_id
@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from odoo.models import PREFETCH_MAX
+from odoo.tools import split_every, sql
+from ..tools import canonical_gtin
+from datetime import timedelta
 import logging
+import time
 
 _logger = logging.getLogger(__name__)
 
@@ -22,6 +27,9 @@ class ProductVendorInfo(models.Model):
                                      help='Direct link to product on vendor website')
     vendor_sku = fields.Char(string='Vendor SKU')
     vendor_barcode = fields.Char(string='Vendor Barcode/EAN/UPC')
+    vendor_gtin = fields.Char(string='Vendor GTIN', compute='_compute_vendor_gtin', store=True,
+                              index='btree_not_null',
+                              help='Vendor barcode as a check-digit validated, zero-padded 14-digit GTIN')
     
     # Pricing
     vendor_cost = fields.Float(string='Vendor Cost', required=True, default=0.0,
@@ -32,6 +40,9 @@ class ProductVendorInfo(models.Model):
     # Calculated Prices
     calculated_sale_price = fields.Float(string='Calculated Sale Price', compute='_compute_calculated_price', store=True)
     profit_margin = fields.Float(string='Profit Margin %', compute='_compute_profit_margin', store=True)
+    reprice_pending = fields.Boolean(string='Repricing Pending', readonly=True, copy=False,
+                                     help='A price tier covering this row changed; the calculated sale price '
+                                          'will be updated by the background repricing job')
     
     # Stock Information
     vendor_qty_available = fields.Float(string='Vendor Stock', default=0.0)
@@ -45,12 +56,29 @@ class ProductVendorInfo(models.Model):
     
     # Sync Information
     last_sync_date = fields.Datetime(string='Last Sync Date', readonly=True)
+    content_hash = fields.Char(string='Content Hash', readonly=True, copy=False,
+                               help='Hash of the vendor data at the last import, to skip unchanged products')
+    last_seen_log_id = fields.Many2one('vendor.import.log', string='Last Seen In', readonly=True, copy=False,
+                                       ondelete='set null', index='btree_not_null')
+    removed_date = fields.Datetime(string='Removed On', readonly=True, copy=False, index='btree_not_null',
+                                   help='When an import found the product gone from the vendor catalog; '
+                                        'the product is restored when the vendor lists it again')
     sync_status = fields.Selection([
         ('synced', 'Synced'),
         ('pending', 'Pending'),
         ('error', 'Error'),
     ], string='Sync Status', default='pending')
     sync_error = fields.Text(string='Sync Error')
+    sync_priority = fields.Float(string='Sync Score', readonly=True, index=True, copy=False,
+                                 help='Staleness divided by the target sync interval. Rows scoring 1 or more '
+                                      'are due; the price sync refreshes the highest scores first')
+    sync_interval = fields.Float(string='Target Sync Interval (h)', readonly=True, copy=False,
+                                 help='How often this row should be synced, from its demand and cost volatility')
+    sales_velocity = fields.Float(string='Sales Velocity', readonly=True, copy=False,
+                                  help='Units sold per day over the last 30 days')
+    cost_change_count = fields.Integer(string='Cost Changes', readonly=True, default=0, copy=False)
+    cost_change_rate = fields.Float(string='Cost Changes / Day', readonly=True, copy=False)
+    last_cost_change_date = fields.Datetime(string='Last Cost Change', readonly=True, copy=False)
     
     # Vendor Product Details
     vendor_product_name = fields.Char(string='Vendor Product Name')
@@ -74,17 +102,25 @@ class ProductVendorInfo(models.Model):
     @api.depends('vendor_cost', 'product_tmpl_id', 'vendor_id')
     def _compute_calculated_price(self):
         """Calculate sale price using price tiers"""
+        price_tier_model = self.env['product.price.tier']
+        # Tiers are loaded once for the whole batch, not searched per record
+        tiers = price_tier_model._get_active_tiers() if any(self.mapped('vendor_cost')) else None
         for record in self:
             if record.vendor_cost > 0:
-                price_tier_model = self.env['product.price.tier']
                 record.calculated_sale_price = price_tier_model.calculate_price_for_product(
                     record.vendor_cost,
                     record.product_tmpl_id,
-                    record.vendor_id
+                    record.vendor_id,
+                    tiers=tiers,
                 )
             else:
                 record.calculated_sale_price = 0.0
     
+    @api.depends('vendor_barcode')
+    def _compute_vendor_gtin(self):
+        for record in self:
+            record.vendor_gtin = canonical_gtin(record.vendor_barcode)
+    
     @api.depends('calculated_sale_price', 'vendor_cost')
     def _compute_profit_margin(self):
         """Calculate profit margin percentage"""
@@ -95,38 +131,126 @@ class ProductVendorInfo(models.Model):
             else:
                 record.profit_margin = 0.0
     
+    def init(self):
+        """
+        Create the indexes of the importer access paths
+        
+        - (vendor_id, vendor_product_id): matching vendor rows during imports
+        - (product_tmpl_id, vendor_id): finding the row of a product for a vendor
+        - (product_tmpl_id, vendor_cost, id) on active rows with stock: best
+          vendor, in the order of its DISTINCT ON query
+        - id on rows pending repricing: the repricing job's queue
+        - product_tmpl_id on primary rows, unique: at most one primary vendor
+          per product, even across concurrent imports
+        """
+        cr = self.env.cr
+        sql.create_index(cr, 'product_vendor_info_vendor_product_idx', self._table,
+                         ['vendor_id', 'vendor_product_id'])
+        sql.create_index(cr, 'product_vendor_info_tmpl_vendor_idx', self._table,
+                         ['product_tmpl_id', 'vendor_id'])
+        sql.create_index(cr, 'product_vendor_info_best_vendor_idx', self._table,
+                         ['product_tmpl_id', 'vendor_cost', 'id'],
+                         where="active AND vendor_stock_status IN ('in_stock', 'limited')")
+        sql.create_index(cr, 'product_vendor_info_reprice_pending_idx', self._table,
+                         ['id'], where='reprice_pending')
+        
+        if sql.index_exists(cr, 'product_vendor_info_primary_vendor_uniq'):
+            return
+        # Keep the most recent primary vendor of products that have several
+        self.env.cr.execute("""
+            UPDATE product_vendor_info pvi
+               SET is_primary_vendor = false
+             WHERE pvi.is_primary_vendor
+               AND EXISTS (SELECT 1
+                             FROM product_vendor_info other
+                            WHERE other.product_tmpl_id = pvi.product_tmpl_id
+                              AND other.is_primary_vendor
+                              AND other.id > pvi.id)
+        """)
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX product_vendor_info_primary_vendor_uniq
+                ON product_vendor_info (product_tmpl_id)
+             WHERE is_primary_vendor
+        """)
+    
     @api.model_create_multi
     def create(self, vals_list):
         """Override create to handle primary vendor logic"""
-        records = super(ProductVendorInfo, self).create(vals_list)
-        
-        for record in records:
-            if record.is_primary_vendor:
-                # Unset other primary vendors for same product
-                other_vendors = self.search([
-                    ('product_tmpl_id', '=', record.product_tmpl_id.id),
-                    ('id', '!=', record.id),
-                    ('is_primary_vendor', '=', True),
-                ])
-                other_vendors.write({'is_primary_vendor': False})
+        # The last primary vendor of a product in the batch wins
+        primary_index = {}
+        for index, vals in enumerate(vals_list):
+            if vals.get('is_primary_vendor') and vals.get('product_tmpl_id'):
+                primary_index[vals['product_tmpl_id']] = index
+        if primary_index:
+            for index, vals in enumerate(vals_list):
+                if vals.get('is_primary_vendor') and primary_index.get(vals.get('product_tmpl_id')) != index:
+                    vals['is_primary_vendor'] = False
+            self._unset_primary_vendors(list(primary_index))
         
-        return records
+        return super(ProductVendorInfo, self).create(vals_list)
     
     def write(self, vals):
         """Override write to handle primary vendor logic"""
-        result = super(ProductVendorInfo, self).write(vals)
+        if 'vendor_cost' in vals:
+            self._track_cost_changes(vals['vendor_cost'])
+        
+        if not vals.get('is_primary_vendor'):
+            return super(ProductVendorInfo, self).write(vals)
+        
+        # The last record of each product in self becomes its primary vendor
+        winners = {}
+        for record in self:
+            product_tmpl_id = vals.get('product_tmpl_id') or record.product_tmpl_id.id
+            winners[product_tmpl_id] = record
+        primaries = self.browse([record.id for record in winners.values()])
+        self._unset_primary_vendors(list(winners), keep_ids=primaries.ids)
         
-        if vals.get('is_primary_vendor'):
-            for record in self:
-                # Unset other primary vendors for same product
-                other_vendors = self.search([
-                    ('product_tmpl_id', '=', record.product_tmpl_id.id),
-                    ('id', '!=', record.id),
-                    ('is_primary_vendor', '=', True),
-                ])
-                other_vendors.write({'is_primary_vendor': False})
+        others = self - primaries
+        if others:
+            super(ProductVendorInfo, others).write(dict(vals, is_primary_vendor=False))
+        return super(ProductVendorInfo, primaries).write(vals)
+    
+    @api.model
+    def _unset_primary_vendors(self, product_tmpl_ids, keep_ids=()):
+        """
+        Unset the primary vendor of many products in one statement
         
-        return result
+        :param product_tmpl_ids: List of product.template IDs
+        :param keep_ids: product.vendor.info IDs to leave untouched
+        """
+        self.flush_model(['product_tmpl_id', 'is_primary_vendor'])
+        self.env.cr.execute("""
+            UPDATE product_vendor_info
+               SET is_primary_vendor = false,
+                   write_date = %s,
+                   write_uid = %s
+             WHERE is_primary_vendor
+               AND product_tmpl_id = ANY(%s)
+               AND NOT id = ANY(%s)
+         RETURNING id
+        """, (fields.Datetime.now(), self.env.uid, list(product_tmpl_ids), list(keep_ids)))
+        unset = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if unset:
+            unset.invalidate_recordset(['is_primary_vendor', 'write_date', 'write_uid'])
+            # Marks primary_vendor_id of the products for a single recompute
+            unset.modified(['is_primary_vendor'])
+    
+    def _track_cost_changes(self, new_cost):
+        """
+        Count cost changes, used to measure price volatility
+        
+        :param new_cost: Vendor cost about to be written
+        """
+        changed = self.filtered(lambda record: record.id and record.vendor_cost != float(new_cost or 0.0))
+        if not changed:
+            return
+        self.env.cr.execute("""
+            UPDATE product_vendor_info
+               SET cost_change_count = cost_change_count + 1,
+                   last_cost_change_date = %s
+             WHERE id IN %s
+        """, (fields.Datetime.now(), tuple(changed.ids)))
+        changed.invalidate_recordset(['cost_change_count', 'last_cost_change_date'])
     
     def action_set_as_primary(self):
         """Set this vendor as primary for the product"""
@@ -214,10 +338,395 @@ class ProductVendorInfo(models.Model):
         :param product_tmpl_id: product.template ID
         :return: product.vendor.info record or None
         """
-        vendors = self.search([
-            ('product_tmpl_id', '=', product_tmpl_id),
-            ('active', '=', True),
-            ('vendor_stock_status', 'in', ['in_stock', 'limited']),
-        ], order='vendor_cost')
+        best = self._get_best_vendor_infos([product_tmpl_id])
+        return best.get(product_tmpl_id) or None
+    
+    @api.model
+    def _get_best_vendor_infos(self, product_tmpl_ids):
+        """
+        Get the best vendor (lowest cost with stock) of many products at once
         
-        return vendors[:1] if vendors else None
+        One DISTINCT ON query per batch of products instead of one ordered
+        search per product.
+        
+        :param product_tmpl_ids: List of product.template IDs
+        :return: Dictionary {product.template ID: product.vendor.info record}
+        """
+        self.flush_model(['product_tmpl_id', 'active', 'vendor_stock_status', 'vendor_cost'])
+        rows = []
+        for tmpl_ids in split_every(PREFETCH_MAX, product_tmpl_ids, list):
+            self.env.cr.execute("""
+                SELECT DISTINCT ON (product_tmpl_id) product_tmpl_id, id
+                  FROM product_vendor_info
+                 WHERE product_tmpl_id = ANY(%s)
+                   AND active
+                   AND vendor_stock_status IN ('in_stock', 'limited')
+              ORDER BY product_tmpl_id, vendor_cost, id
+            """, (tmpl_ids,))
+            rows.extend(self.env.cr.fetchall())
+        # Browse all rows together so reading them afterwards is prefetched
+        vendor_infos = self.browse([row[1] for row in rows])
+        return {row[0]: vendor_info for row, vendor_info in zip(rows, vendor_infos)}
+    
+    # -------------------------------------------------------------------------
+    # Scheduled price sync
+    # -------------------------------------------------------------------------
+    
+    @api.model
+    def _refresh_sync_schedule(self):
+        """
+        Recompute the sync schedule of all active rows in one statement
+        
+        Every row gets a target sync interval that shrinks with its sales
+        velocity (units sold per day over the last 30 days) and with the
+        observed frequency of its cost changes, between the configured
+        minimum and maximum interval. sync_priority is the staleness divided
+        by that interval: rows at 1.0 or more are due, and the highest
+        values are the ones whose stale price costs the most.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        days = 30
+        now = fields.Datetime.now()
+        self.flush_model(['last_sync_date', 'active', 'product_tmpl_id', 'cost_change_count'])
+        self.env.cr.execute("""
+            WITH velocity AS (
+                SELECT pp.product_tmpl_id, SUM(sol.product_uom_qty) / %(days)s AS per_day
+                  FROM sale_order_line sol
+                  JOIN product_product pp ON pp.id = sol.product_id
+                 WHERE sol.state IN ('sale', 'done')
+                   AND sol.create_date >= %(since)s
+              GROUP BY pp.product_tmpl_id
+            ), stats AS (
+                SELECT pvi.id,
+                       COALESCE(velocity.per_day, 0.0) AS per_day,
+                       pvi.cost_change_count
+                           / GREATEST(EXTRACT(EPOCH FROM (%(now)s - pvi.create_date)) / 86400.0, 1.0) AS change_rate,
+                       COALESCE(EXTRACT(EPOCH FROM (%(now)s - pvi.last_sync_date)) / 3600.0, 8760.0) AS staleness
+                  FROM product_vendor_info pvi
+             LEFT JOIN velocity ON velocity.product_tmpl_id = pvi.product_tmpl_id
+                 WHERE pvi.active
+            ), schedule AS (
+                SELECT id, per_day, change_rate, staleness,
+                       GREATEST(%(max_interval)s / (1.0 + per_day * %(demand_weight)s
+                                                        + change_rate * %(volatility_weight)s),
+                                %(min_interval)s) AS sync_interval
+                  FROM stats
+            )
+            UPDATE product_vendor_info pvi
+               SET sales_velocity = schedule.per_day,
+                   cost_change_rate = schedule.change_rate,
+                   sync_interval = schedule.sync_interval,
+                   sync_priority = schedule.staleness / schedule.sync_interval
+              FROM schedule
+             WHERE schedule.id = pvi.id
+        """, {
+            'days': float(days),
+            'since': now - timedelta(days=days),
+            'now': now,
+            'min_interval': float(ICP.get_param('vendor_product_importer.price_sync_min_interval_hours', 6)),
+            'max_interval': float(ICP.get_param('vendor_product_importer.price_sync_max_interval_hours', 720)),
+            # One unit sold per day, or one cost change per month, halves the interval
+            'demand_weight': 1.0,
+            'volatility_weight': float(days),
+        })
+        self.invalidate_model(['sales_velocity', 'cost_change_rate', 'sync_interval', 'sync_priority'])
+    
+    @api.model
+    def cron_sync_prices(self):
+        """
+        Scheduled action to refresh vendor prices
+        
+        Only rows that are due according to their adaptive schedule are
+        synced, at most vendor_product_importer.price_sync_quota per run (the
+        vendor API quota), in sync_priority order with keyset pagination, so
+        the most important prices are refreshed first when the quota or the
+        time budget runs out. Each chunk is grouped by vendor and handed to the adapter's
+        batch sync, then committed, and the ORM cache is cleared so memory
+        stays bounded however many rows are synced.
+        """
+        VendorConfig = self.env['vendor.config']
+        ICP = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(ICP.get_param('vendor_product_importer.price_sync_chunk_size', 200))
+        quota = int(ICP.get_param('vendor_product_importer.price_sync_quota', 0))
+        budget = VendorConfig._get_import_time_budget()
+        deadline = time.time() + budget if budget else None
+        
+        self._refresh_sync_schedule()
+        VendorConfig._commit_import()
+        
+        run_start = fields.Datetime.now()
+        last_key = None
+        synced_count = failed_count = 0
+        while not deadline or time.time() < deadline:
+            limit = chunk_size
+            if quota:
+                limit = min(chunk_size, quota - synced_count - failed_count)
+                if limit <= 0:
+                    break
+            params = {'run_start': run_start, 'limit': limit}
+            keyset = ''
+            if last_key:
+                keyset = 'AND (pvi.sync_priority, pvi.id) < (%(priority)s, %(id)s)'
+                params.update(priority=last_key[0], id=last_key[1])
+            self.env.cr.execute("""
+                SELECT pvi.id, pvi.sync_priority
+                  FROM product_vendor_info pvi
+                  JOIN vendor_config vc ON vc.id = pvi.vendor_id
+                 WHERE pvi.active
+                   AND vc.active
+                   AND vc.auto_update_prices
+                   AND pvi.sync_priority >= 1.0
+                   AND (pvi.last_sync_date IS NULL OR pvi.last_sync_date < %%(run_start)s)
+                   %s
+              ORDER BY pvi.sync_priority DESC, pvi.id DESC
+                 LIMIT %%(limit)s
+            """ % keyset, params)
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            last_key = rows[-1]
+            
+            synced, failed = self.browse([row[0] for row in rows])._sync_prices_by_vendor()
+            synced_count += len(synced)
+            failed_count += len(failed)
+            
+            VendorConfig._commit_import()
+            self.env.invalidate_all()
+        
+        _logger.info('Price sync finished: %d synced, %d failed', synced_count, failed_count)
+    
+    @api.model
+    def cron_sync_stock(self):
+        """
+        Scheduled action to refresh vendor stock levels
+        
+        Lightweight alternative to a full import for vendors with
+        auto_update_stock: adapters only fetch availability, and only
+        vendor_qty_available and vendor_stock_status are written, in bulk.
+        Vendors whose adapter cannot fetch stock alone are skipped.
+        """
+        VendorConfig = self.env['vendor.config']
+        ICP = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(ICP.get_param('vendor_product_importer.stock_sync_chunk_size', 1000))
+        budget = VendorConfig._get_import_time_budget()
+        deadline = time.time() + budget if budget else None
+        
+        vendors = VendorConfig.search([('active', '=', True), ('auto_update_stock', '=', True)])
+        adapters = {}
+        for vendor in vendors:
+            adapter = vendor._get_adapter()
+            if adapter.supports_stock_sync:
+                adapters[vendor] = adapter
+            else:
+                _logger.info('Skipping stock sync for vendor %s: %s does not support stock-only sync',
+                             vendor.name, adapter.__class__.__name__)
+        
+        updated_count = flipped_count = 0
+        for vendor, adapter in adapters.items():
+            try:
+                last_id = 0
+                while not deadline or time.time() < deadline:
+                    vendor_infos = self.search([
+                        ('vendor_id', '=', vendor.id),
+                        ('id', '>', last_id),
+                    ], order='id', limit=chunk_size)
+                    if not vendor_infos:
+                        break
+                    last_id = vendor_infos[-1].id
+                    
+                    updated, flipped = self._write_stock_levels(adapter.fetch_stock(vendor_infos))
+                    updated_count += updated
+                    flipped_count += flipped
+                    VendorConfig._commit_import()
+                    self.env.invalidate_all()
+            except Exception as e:
+                _logger.error('Stock sync failed for vendor %s: %s', vendor.name, str(e))
+                self.env.cr.rollback()
+        
+        _logger.info('Stock sync finished: %d rows updated, %d stock status changes',
+                     updated_count, flipped_count)
+    
+    @api.model
+    def _get_reprice_scope_where(self, scope):
+        """
+        SQL condition selecting the rows a price tier applies to
+        
+        :param scope: Dictionary with min_cost, max_cost (0 for unlimited),
+                      categ_ids and vendor_ids (empty for all), see
+                      product.price.tier._get_reprice_scope()
+        :return: Tuple (SQL condition on alias pvi, parameters)
+        """
+        conditions = ['pvi.vendor_cost > 0', 'pvi.vendor_cost >= %s']
+        params = [scope['min_cost']]
+        if scope['max_cost']:
+            conditions.append('pvi.vendor_cost <= %s')
+            params.append(scope['max_cost'])
+        if scope['vendor_ids']:
+            conditions.append('pvi.vendor_id = ANY(%s)')
+            params.append(list(scope['vendor_ids']))
+        if scope['categ_ids']:
+            conditions.append('pvi.product_tmpl_id IN (SELECT id FROM product_template WHERE categ_id = ANY(%s))')
+            params.append(list(scope['categ_ids']))
+        return ' AND '.join(conditions), params
+    
+    @api.model
+    def _mark_reprice_pending(self, scopes):
+        """
+        Queue the rows covered by changed price tiers for repricing
+        
+        Only marks the rows, in one statement per scope: the prices are
+        recomputed later by cron_reprice(), so saving a tier stays instant
+        however large the catalog is.
+        
+        :param scopes: List of tier scopes, see _get_reprice_scope_where()
+        :return: Number of rows newly marked
+        """
+        if not scopes:
+            return 0
+        self.flush_model(['vendor_cost', 'vendor_id', 'product_tmpl_id', 'reprice_pending'])
+        marked = 0
+        for scope in scopes:
+            where, params = self._get_reprice_scope_where(scope)
+            self.env.cr.execute("""
+                UPDATE product_vendor_info pvi
+                   SET reprice_pending = true
+                 WHERE pvi.reprice_pending IS NOT TRUE
+                   AND %s
+            """ % where, params)
+            marked += self.env.cr.rowcount
+        if marked:
+            self.invalidate_model(['reprice_pending'])
+            cron = self.env.ref('vendor_product_importer.ir_cron_vendor_reprice', raise_if_not_found=False)
+            if cron:
+                cron._trigger()
+        _logger.info('Marked %d vendor prices for repricing', marked)
+        return marked
+    
+    @api.model
+    def cron_reprice(self):
+        """
+        Scheduled action recomputing the sale prices of rows marked by a tier change
+        
+        Works through the queue in id order, one chunk per transaction with
+        the tiers loaded once per chunk, until the queue is empty or the time
+        budget runs out; the cron then triggers itself to continue.
+        """
+        VendorConfig = self.env['vendor.config']
+        ICP = self.env['ir.config_parameter'].sudo()
+        chunk_size = int(ICP.get_param('vendor_product_importer.reprice_chunk_size', 2000))
+        budget = VendorConfig._get_import_time_budget()
+        deadline = time.time() + budget if budget else None
+        
+        repriced_count = 0
+        while True:
+            if deadline and time.time() >= deadline:
+                self.env.ref('vendor_product_importer.ir_cron_vendor_reprice')._trigger()
+                break
+            self.env.cr.execute("""
+                SELECT id
+                  FROM product_vendor_info
+                 WHERE reprice_pending
+              ORDER BY id
+                 LIMIT %s
+            """, (chunk_size,))
+            vendor_infos = self.with_context(active_test=False).browse([row[0] for row in self.env.cr.fetchall()])
+            if not vendor_infos:
+                break
+            
+            vendor_infos._reprice()
+            repriced_count += len(vendor_infos)
+            VendorConfig._commit_import()
+            self.env.invalidate_all()
+        
+        _logger.info('Repricing finished: %d vendor prices recomputed', repriced_count)
+    
+    def _reprice(self):
+        """Recompute the calculated sale price and margin of these rows and clear their flag"""
+        for field_name in ('calculated_sale_price', 'profit_margin'):
+            self.env.add_to_compute(self._fields[field_name], self)
+        self.write({'reprice_pending': False})
+        self.flush_recordset()
+    
+    @api.model
+    def _write_stock_levels(self, levels):
+        """
+        Write stock levels in one statement, touching only changed rows
+        
+        The best vendor of a product is recomputed only when the stock status
+        of one of its rows actually changed, since quantity alone does not
+        affect it.
+        
+        :param levels: Dictionary {product.vendor.info id: (qty_available, stock_status)}
+        :return: Tuple (number of rows updated, number of stock status changes)
+        """
+        if not levels:
+            return 0, 0
+        
+        ids = list(levels)
+        self.flush_model(['vendor_qty_available', 'vendor_stock_status'])
+        self.env.cr.execute("""
+            UPDATE product_vendor_info pvi
+               SET vendor_qty_available = new.qty,
+                   vendor_stock_status = new.status,
+                   write_date = %s,
+                   write_uid = %s
+              FROM unnest(%s::int[], %s::float8[], %s::varchar[]) AS new(id, qty, status),
+                   product_vendor_info old
+             WHERE pvi.id = new.id
+               AND old.id = new.id
+               AND (pvi.vendor_qty_available IS DISTINCT FROM new.qty
+                    OR pvi.vendor_stock_status IS DISTINCT FROM new.status)
+         RETURNING pvi.id, pvi.product_tmpl_id, old.vendor_stock_status IS DISTINCT FROM new.status
+        """, (
+            fields.Datetime.now(), self.env.uid, ids,
+            [float(levels[id_][0] or 0.0) for id_ in ids],
+            [levels[id_][1] for id_ in ids],
+        ))
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return 0, 0
+        
+        updated = self.browse([row[0] for row in rows])
+        updated.invalidate_recordset(['vendor_qty_available', 'vendor_stock_status', 'write_date', 'write_uid'])
+        
+        flipped = self.browse([row[0] for row in rows if row[2]])
+        templates = self.env['product.template'].browse({row[1] for row in rows if row[2]})
+        if templates:
+            # Best vendor depends on the stock status: recompute it for these products only
+            self.env.add_to_compute(templates._fields['best_vendor_cost'], templates)
+            self.env.add_to_compute(templates._fields['best_vendor_id'], templates)
+            templates.flush_recordset(['best_vendor_cost', 'best_vendor_id'])
+        return len(updated), len(flipped)
+    
+    def _sync_prices_by_vendor(self):
+        """
+        Sync these rows, one adapter batch call per vendor
+        
+        :return: Tuple (synced, failed) of product.vendor.info recordsets
+        """
+        synced = failed = self.browse()
+        vendor_infos_by_vendor = {}
+        for vendor_info in self:
+            vendor_infos_by_vendor.setdefault(vendor_info.vendor_id, self.browse())
+            vendor_infos_by_vendor[vendor_info.vendor_id] |= vendor_info
+        
+        for vendor, vendor_infos in vendor_infos_by_vendor.items():
+            try:
+                adapter = vendor._get_adapter()
+                vendor_synced, vendor_failed = adapter.sync_products(vendor_infos)
+            except Exception as e:
+                _logger.error('Price sync failed for vendor %s: %s', vendor.name, str(e))
+                vendor_synced, vendor_failed = self.browse(), vendor_infos
+                vendor_infos.write({'sync_error': str(e)})
+            synced |= vendor_synced
+            failed |= vendor_failed
+        
+        if synced:
+            synced.write({
+                'sync_status': 'synced',
+                'last_sync_date': fields.Datetime.now(),
+                'sync_error': False,
+            })
+        if failed:
+            failed.write({'sync_status': 'error'})
+        return synced, failed
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import config
+from datetime import timedelta
 import logging
+import os
+import threading
+import time
+import zlib
 
 _logger = logging.getLogger(__name__)
 
@@ -19,6 +25,7 @@ class VendorConfig(models.Model):
         ('ebay', 'eBay'),
         ('shopify', 'Shopify'),
         ('generic', 'Generic Website'),
+        ('feed', 'File Feed (CSV/XLSX/XML)'),
     ], string='Vendor Type', required=True, default='generic')
     
     # Connection Details
@@ -76,6 +83,25 @@ class VendorConfig(models.Model):
     ean_selector = fields.Char(string='EAN/UPC Selector')
     category_selector = fields.Char(string='Category Selector')
     
+    # File Feed Configuration
+    feed_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+        ('xml', 'XML'),
+    ], string='Feed Format', default='csv')
+    feed_attachment_id = fields.Many2one('ir.attachment', string='Feed File',
+                                         help='Uploaded feed file, used instead of the feed path when set')
+    feed_path = fields.Char(string='Feed Path or URL', groups='base.group_system',
+                            help='HTTP(S) URL of the feed, or local path on the server inside the feed '
+                                 'directory set by the administrator. '
+                                 'Gzip and zip compressed feeds are supported')
+    feed_csv_delimiter = fields.Char(string='CSV Delimiter', default=',', size=1)
+    feed_encoding = fields.Char(string='Feed Encoding', default='utf-8')
+    feed_xml_item_tag = fields.Char(string='XML Product Element', default='product',
+                                    help='Name of the XML element holding one product')
+    feed_id_column = fields.Char(string='Product ID Column',
+                                 help='Feed column holding the vendor product ID')
+    
     # Import Settings
     import_frequency = fields.Selection([
         ('manual', 'Manual Only'),
@@ -86,13 +112,44 @@ class VendorConfig(models.Model):
     
     last_import_date = fields.Datetime(string='Last Import Date', readonly=True)
     next_import_date = fields.Datetime(string='Next Import Date', compute='_compute_next_import_date', store=True)
+    import_window_start = fields.Float(string='Import Window Start', default=0.0,
+                                       help='Hour of the day (UTC) from which scheduled imports may start')
+    import_window_end = fields.Float(string='Import Window End', default=0.0,
+                                     help='Hour of the day (UTC) until which scheduled imports may start. '
+                                          'The window may wrap around midnight; equal start and end '
+                                          'allow the whole day')
     
     auto_update_prices = fields.Boolean(string='Auto Update Prices', default=True,
                                        help='Automatically update product prices on import')
     auto_update_stock = fields.Boolean(string='Auto Update Stock', default=False,
-                                      help='Automatically update stock levels on import')
+                                      help='Refresh stock levels hourly with a stock-only sync')
     auto_create_products = fields.Boolean(string='Auto Create Products', default=True,
                                          help='Automatically create new products if not found')
+    removed_product_action = fields.Selection([
+        ('out_of_stock', 'Mark Out of Stock'),
+        ('archive', 'Archive'),
+        ('none', 'Keep As Is'),
+    ], string='Removed Products', default='out_of_stock', required=True,
+        help='What to do with vendor products missing from a complete scheduled import')
+    name_match_threshold = fields.Float(string='Name Match Threshold', default=0.0,
+                                        help='Link vendor products without a matching SKU or barcode to an '
+                                             'existing product whose name and brand are at least this similar '
+                                             '(0 to 1, e.g. 0.8), instead of creating a new product. '
+                                             '0 disables name matching')
+    import_shard_count = fields.Integer(string='Import Shards', default=1,
+                                        help='Split scheduled imports of this vendor into this many shards, '
+                                             'imported in parallel by the import workers and merged into one '
+                                             'import log. Products are assigned to shards by a hash of their '
+                                             'vendor product ID. Only website scraping and uploaded or local '
+                                             'feeds can be sharded: each shard skips the other shards\' '
+                                             'products without fetching them')
+    record_payloads = fields.Boolean(string='Record Payloads', default=False,
+                                     help='Store the raw vendor payloads of each import on its log, so the '
+                                          'import can be replayed offline to reproduce or benchmark it')
+    profile_import = fields.Boolean(string='Profile Imports', default=False,
+                                    help='Profile CPU time and memory allocations of each import and attach '
+                                         'the result to the import log. Slows imports down; enable only to '
+                                         'investigate a slow vendor')
     
     # Filtering
     category_filter = fields.Char(string='Category Filter',
@@ -120,18 +177,86 @@ class VendorConfig(models.Model):
     # Notes
     notes = fields.Text(string='Notes')
     
-    @api.depends('import_frequency', 'last_import_date')
+    @api.depends('import_frequency', 'last_import_date', 'import_window_start', 'import_window_end')
     def _compute_next_import_date(self):
-        from datetime import timedelta
+        jitter = self._get_import_jitter()
         for record in self:
-            if record.import_frequency == 'manual' or not record.last_import_date:
+            if record.import_frequency == 'manual':
                 record.next_import_date = False
+                continue
+            
+            if not record.last_import_date:
+                base = record.create_date or fields.Datetime.now()
             elif record.import_frequency == 'daily':
-                record.next_import_date = record.last_import_date + timedelta(days=1)
+                base = record.last_import_date + timedelta(days=1)
             elif record.import_frequency == 'weekly':
-                record.next_import_date = record.last_import_date + timedelta(weeks=1)
-            elif record.import_frequency == 'monthly':
-                record.next_import_date = record.last_import_date + timedelta(days=30)
+                base = record.last_import_date + timedelta(weeks=1)
+            else:
+                base = record.last_import_date + timedelta(days=30)
+            record.next_import_date = record._get_import_slot(base, jitter)
+    
+    @api.model
+    def _get_import_jitter(self):
+        """
+        :return: Maximum delay in seconds added to a scheduled import, from
+                 vendor_product_importer.import_jitter_hours
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        return max(int(float(ICP.get_param('vendor_product_importer.import_jitter_hours', 6)) * 3600), 0)
+    
+    def _get_import_slot(self, base, jitter):
+        """
+        Spread a scheduled import over the jitter period and the import window
+        
+        The delay is derived from the vendor and the base date, so it is stable
+        across recomputations but differs between vendors due at the same time.
+        
+        :param base: Earliest date of the import
+        :param jitter: Maximum delay in seconds
+        :return: Date the import should start
+        """
+        self.ensure_one()
+        offset = zlib.crc32(('%s/%s' % (self.id, base)).encode()) % jitter if jitter else 0
+        start, end = self.import_window_start % 24, self.import_window_end % 24
+        if start == end:
+            return base + timedelta(seconds=offset)
+        
+        length = ((end - start) % 24) * 3600
+        opening = base.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(hours=start)
+        if opening > base:
+            opening -= timedelta(days=1)
+        
+        candidate = base + timedelta(seconds=offset)
+        if candidate < opening + timedelta(seconds=length):
+            return candidate
+        # Outside the window: start somewhere in the next one
+        opening += timedelta(days=1)
+        while opening + timedelta(seconds=length) <= base:
+            opening += timedelta(days=1)
+        return max(opening, base) + timedelta(seconds=offset % length)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(VendorConfig, self).create(vals_list)
+        records._schedule_next_import()
+        return records
+    
+    def write(self, vals):
+        result = super(VendorConfig, self).write(vals)
+        if {'import_frequency', 'last_import_date', 'import_window_start', 'import_window_end', 'active'} & set(vals):
+            self._schedule_next_import()
+        return result
+    
+    def _schedule_next_import(self):
+        """Trigger the import dispatcher at the next scheduled import of these vendors"""
+        dispatcher = self.env.ref('vendor_product_importer.ir_cron_vendor_import_weekly',
+                                  raise_if_not_found=False)
+        if not dispatcher:
+            return
+        dates = {record.next_import_date for record in self
+                 if record.active and record.next_import_date}
+        for date in sorted(dates):
+            dispatcher.sudo()._trigger(at=max(date, fields.Datetime.now()))
     
     def _compute_product_count(self):
         for record in self:
@@ -143,12 +268,61 @@ class VendorConfig(models.Model):
         for record in self:
             record.import_log_count = len(record.import_log_ids)
     
+    @api.constrains('name_match_threshold')
+    def _check_name_match_threshold(self):
+        for record in self:
+            if not 0.0 <= record.name_match_threshold <= 1.0:
+                raise ValidationError(_('The name match threshold must be between 0 and 1.'))
+    
+    @api.constrains('import_shard_count', 'vendor_type', 'feed_path', 'feed_attachment_id')
+    def _check_import_shard_count(self):
+        for record in self:
+            if record.import_shard_count < 1:
+                raise ValidationError(_('The number of import shards must be at least 1.'))
+            if record.import_shard_count > 1 and not record._get_adapter().supports_sharding:
+                raise ValidationError(_(
+                    'Imports of %s cannot be sharded: every shard would fetch the whole catalog. '
+                    'Only website scraping and uploaded or local feeds can be sharded.') % record.name)
+    
     @api.constrains('website_url')
     def _check_website_url(self):
         for record in self:
             if record.website_url and not record.website_url.startswith(('http://', 'https://')):
                 raise ValidationError(_('Website URL must start with http:// or https://'))
     
+    @api.constrains('feed_path')
+    def _check_feed_path(self):
+        for record in self.sudo():
+            if record.feed_path and not record.feed_path.startswith(('http://', 'https://')):
+                try:
+                    record._get_feed_local_path()
+                except UserError as e:
+                    raise ValidationError(e.args[0])
+    
+    def _get_feed_local_path(self):
+        """
+        Resolve the local feed path of this vendor
+        
+        Local feeds are only read inside the directory set by the
+        administrator in the vendor_product_importer.feed_directory system
+        parameter, so a vendor cannot be used to read other server files.
+        Relative paths are taken from that directory.
+        
+        :return: Absolute path of the feed
+        :raise UserError: if no feed directory is set or the path leaves it
+        """
+        self.ensure_one()
+        ICP = self.env['ir.config_parameter'].sudo()
+        directory = ICP.get_param('vendor_product_importer.feed_directory')
+        if not directory:
+            raise UserError(_('Local feed paths are disabled: an administrator must set the feed directory '
+                              '(system parameter vendor_product_importer.feed_directory).'))
+        directory = os.path.realpath(directory)
+        path = os.path.realpath(os.path.join(directory, self.sudo().feed_path))
+        if os.path.commonpath([directory, path]) != directory:
+            raise UserError(_('The feed path must be inside the feed directory %s.') % directory)
+        return path
+    
     def action_test_connection(self):
         """Test connection to vendor"""
         self.ensure_one()
@@ -232,69 +406,299 @@ class VendorConfig(models.Model):
             'context': {'default_vendor_id': self.id}
         }
     
-    def _get_adapter(self):
-        """Get the appropriate adapter for this vendor"""
-        adapter_class = self.env['vendor.adapter.base']
+    def _get_adapter(self, import_log=None):
+        """
+        Get the appropriate adapter for this vendor
         
+        :param import_log: vendor.import.log record receiving per-product lines (optional)
+        """
         if self.vendor_type == 'amazon':
             from ..adapters.amazon_adapter import AmazonAdapter
-            return AmazonAdapter(self)
+            return AmazonAdapter(self, import_log)
         elif self.vendor_type == 'ebay':
             from ..adapters.ebay_adapter import EbayAdapter
-            return EbayAdapter(self)
+            return EbayAdapter(self, import_log)
         elif self.vendor_type == 'shopify':
             from ..adapters.shopify_adapter import ShopifyAdapter
-            return ShopifyAdapter(self)
+            return ShopifyAdapter(self, import_log)
+        elif self.vendor_type == 'feed':
+            from ..adapters.feed_adapter import FeedAdapter
+            return FeedAdapter(self, import_log)
         else:
             from ..adapters.generic_adapter import GenericAdapter
-            return GenericAdapter(self)
+            return GenericAdapter(self, import_log)
     
+    def _execute_import(self, adapter, import_log, profile=False):
+        """
+        Run the adapter import, recording its payloads if the vendor asks for it
+        
+        :param adapter: Vendor adapter instance
+        :param import_log: vendor.import.log record receiving the profile and payloads
+        :param profile: Profile CPU and memory of this run
+        :return: Dictionary with import results
+        """
+        if import_log and self.record_payloads and adapter.replay is None:
+            from ..adapters.recorder import PayloadRecorder, open_attachment
+            with open_attachment(import_log.payload_attachment_id) as previous:
+                adapter.recorder = PayloadRecorder(previous)
+            try:
+                return self._execute_adapter(adapter, import_log, profile)
+            finally:
+                adapter.recorder.attach_to(import_log)
+        return self._execute_adapter(adapter, import_log, profile)
+    
+    def _execute_adapter(self, adapter, import_log, profile=False):
+        """Run the adapter import, optionally under the profiler"""
+        if not profile:
+            return adapter.import_products()
+        
+        from ..adapters.profiler import ImportProfiler
+        profiler = ImportProfiler()
+        try:
+            with profiler:
+                return adapter.import_products()
+        finally:
+            profiler.attach_to(import_log)
+    
+    @api.model
     def cron_import_products(self):
-        """Scheduled action to import products"""
+        """
+        Scheduled action to import products
+        
+        Does not import anything itself: every due vendor gets a queued
+        import log, and the import worker crons are triggered to process
+        the queue in parallel, each vendor in its own transaction.
+        
+        The dispatcher is triggered at each vendor's jittered next import
+        date; its own periodic run is only a safety net.
+        """
+        ImportLog = self.env['vendor.import.log']
+        ImportLog._requeue_stale_imports()
+        ImportLog._finalize_sharded_imports()
+        
+        open_vendor_ids = ImportLog.search([
+            ('state', 'in', ['queued', 'in_progress']),
+        ]).mapped('vendor_id').ids
         vendors = self.search([
             ('active', '=', True),
             ('import_frequency', '!=', 'manual'),
+            ('id', 'not in', open_vendor_ids),
             '|',
             ('next_import_date', '<=', fields.Datetime.now()),
-            ('last_import_date', '=', False),
+            ('next_import_date', '=', False),
         ])
         
         for vendor in vendors:
+            vendor._queue_scheduled_import()
+        _logger.info('Queued scheduled import for %d vendors', len(vendors))
+        
+        if ImportLog.search_count([('state', '=', 'queued')]):
+            for worker in self._get_import_workers():
+                worker._trigger()
+    
+    def _queue_scheduled_import(self):
+        """
+        Queue a scheduled import of this vendor for the import workers
+        
+        With more than one shard, a parent log collects the results and one
+        queued log per shard is created.
+        
+        :return: vendor.import.log record of the import
+        """
+        self.ensure_one()
+        ImportLog = self.env['vendor.import.log']
+        # Settings from before the adapter check cannot shard either
+        if self.import_shard_count <= 1 or not self._get_adapter().supports_sharding:
+            return ImportLog.create({
+                'vendor_id': self.id,
+                'state': 'queued',
+                'import_type': 'scheduled',
+            })
+        
+        import_log = ImportLog.create({
+            'vendor_id': self.id,
+            'state': 'in_progress',
+            'import_type': 'scheduled',
+            'shard_count': self.import_shard_count,
+        })
+        ImportLog.create([{
+            'vendor_id': self.id,
+            'state': 'queued',
+            'import_type': 'scheduled',
+            'parent_log_id': import_log.id,
+            'shard_index': index,
+        } for index in range(self.import_shard_count)])
+        return import_log
+    
+    @api.model
+    def _get_import_workers(self):
+        """
+        Get the import worker crons, creating them up to the configured count
+        
+        Each worker cron runs in its own cron thread, so the number of
+        workers bounds how many vendors are imported concurrently (within
+        the server's max_cron_threads).
+        
+        :return: ir.cron records
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        count = max(int(ICP.get_param('vendor_product_importer.import_workers', 2)), 1)
+        
+        template = self.env.ref('vendor_product_importer.ir_cron_vendor_import_worker').sudo()
+        workers = self.env['ir.cron'].sudo().with_context(active_test=False).search([
+            ('model_id', '=', template.model_id.id),
+            ('code', '=', template.code),
+        ], order='id')
+        for index in range(len(workers), count):
+            workers |= template.copy({
+                'name': '%s %d' % (template.name, index + 1),
+                'active': True,
+            })
+        return workers[:count].filtered('active')
+    
+    @api.model
+    def _cron_run_import_worker(self):
+        """
+        Import worker: process queued vendor imports until the queue is empty
+        
+        A vendor is only imported while holding its advisory lock, the same
+        one manual and replayed imports take, so two imports of a vendor never
+        overlap; only the shards of one import share it. Every import is
+        committed on its own; a failing vendor does not roll back the others.
+        """
+        ImportLog = self.env['vendor.import.log']
+        budget = self._get_import_time_budget()
+        deadline = time.time() + budget if budget else None
+        
+        while not deadline or time.time() < deadline:
+            import_log = ImportLog._claim_queued_import()
+            if not import_log:
+                break
+            
+            vendor = import_log.vendor_id
             try:
                 _logger.info('Starting scheduled import for vendor: %s', vendor.name)
-                vendor._run_import()
+                vendor._run_import(import_log, deadline=deadline, commit=True)
+                self._commit_import()
             except Exception as e:
                 _logger.error('Scheduled import failed for vendor %s: %s', vendor.name, str(e))
+                self.env.cr.rollback()
+                import_log.write({
+                    'state': 'failed',
+                    'end_date': fields.Datetime.now(),
+                    'notes': 'Import failed: %s' % str(e),
+                })
+                self._commit_import()
+            finally:
+                import_log._release_import_lock()
+            
+            if import_log.parent_log_id and import_log.state in ('done', 'failed'):
+                import_log.parent_log_id._finalize_shards()
+        
+        # Imports paused by the time budget (or not reached) continue in a new run
+        if ImportLog.search_count([('state', '=', 'queued')]):
+            for worker in self._get_import_workers():
+                worker._trigger()
+    
+    @api.model
+    def _get_import_time_budget(self):
+        """
+        Time a cron run may spend importing before it pauses and reschedules
+        
+        Defaults to 80% of the cron hard time limit so the run stops cleanly
+        before the server kills it.
+        
+        :return: Budget in seconds, or 0 for no limit
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        budget = int(ICP.get_param('vendor_product_importer.import_time_budget', 0))
+        if budget:
+            return max(budget, 0)
+        
+        limit = config.get('limit_time_real_cron') or 0
+        if limit < 0:
+            limit = config.get('limit_time_real') or 0
+        return int(limit * 0.8) if limit > 0 else 0
     
-    def _run_import(self):
-        """Execute the import process"""
+    def _commit_import(self):
+        """Commit the current import transaction, except when running tests"""
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
+    
+    def _run_import(self, import_log=None, deadline=None, commit=False, replay=None):
+        """
+        Execute the import process
+        
+        With a deadline, the import stops at the first product fetched after
+        it, checkpoints the products fetched so far, and the log is queued
+        again with its resume cursor, so the next worker run continues where
+        this one stopped.
+        
+        :param import_log: vendor.import.log record to run (optional, created if missing)
+        :param deadline: time.time() value after which the import pauses (optional)
+        :param commit: Commit after every chunk, together with the resume cursor
+        :param replay: PayloadReplay to import from instead of the vendor (optional)
+        :return: Dictionary with import results
+        """
         self.ensure_one()
         
-        # Create import log
-        import_log = self.env['vendor.import.log'].create({
-            'vendor_id': self.id,
-            'state': 'in_progress',
-        })
+        if import_log:
+            import_log.write({'state': 'in_progress'})
+        else:
+            # Create import log
+            import_log = self.env['vendor.import.log'].create({
+                'vendor_id': self.id,
+                'state': 'in_progress',
+            })
         
         try:
-            adapter = self._get_adapter()
-            result = adapter.import_products()
+            base_counts = import_log._get_import_counts()
+            adapter = self._get_adapter(import_log)
+            adapter.resume_cursor = import_log.resume_cursor or None
+            adapter.deadline = deadline
+            adapter.replay = replay
+            if import_log.parent_log_id:
+                adapter.shard = (import_log.shard_index, import_log.parent_log_id.shard_count)
+            if commit:
+                def checkpoint(cursor, counts):
+                    import_log._save_checkpoint(cursor, base_counts, counts)
+                    self._commit_import()
+                adapter.checkpoint = checkpoint
+            
+            result = self._execute_import(adapter, import_log, profile=self.profile_import)
+            vals = import_log._prepare_count_vals(base_counts, result)
+            
+            if not result.get('complete', True):
+                vals.update({
+                    'state': 'queued',
+                    'resume_cursor': result.get('cursor') or import_log.resume_cursor,
+                    'resume_count': import_log.resume_count + 1,
+                })
+                import_log.write(vals)
+                import_log._store_metrics(result.get('metrics'))
+                _logger.info('Import for vendor %s paused at cursor %s, queued to resume',
+                             self.name, vals['resume_cursor'])
+                return result
             
             # Update import log
-            import_log.write({
+            vals.update({
                 'state': 'done',
-                'products_created': result.get('created', 0),
-                'products_updated': result.get('updated', 0),
-                'products_failed': result.get('failed', 0),
+                'resume_cursor': False,
                 'end_date': fields.Datetime.now(),
                 'notes': result.get('message', 'Import completed successfully'),
             })
+            import_log.write(vals)
+            import_log._store_metrics(result.get('metrics'))
             
-            # Update last import date
-            self.last_import_date = fields.Datetime.now()
+            # Update last import date (a sharded import does it once all shards are merged)
+            if not import_log.parent_log_id:
+                if import_log.import_type != 'replay':
+                    import_log._mark_removed_vendor_products()
+                self.last_import_date = fields.Datetime.now()
             
             _logger.info('Import completed for vendor %s: %d created, %d updated, %d failed',
-                        self.name, result.get('created', 0), result.get('updated', 0), result.get('failed', 0))
+                        self.name, vals['products_created'], vals['products_updated'], vals['products_failed'])
+            return result
             
         except Exception as e:
             _logger.error('Import failed for vendor %s: %s', self.name, str(e))
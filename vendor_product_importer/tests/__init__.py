@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import test_import_queries
+from . import test_indexes
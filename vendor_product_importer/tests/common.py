@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase
+
+
+class VendorImporterCase(TransactionCase):
+    """Common fixtures of the vendor product importer tests"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.VendorConfig = cls.env['vendor.config']
+        cls.VendorInfo = cls.env['product.vendor.info']
+        cls.ImportLog = cls.env['vendor.import.log']
+        cls.vendor = cls._create_vendor('Test Vendor')
+
+    @classmethod
+    def _create_vendor(cls, name, **vals):
+        """
+        :param name: Vendor name
+        :return: vendor.config record imported manually only
+        """
+        return cls.env['vendor.config'].create(dict({
+            'name': name,
+            'vendor_type': 'generic',
+            'website_url': 'https://vendor.example.com',
+            'import_frequency': 'manual',
+        }, **vals))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo.tests import tagged
+
+from ..benchmarks.query_budget import QUERY_BUDGETS, SCENARIOS, format_query_costs, measure_query_costs
+from .common import VendorImporterCase
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestImportQueries(VendorImporterCase):
+    """
+    SQL queries per imported row on the import hot path, against QUERY_BUDGETS
+
+    Every adapter imports synthetic catalogs of two sizes without network
+    access (see benchmarks.catalog_source()) and the queries are counted
+    around vendor.config._run_import(); the cost of a row is the difference
+    between the two batches, so the fixed cost of a run does not hide a
+    query added per row. The measured costs are logged, to tighten the
+    budgets from.
+    """
+
+    SIZES = (20, 60)
+
+    def _check_vendor_type(self, vendor_type):
+        costs = measure_query_costs(self.env, vendor_type, sizes=self.SIZES)
+        for scenario in SCENARIOS:
+            cost = costs[scenario]
+            _logger.info('%s/%s: %.2f queries per row', vendor_type, scenario, cost['queries_per_row'])
+            with self.subTest(scenario=scenario):
+                self.assertEqual(cost['rows'], self.SIZES)
+                self.assertLessEqual(cost['queries_per_row'], QUERY_BUDGETS[scenario],
+                                     format_query_costs(cost, QUERY_BUDGETS[scenario]))
+
+    def test_amazon(self):
+        self._check_vendor_type('amazon')
+
+    def test_shopify(self):
+        self._check_vendor_type('shopify')
+
+    def test_ebay(self):
+        self._check_vendor_type('ebay')
+
+    def test_feed(self):
+        self._check_vendor_type('feed')
+
+    def test_generic(self):
+        self._check_vendor_type('generic')
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from odoo.tests import tagged
+from odoo.tools import SQL
+
+from .common import VendorImporterCase
+
+
+@tagged('post_install', '-at_install')
+class TestImporterIndexes(VendorImporterCase):
+    """
+    The importer's lookups must be served by the indexes created in the
+    models' init(), checked on the query plans of the real queries
+
+    The tables are filled with a few thousand rows shaped like a real
+    catalog (the same vendor product IDs at several vendors, many rows per
+    product and per log) and analyzed, so the planner picks the composite
+    indexes over the single-column ones for the reasons it would in
+    production. Sequential scans are disabled: on tables this small they
+    would always win.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vendors = cls.vendor
+        for index in range(4):
+            cls.vendors |= cls._create_vendor('Index Vendor %d' % index)
+        cls.templates = cls.env['product.template'].create([
+            {'name': 'Indexed Product %d' % index} for index in range(50)
+        ])
+        cls.import_logs = cls.ImportLog.create([{'vendor_id': cls.vendor.id} for dummy in range(3)])
+        cls.env.flush_all()
+
+        cr = cls.env.cr
+        # Every vendor carries the same 1000 vendor product IDs
+        cr.execute("""
+            INSERT INTO product_vendor_info (product_tmpl_id, vendor_id, vendor_product_id, vendor_cost,
+                                             active, vendor_stock_status, is_primary_vendor)
+            SELECT (%s::int[])[n %% 50 + 1], vendor_id, 'IDX-' || n, n %% 97 + 1, true,
+                   CASE WHEN n %% 2 = 0 THEN 'in_stock' ELSE 'out_of_stock' END, false
+              FROM generate_series(1, 1000) n
+        CROSS JOIN unnest(%s::int[]) vendor_id
+        """, (cls.templates.ids, cls.vendors.ids))
+        cr.execute("""
+            INSERT INTO vendor_import_log_line (import_log_id, vendor_id, vendor_product_id, state)
+            SELECT import_log_id, %s, 'IDX-' || n, (ARRAY['created', 'updated', 'skipped', 'failed'])[n %% 4 + 1]
+              FROM generate_series(1, 2000) n
+        CROSS JOIN unnest(%s::int[]) import_log_id
+        """, (cls.vendor.id, cls.import_logs.ids))
+        cr.execute('ANALYZE product_vendor_info')
+        cr.execute('ANALYZE vendor_import_log_line')
+
+    def setUp(self):
+        super().setUp()
+        self.env.cr.execute('SET LOCAL enable_seqscan = off')
+
+    def _get_plan_indexes(self, query):
+        """
+        :param query: SQL object of the query to explain
+        :return: Set of the index names in the query plan
+        """
+        self.env.cr.execute(SQL('EXPLAIN (FORMAT JSON) %s', query))
+        plan = self.env.cr.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        indexes = set()
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node.get('Index Name'):
+                indexes.add(node['Index Name'])
+            nodes.extend(node.get('Plans', []))
+        return indexes
+
+    def test_vendor_product_matching(self):
+        """Matching a chunk by vendor product ID, as in _search_matches() and _diff_chunk()"""
+        query = self.VendorInfo.with_context(active_test=False)._search([
+            ('vendor_id', '=', self.vendor.id),
+            ('vendor_product_id', 'in', ['IDX-%d' % n for n in range(100, 600, 25)]),
+        ], order='id')
+        self.assertIn('product_vendor_info_vendor_product_idx', self._get_plan_indexes(query.select()))
+
+    def test_vendor_row_of_product(self):
+        """Finding the row of a product for a vendor"""
+        query = self.VendorInfo._search([
+            ('product_tmpl_id', '=', self.templates[7].id),
+            ('vendor_id', '=', self.vendor.id),
+        ])
+        self.assertIn('product_vendor_info_tmpl_vendor_idx', self._get_plan_indexes(query.select()))
+
+    def test_best_vendor(self):
+        """The DISTINCT ON query of _get_best_vendor_infos()"""
+        query = SQL("""
+            SELECT DISTINCT ON (product_tmpl_id) product_tmpl_id, id
+              FROM product_vendor_info
+             WHERE product_tmpl_id = ANY(%s)
+               AND active
+               AND vendor_stock_status IN ('in_stock', 'limited')
+          ORDER BY product_tmpl_id, vendor_cost, id
+        """, self.templates[:10].ids)
+        self.assertIn('product_vendor_info_best_vendor_idx', self._get_plan_indexes(query))
+
+    def test_import_lines_by_state(self):
+        """Import lines of a log in one state, as counted by the log's stat buttons"""
+        query = self.env['vendor.import.log.line']._search([
+            ('import_log_id', '=', self.import_logs[1].id),
+            ('state', '=', 'failed'),
+        ])
+        self.assertIn('vendor_import_log_line_log_state_idx', self._get_plan_indexes(query.select()))
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+from .gtin import canonical_gtin, is_valid_gtin
+from .minhash import MinHasher
+from .price_simulator import PriceSimulator
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+_SEPARATORS = re.compile(r'[\s\-.]')
+
+
+def is_valid_gtin(digits):
+    """
+    Check the GS1 check digit of a GTIN
+
+    :param digits: String of 8, 12, 13 or 14 digits
+    :return: True if the last digit is the correct check digit
+    """
+    if not digits.isdigit() or len(digits) not in GTIN_LENGTHS:
+        return False
+    total = 0
+    # Weights alternate 3, 1, 3, ... from the digit left of the check digit
+    for position, digit in enumerate(reversed(digits[:-1])):
+        total += int(digit) * (3 if position % 2 == 0 else 1)
+    return (10 - total % 10) % 10 == int(digits[-1])
+
+
+def canonical_gtin(value):
+    """
+    Canonical form of a GTIN-8, UPC-A, EAN-13 or GTIN-14
+
+    Separators are removed and the code is left-padded with zeros to 14
+    digits, so the same item sent as UPC-A by one vendor and as EAN-13 or
+    GTIN-14 by another gets the same value.
+
+    :param value: Barcode as sent by a vendor
+    :return: 14-digit GTIN, or None if the value is not a valid GTIN
+    """
+    if not value:
+        return None
+    digits = _SEPARATORS.sub('', str(value))
+    if len(digits) > 14 and digits.isdigit() and not digits[:-14].strip('0'):
+        digits = digits[-14:]
+    if not is_valid_gtin(digits):
+        return None
+    return digits.zfill(14)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import random
+import re
+import unicodedata
+import zlib
+
+_PRIME = (1 << 61) - 1
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+class MinHasher:
+    """
+    MinHash signatures and LSH band keys of short texts such as product names
+
+    Two texts whose shingle sets have Jaccard similarity s share at least one
+    band key with probability 1 - (1 - s^rows)^bands, so near duplicates are
+    found by an exact lookup on band keys instead of pairwise comparison.
+    """
+
+    def __init__(self, num_perm=64, bands=16, seed=1):
+        """
+        :param num_perm: Number of hash functions (signature length)
+        :param bands: Number of LSH bands, must divide num_perm
+        :param seed: Seed of the hash functions; signatures are only
+                     comparable between hashers with the same parameters
+        """
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _i in range(num_perm)]
+
+    @staticmethod
+    def normalize(*texts):
+        """
+        :param texts: Texts to combine, e.g. name and brand
+        :return: Sorted list of lowercase ASCII tokens
+        """
+        text = ' '.join(t for t in texts if t)
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+        return sorted(set(token for token in _NON_ALNUM.split(text) if token))
+
+    @staticmethod
+    def shingles(tokens):
+        """
+        :param tokens: Normalized tokens
+        :return: Set of shingles: the tokens plus character trigrams of each
+        """
+        result = set(tokens)
+        for token in tokens:
+            padded = ' %s ' % token
+            result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        return result
+
+    def signature(self, *texts):
+        """
+        :param texts: Texts to combine, e.g. name and brand
+        :return: List of num_perm integers, or None if the texts have no tokens
+        """
+        shingles = self.shingles(self.normalize(*texts))
+        if not shingles:
+            return None
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms]
+
+    def band_keys(self, signature):
+        """
+        :param signature: MinHash signature
+        :return: One signed 32-bit key per band
+        """
+        keys = []
+        for band in range(self.bands):
+            values = signature[band * self.rows:(band + 1) * self.rows]
+            key = zlib.crc32(('%d:%s' % (band, ','.join(map(str, values)))).encode('ascii'))
+            keys.append(key - (1 << 32) if key >= (1 << 31) else key)
+        return keys
+
+    @staticmethod
+    def similarity(signature, other):
+        """
+        :return: Estimated Jaccard similarity of two signatures
+        """
+        if not signature or not other or len(signature) != len(other):
+            return 0.0
+        return sum(1 for a, b in zip(signature, other) if a == b) / float(len(signature))
+
+    @staticmethod
+    def dumps(signature):
+        return ' '.join('%x' % value for value in signature)
+
+    @staticmethod
+    def loads(data):
+        return [int(value, 16) for value in data.split()] if data else None
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import math
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+# Upper bounds (in %) of the margin histogram buckets; the last bucket is open
+MARGIN_BUCKETS = (0, 10, 20, 30, 40, 50, 75, 100, 200)
+
+# Same fallback as product.price.tier.calculate_price_for_product()
+DEFAULT_MARKUP = 1.3
+
+
+class PriceSimulator:
+    """
+    What-if pricing of a whole catalog under a proposed set of price tiers
+
+    The catalog is held column by column in typed arrays and kept sorted by
+    cost, so a tier set is applied range by range rather than product by
+    product: tier boundaries are located with bisect, the tiers applicable
+    to each cost range are resolved once per range (and once per category
+    and vendor when tiers are filtered), and each tier's formula then runs
+    over all its products at once. Tier selection and price calculation
+    follow product.price.tier.get_applicable_tier() and calculate_sale_price().
+
+    Tiers are plain dictionaries with the fields of product.price.tier
+    (categ_ids and vendor_ids as lists of ids), so proposed tiers can be
+    simulated before they are saved.
+    """
+
+    def __init__(self, product_ids, costs, categ_ids, vendor_ids, list_prices):
+        """
+        :param product_ids: product.template IDs
+        :param costs: Vendor cost of each product
+        :param categ_ids: Category ID of each product (0 for none)
+        :param vendor_ids: Vendor ID of each product's cost (0 for none)
+        :param list_prices: Current sale price of each product
+        """
+        self.product_ids = array('q', product_ids)
+        self.costs = array('d', costs)
+        self.categ_ids = array('q', categ_ids)
+        self.vendor_ids = array('q', vendor_ids)
+        self.list_prices = array('d', list_prices)
+        # Positions sorted by cost, shared by every simulation of this catalog
+        self.order = array('q', sorted(range(len(self.costs)), key=self.costs.__getitem__))
+        self.sorted_costs = array('d', (self.costs[index] for index in self.order))
+
+    def __len__(self):
+        return len(self.costs)
+
+    @staticmethod
+    def _sort_tiers(tiers):
+        # Most specific first, like the search in get_applicable_tier()
+        ordered = sorted(tiers, key=lambda tier: (tier.get('sequence', 10), -(tier.get('min_cost') or 0.0)))
+        for tier in ordered:
+            tier['_categ_ids'] = frozenset(tier.get('categ_ids') or ())
+            tier['_vendor_ids'] = frozenset(tier.get('vendor_ids') or ())
+        return ordered
+
+    @staticmethod
+    def _select_tier(candidates, tiers, categ_id, vendor_id):
+        applicable = [
+            index for index in candidates
+            if (not categ_id or not tiers[index]['_categ_ids'] or categ_id in tiers[index]['_categ_ids'])
+            and (not vendor_id or not tiers[index]['_vendor_ids'] or vendor_id in tiers[index]['_vendor_ids'])
+        ]
+        for index in applicable:
+            if categ_id in tiers[index]['_categ_ids'] or vendor_id in tiers[index]['_vendor_ids']:
+                return index
+        return applicable[0] if applicable else -1
+
+    def assign_tiers(self, tiers):
+        """
+        :param tiers: Tier dictionaries sorted by _sort_tiers()
+        :return: Array with the index in tiers applying to each product, -1 for none
+        """
+        size = len(self.costs)
+        assignment = array('q', [-1]) * size
+        bounds = {0, size}
+        for tier in tiers:
+            bounds.add(bisect_left(self.sorted_costs, tier.get('min_cost') or 0.0))
+            if tier.get('max_cost'):
+                bounds.add(bisect_right(self.sorted_costs, tier['max_cost']))
+        bounds = sorted(bounds)
+
+        # Between two consecutive bounds, the tiers covering the cost do not change
+        for start, end in zip(bounds, bounds[1:]):
+            if start == end:
+                continue
+            cost = self.sorted_costs[start]
+            candidates = [
+                index for index, tier in enumerate(tiers)
+                if (tier.get('min_cost') or 0.0) <= cost and (not tier.get('max_cost') or tier['max_cost'] >= cost)
+            ]
+            if not candidates:
+                continue
+            positions = self.order[start:end]
+            if not any(tiers[index]['_categ_ids'] or tiers[index]['_vendor_ids'] for index in candidates):
+                for position in positions:
+                    assignment[position] = candidates[0]
+                continue
+            selected = {}
+            for position in positions:
+                key = (self.categ_ids[position], self.vendor_ids[position])
+                tier_index = selected.get(key)
+                if tier_index is None:
+                    tier_index = selected[key] = self._select_tier(candidates, tiers, *key)
+                assignment[position] = tier_index
+        return assignment
+
+    @staticmethod
+    def _apply_tier(tier, costs):
+        """
+        Price many costs with one tier, like calculate_sale_price()
+
+        :param tier: Tier dictionary
+        :param costs: List of costs
+        :return: List of prices
+        """
+        factor = 1 + (tier.get('markup_percentage') or 0.0) / 100.0
+        method = tier.get('pricing_method') or 'percentage'
+        if method == 'fixed':
+            amount = tier.get('fixed_amount') or 0.0
+            prices = [cost + amount for cost in costs]
+        elif method == 'formula' and tier.get('price_formula'):
+            # Formulas only get the cost: 'product' and 'vendor' are None here
+            try:
+                code = compile(tier['price_formula'], '<price tier>', 'eval')
+            except SyntaxError:
+                code = None
+            prices = []
+            for cost in costs:
+                try:
+                    prices.append(eval(code, {'__builtins__': {}}, {'cost': cost, 'product': None, 'vendor': None}))
+                except Exception:
+                    prices.append(cost * factor)
+        else:
+            prices = [cost * factor for cost in costs]
+
+        min_profit_amount = tier.get('min_profit_amount') or 0.0
+        if min_profit_amount > 0:
+            prices = [max(price, cost + min_profit_amount) for price, cost in zip(prices, costs)]
+        min_profit_factor = 1 + (tier.get('min_profit_percentage') or 0.0) / 100.0
+        if min_profit_factor > 1:
+            prices = [max(price, cost * min_profit_factor) for price, cost in zip(prices, costs)]
+
+        precision = tier.get('rounding_precision') or 0.0
+        if tier.get('round_price', True) and precision > 0:
+            rounding = {'up': math.ceil, 'down': math.floor}.get(tier.get('rounding_method'), round)
+            prices = [rounding(price / precision) * precision for price in prices]
+
+        # A zero price falls back to the default markup, like calculate_price_for_product()
+        return [price or cost * DEFAULT_MARKUP for price, cost in zip(prices, costs)]
+
+    def compute_prices(self, tiers):
+        """
+        :param tiers: Tier dictionaries
+        :return: Tuple (array of new prices, array of tier index per product,
+                 tiers in the order the indexes refer to)
+        """
+        tiers = self._sort_tiers([dict(tier) for tier in tiers])
+        assignment = self.assign_tiers(tiers)
+
+        groups = defaultdict(list)
+        for position, tier_index in enumerate(assignment):
+            groups[tier_index].append(position)
+
+        prices = array('d', self.costs)
+        for tier_index, positions in groups.items():
+            costs = [self.costs[position] for position in positions]
+            if tier_index < 0:
+                new_prices = [cost * DEFAULT_MARKUP for cost in costs]
+            else:
+                new_prices = self._apply_tier(tiers[tier_index], costs)
+            for position, price in zip(positions, new_prices):
+                prices[position] = price
+        return prices, assignment, tiers
+
+    @staticmethod
+    def _margin_stats(margins):
+        if not margins:
+            return {'mean': 0.0, 'p10': 0.0, 'p50': 0.0, 'p90': 0.0, 'histogram': []}
+        ordered = sorted(margins)
+        size = len(ordered)
+        counts = [0] * (len(MARGIN_BUCKETS) + 1)
+        previous = 0
+        for bucket, bound in enumerate(MARGIN_BUCKETS):
+            position = bisect_left(ordered, bound)
+            counts[bucket] = position - previous
+            previous = position
+        counts[-1] = size - previous
+
+        labels = ['< %d%%' % MARGIN_BUCKETS[0]]
+        labels += ['%d-%d%%' % bounds for bounds in zip(MARGIN_BUCKETS, MARGIN_BUCKETS[1:])]
+        labels.append('>= %d%%' % MARGIN_BUCKETS[-1])
+        return {
+            'mean': round(sum(ordered) / size, 2),
+            'p10': round(ordered[int(size * 0.1)], 2),
+            'p50': round(ordered[int(size * 0.5)], 2),
+            'p90': round(ordered[min(int(size * 0.9), size - 1)], 2),
+            'histogram': list(zip(labels, counts)),
+        }
+
+    def _margins(self, prices):
+        return [(price - cost) / cost * 100.0 for price, cost in zip(prices, self.costs) if cost > 0]
+
+    def simulate(self, tiers, top=20, threshold=0.005):
+        """
+        Apply a tier set to the whole catalog and summarize the impact
+
+        :param tiers: Tier dictionaries with the fields of product.price.tier
+        :param top: Number of top movers returned
+        :param threshold: Smallest price difference counted as a move
+        :return: Dictionary with the number of products whose price moves,
+                 margin distributions before and after, products per tier
+                 and the top movers by relative price change
+        """
+        started = time.perf_counter()
+        prices, assignment, ordered_tiers = self.compute_prices(tiers)
+        current = self.list_prices
+
+        moved = raised = 0
+        for new_price, old_price in zip(prices, current):
+            if abs(new_price - old_price) >= threshold:
+                moved += 1
+                raised += new_price > old_price
+
+        def relative_change(position):
+            old_price = current[position]
+            change = prices[position] - old_price
+            return abs(change / old_price) if old_price > 0 else abs(change)
+
+        movers = heapq.nlargest(top, (
+            position for position in range(len(prices))
+            if abs(prices[position] - current[position]) >= threshold
+        ), key=relative_change)
+
+        per_tier = defaultdict(int)
+        for tier_index in assignment:
+            per_tier[tier_index] += 1
+
+        return {
+            'products': len(prices),
+            'moved': moved,
+            'raised': raised,
+            'lowered': moved - raised,
+            'current_total': round(sum(current), 2),
+            'proposed_total': round(sum(prices), 2),
+            'margin_current': self._margin_stats(self._margins(current)),
+            'margin_proposed': self._margin_stats(self._margins(prices)),
+            'tiers': [
+                {'id': tier.get('id'), 'name': tier.get('name'), 'products': per_tier.get(index, 0)}
+                for index, tier in enumerate(ordered_tiers)
+            ] + [{'id': None, 'name': None, 'products': per_tier.get(-1, 0)}],
+            'top_movers': [{
+                'product_id': self.product_ids[position],
+                'cost': self.costs[position],
+                'current_price': current[position],
+                'new_price': round(prices[position], 2),
+                'change': round(prices[position] - current[position], 2),
+                'change_percent': round((prices[position] - current[position]) / current[position] * 100.0, 2)
+                                  if current[position] > 0 else 0.0,
+            } for position in movers],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 1),
+        }
@@ -2,6 +2,7 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+import itertools
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -22,6 +23,9 @@ class VendorImportWizard(models.TransientModel):
                                help='Run import without creating/updating products')
     max_products = fields.Integer(string='Maximum Products', default=0,
                                   help='Limit number of products to import (0 = no limit)')
+    profile_import = fields.Boolean(string='Profile This Run', default=False,
+                                    help='Profile CPU time and memory allocations of this import and attach '
+                                         'the result to the import log')
     
     # Preview
     preview_count = fields.Integer(string='Products Found', readonly=True)
@@ -45,14 +49,12 @@ class VendorImportWizard(models.TransientModel):
         
         try:
             adapter = self.vendor_id._get_adapter()
-            products = adapter.fetch_products()
+            # Count the stream instead of loading it: feeds can hold millions of rows
+            count = sum(1 for dummy in self._iter_raw_products(adapter))
             
-            if self.max_products > 0:
-                products = products[:self.max_products]
-            
-            self.preview_count = len(products)
+            self.preview_count = count
             self.preview_message = _('Found %d products ready to import from %s') % (
-                len(products), self.vendor_id.name
+                count, self.vendor_id.name
             )
             self.state = 'preview'
             
@@ -71,29 +73,31 @@ class VendorImportWizard(models.TransientModel):
         """Execute the import"""
         self.ensure_one()
         
+        # Create import log
+        import_log = self.env['vendor.import.log'].create({
+            'vendor_id': self.vendor_id.id,
+            'state': 'in_progress',
+            'import_type': 'manual',
+        })
+        # Same vendor lock as the scheduled workers, so the two never overlap
+        import_log._acquire_import_lock()
+        
         try:
-            # Create import log
-            import_log = self.env['vendor.import.log'].create({
-                'vendor_id': self.vendor_id.id,
-                'state': 'in_progress',
-                'import_type': 'manual',
-            })
-            
             # Run import
             if self.test_mode:
                 result = self._test_import()
             else:
-                result = self._run_import()
+                result = self._run_import(import_log)
             
             # Update import log
-            import_log.write({
+            vals = import_log._prepare_count_vals({}, result)
+            vals.update({
                 'state': 'done',
-                'products_created': result.get('created', 0),
-                'products_updated': result.get('updated', 0),
-                'products_failed': result.get('failed', 0),
                 'end_date': fields.Datetime.now(),
                 'notes': result.get('message', ''),
             })
+            import_log.write(vals)
+            import_log._store_metrics(result.get('metrics'))
             
             # Update wizard
             self.write({
@@ -115,10 +119,16 @@ class VendorImportWizard(models.TransientModel):
         except Exception as e:
             _logger.error('Import failed: %s', str(e))
             raise UserError(_('Import failed: %s') % str(e))
+        finally:
+            import_log._release_import_lock()
     
-    def _run_import(self):
-        """Run actual import"""
-        adapter = self.vendor_id._get_adapter()
+    def _run_import(self, import_log=None):
+        """
+        Run actual import
+        
+        :param import_log: vendor.import.log record receiving per-product lines (optional)
+        """
+        adapter = self.vendor_id._get_adapter(import_log)
         
         # Temporarily modify vendor settings based on wizard options
         original_auto_create = self.vendor_id.auto_create_products
@@ -132,26 +142,35 @@ class VendorImportWizard(models.TransientModel):
             self.vendor_id.auto_update_prices = False
         
         try:
-            result = adapter.import_products()
+            profile = self.profile_import or self.vendor_id.profile_import
+            result = self.vendor_id._execute_import(adapter, import_log, profile=profile)
             return result
         finally:
             # Restore original settings
             self.vendor_id.auto_create_products = original_auto_create
             self.vendor_id.auto_update_prices = original_auto_update
     
+    def _iter_raw_products(self, adapter):
+        """
+        Stream the vendor's raw products, up to the wizard's maximum
+        
+        :param adapter: Adapter of the vendor
+        :return: Iterator of raw products
+        """
+        products = (raw_product for dummy, raw_product in adapter.iter_products())
+        if self.max_products > 0:
+            products = itertools.islice(products, self.max_products)
+        return products
+    
     def _test_import(self):
         """Test import without creating/updating products"""
         adapter = self.vendor_id._get_adapter()
-        products = adapter.fetch_products()
-        
-        if self.max_products > 0:
-            products = products[:self.max_products]
         
         created = 0
         updated = 0
         failed = 0
         
-        for raw_product in products:
+        for raw_product in self._iter_raw_products(adapter):
             try:
                 product_data = adapter.parse_product_data(raw_product)
                 
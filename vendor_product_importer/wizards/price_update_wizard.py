@@ -76,10 +76,11 @@ class PriceUpdateWizard(models.TransientModel):
         self.preview_lines.unlink()
         
         # Create preview lines
+        new_prices = self._calculate_new_prices(products)
         preview_vals = []
         for product in products:
             current_price = product.list_price
-            new_price = self._calculate_new_price(product)
+            new_price = new_prices.get(product.id, current_price)
             
             if new_price != current_price:
                 preview_vals.append({
@@ -132,8 +133,37 @@ class PriceUpdateWizard(models.TransientModel):
             'target': 'new',
         }
     
-    def _calculate_new_price(self, product):
-        """Calculate new price for product"""
+    def _calculate_new_prices(self, products):
+        """
+        Calculate the new price of many products
+        
+        Best vendor costs priced with the tiers are computed for all products
+        at once with the price simulator, unless a tier uses a formula, which
+        may need the product record.
+        
+        :param products: product.template records
+        :return: Dictionary {product id: new price}; products left out keep their price
+        """
+        self.ensure_one()
+        PriceTier = self.env['product.price.tier']
+        
+        if self.price_source == 'best_vendor' and self.apply_tiers:
+            specs = PriceTier._get_tier_specs()
+            if not any(spec['pricing_method'] == 'formula' for spec in specs):
+                simulator = PriceTier._load_price_simulator(products.ids)
+                prices, dummy, dummy = simulator.compute_prices(specs)
+                return dict(zip(simulator.product_ids, prices))
+        
+        tiers = PriceTier._get_active_tiers() if self.apply_tiers else None
+        return {product.id: self._calculate_new_price(product, tiers=tiers) for product in products}
+    
+    def _calculate_new_price(self, product, tiers=None):
+        """
+        Calculate new price for product
+        
+        :param product: product.template record
+        :param tiers: Active tiers from product.price.tier._get_active_tiers() (optional)
+        """
         self.ensure_one()
         
         if self.price_source == 'manual':
@@ -158,7 +188,7 @@ class PriceUpdateWizard(models.TransientModel):
         # Apply price tiers if enabled
         if self.apply_tiers:
             price_tier_model = self.env['product.price.tier']
-            return price_tier_model.calculate_price_for_product(cost, product, vendor)
+            return price_tier_model.calculate_price_for_product(cost, product, vendor, tiers=tiers)
         else:
             return cost
 